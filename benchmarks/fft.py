@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DESCRIPTION
+
+    Benchmark comparing the FFT backends and the number of workers on the log-magnitude STFT.
+
+    Usage: python benchmarks/fft.py -d 600 -j 1 2 4
+
+LICENSE
+    This script is in the public domain, free from copyrights or restrictions.
+"""
+
+# System/default
+import os
+import time
+
+# Arguments
+import argparse
+
+# Linear algebra
+import numpy as np
+
+# PyQtGraph & create application (spiny.core instantiates widgets when imported)
+from pyqtgraph.Qt import QtWidgets
+
+if not QtWidgets.QApplication.instance():
+    APP = QtWidgets.QApplication(["SpINY"])
+else:
+    APP = QtWidgets.QApplication.instance()
+
+# SpINY
+from spiny.dsp import fft  # noqa: E402
+from spiny.dsp.process import stft_db  # noqa: E402
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def define_argument_parser() -> argparse.ArgumentParser:
+    """Defines the argument parser
+
+    Returns
+    --------
+    The argument parser: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the FFT backends")
+    parser.add_argument("-d", "--duration", default=600, type=float, help="The duration of the signal in seconds")
+    parser.add_argument("-s", "--sampling-rate", default=16000, type=int, help="The sampling rate")
+    parser.add_argument("-n", "--fft-length", default=4096, type=int, help="The FFT length")
+    parser.add_argument("-f", "--frameshift", default=5, type=float, help="The frameshift in milliseconds")
+    parser.add_argument("-w", "--framelength", default=30, type=float, help="The frame length in milliseconds")
+    parser.add_argument(
+        "-b", "--backends", default=list(fft.FFT_BACKENDS.keys()), nargs="+", help="The backends to compare"
+    )
+    parser.add_argument(
+        "-j", "--nb-workers", default=[1, os.cpu_count()], type=int, nargs="+", help="The numbers of workers to compare"
+    )
+    parser.add_argument("-r", "--repeat", default=3, type=int, help="The number of runs (the best one is kept)")
+    return parser
+
+
+def best_time(function, repeat):
+    """Run the function repeat times and return the best duration with the last result"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return min(durations), result
+
+
+def main():
+    args = define_argument_parser().parse_args()
+
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal(int(args.duration * args.sampling_rate)).astype(np.float32)
+    hop_length = int(0.001 * args.frameshift * args.sampling_rate)
+    win_length = int(0.001 * args.framelength * args.sampling_rate)
+
+    print(f"signal: {args.duration:.0f} s, FFT length {args.fft_length}, {os.cpu_count()} cores")
+    reference = None
+    for backend in args.backends:
+        fft.set_fft_backend(backend)
+        for nb_workers in args.nb_workers:
+            fft.set_nb_workers(nb_workers)
+            duration, spectrum = best_time(
+                lambda: stft_db(signal, args.fft_length, hop_length, win_length, "hamming"), args.repeat
+            )
+            if reference is None:
+                reference = spectrum
+            deviation = np.max(np.abs(spectrum - reference))
+            print(f"{backend:>6s} - {nb_workers:2d} workers: {duration:.3f} s (max deviation {deviation:.2e} dB)")
+
+
+###############################################################################
+#  Envelopping
+###############################################################################
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DESCRIPTION
+
+    Benchmark comparing the serial STFT (a single core) and the chunked STFT computed by the thread pool.
+
+    Usage: python benchmarks/stft.py -d 600 -r 3 -j 4
+
+LICENSE
+    This script is in the public domain, free from copyrights or restrictions.
+"""
+
+# System/default
+import os
+import time
+
+# Arguments
+import argparse
+
+# Linear algebra
+import numpy as np
+
+# PyQtGraph & create application (spiny.core instantiates widgets when imported)
+from pyqtgraph.Qt import QtWidgets
+
+if not QtWidgets.QApplication.instance():
+    APP = QtWidgets.QApplication(["SpINY"])
+else:
+    APP = QtWidgets.QApplication.instance()
+
+# SpINY
+from spiny.dsp import fft  # noqa: E402
+from spiny.dsp.process import stft, chunked_stft  # noqa: E402
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def define_argument_parser() -> argparse.ArgumentParser:
+    """Defines the argument parser
+
+    Returns
+    --------
+    The argument parser: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the serial and the chunked STFT")
+    parser.add_argument("-d", "--duration", default=600, type=float, help="The duration of the signal in seconds")
+    parser.add_argument("-s", "--sampling-rate", default=16000, type=int, help="The sampling rate")
+    parser.add_argument("-n", "--fft-length", default=4096, type=int, help="The FFT length")
+    parser.add_argument("-f", "--frameshift", default=5, type=float, help="The frameshift in milliseconds")
+    parser.add_argument("-w", "--framelength", default=30, type=float, help="The frame length in milliseconds")
+    parser.add_argument("-r", "--repeat", default=3, type=int, help="The number of runs (the best one is kept)")
+    parser.add_argument(
+        "-j",
+        "--nb-workers",
+        default=None,
+        type=int,
+        help="The number of cores of the chunked STFT (all of them by default)",
+    )
+    return parser
+
+
+def best_time(function, repeat):
+    """Run the function repeat times and return the best duration with the last result"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return min(durations), result
+
+
+def main():
+    args = define_argument_parser().parse_args()
+
+    rng = np.random.default_rng(0)
+    signal = rng.standard_normal(int(args.duration * args.sampling_rate)).astype(np.float32)
+    hop_length = int(0.001 * args.frameshift * args.sampling_rate)
+    win_length = int(0.001 * args.framelength * args.sampling_rate)
+    params = (signal, args.fft_length, hop_length, win_length, "hamming")
+
+    # NOTE: the FFT backend is multi-threaded as well, the serial baseline has to be pinned to one core
+    fft.set_nb_workers(1)
+    serial_time, serial = best_time(lambda: stft(*params), args.repeat)
+    fft.set_nb_workers(args.nb_workers)
+    chunked_time, chunked = best_time(lambda: chunked_stft(*params), args.repeat)
+
+    print(f"signal: {args.duration:.0f} s, {serial.shape[0]} frames, {serial.shape[1]} bins, {os.cpu_count()} cores")
+    print(f"workers: 1 (serial), {fft.get_nb_workers(in_pool=False)} (chunked)")
+    print(f"serial : {serial_time:.3f} s")
+    print(f"chunked: {chunked_time:.3f} s (speedup x{serial_time / chunked_time:.2f})")
+    print(f"identical: {np.array_equal(serial, chunked)}")
+
+
+###############################################################################
+#  Envelopping
+###############################################################################
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
 from .plugin_management import DataController
 from .plugin_management import DataDock
 from .plugin_management import plugin_entry_dict
+from .extraction import extraction_manager, check_cancelled, ExtractionCancelled
 
 from .segment import Segment
 from .wav import player
 
-__all__ = ["DataDock", "DataController", "plugin_entry_dict", "player", "Segment"]
+__all__ = [
+    "DataDock",
+    "DataController",
+    "plugin_entry_dict",
+    "extraction_manager",
+    "check_cancelled",
+    "ExtractionCancelled",
+    "player",
+    "Segment",
+]
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the export of the extracted data.
+
+    An export is a pair of files sharing the same stem:
+      - <stem>.npy: the matrix (frames, dimensions), which can be memory mapped (numpy.load(..., mmap_mode="r"))
+      - <stem>.json: the metadata describing the time and the second (frequency, scale, ...) axes
+
+    The matrix is written chunk by chunk in the memory-mapped file, so exporting never needs another
+    copy of the data in memory.
+
+LICENSE
+"""
+
+import os
+import json
+import pathlib
+
+import numpy as np
+
+from .extraction import check_cancelled
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Number of frames written at once
+EXPORT_CHUNK_SIZE = 4096
+
+# Extensions of the files of an export
+EXPORT_SUFFIXES = (".npy", ".json")
+
+# Suffix of the files of an export being written
+EXPORT_PARTIAL_SUFFIX = ".part"
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def get_export_paths(filename):
+    """Get the path of the matrix and of the metadata of an export
+
+    Parameters
+    ----------
+    filename : str or pathlib.Path
+        The name of the export, a .npy or .json extension is ignored (the other dots are part of the name)
+
+    Returns
+    -------
+    tuple(pathlib.Path, pathlib.Path)
+        The path of the matrix (.npy) and the path of the metadata (.json)
+    """
+    path = pathlib.Path(filename)
+    name = path.name
+    if path.suffix in EXPORT_SUFFIXES:
+        name = name[: -len(path.suffix)]
+
+    return path.with_name(name + ".npy"), path.with_name(name + ".json")
+
+
+def define_metadata(source, frameshift, start_time=0.0, y_label="dimension", y_unit="", y_values=None, **kwargs):
+    """Define the metadata of an export
+
+    Parameters
+    ----------
+    source : str
+        The name of the plugin which produced the data
+
+    frameshift : float
+        The time between two frames (in seconds)
+
+    start_time : float
+        The time of the first frame (in seconds) (default: 0.0)
+
+    y_label : str
+        The name of the second axis (default: "dimension")
+
+    y_unit : str
+        The unit of the second axis (default: "")
+
+    y_values : array-like
+        The value associated to each dimension, None if they are only indexes (default: None)
+
+    kwargs : dict
+        The other information to save (analysis parameters, unit of the values, ...)
+
+    Returns
+    -------
+    dict
+        The metadata
+    """
+    metadata = {
+        "source": source,
+        "frameshift": float(frameshift),
+        "start_time": float(start_time),
+        "y_label": y_label,
+        "y_unit": y_unit,
+        "y_values": None if y_values is None else np.asarray(y_values, dtype=np.float64).tolist(),
+    }
+    metadata.update(kwargs)
+    return metadata
+
+
+def export_chunks(chunks, shape, filename, metadata, dtype=np.float32, cancel_event=None):
+    """Write a matrix given chunk by chunk
+
+    Parameters
+    ----------
+    chunks : iterable of tuple(int, np.array)
+        The index of the first frame of each chunk and the frames of the chunk
+
+    shape : tuple(int, int)
+        The shape of the complete matrix
+
+    filename : str or pathlib.Path
+        The name of the export
+
+    metadata : dict
+        The metadata (see define_metadata)
+
+    dtype : np.dtype
+        The type of the saved values (default: np.float32)
+
+    cancel_event : threading.Event
+        The event interrupting the export between two chunks, None if it can't be cancelled (default: None)
+
+    Returns
+    -------
+    tuple(pathlib.Path, pathlib.Path)
+        The path of the matrix and the path of the metadata
+    """
+    data_path, metadata_path = get_export_paths(filename)
+
+    # NOTE: the files are written under temporary names and renamed once complete, so an interrupted export
+    #       never leaves a partial matrix or a matrix without its metadata
+    partial_paths = [path.with_name(path.name + EXPORT_PARTIAL_SUFFIX) for path in (data_path, metadata_path)]
+    try:
+        data = np.lib.format.open_memmap(partial_paths[0], mode="w+", dtype=dtype, shape=shape)
+        for start, chunk in chunks:
+            data[start : start + chunk.shape[0]] = chunk
+            check_cancelled(cancel_event)
+        data.flush()
+        del data
+
+        metadata = dict(metadata, shape=list(shape), dtype=np.dtype(dtype).name)
+        with open(partial_paths[1], "w") as f_metadata:
+            json.dump(metadata, f_metadata, indent=2)
+    except BaseException:
+        for path in partial_paths:
+            path.unlink(missing_ok=True)
+        raise
+
+    os.replace(partial_paths[0], data_path)
+    os.replace(partial_paths[1], metadata_path)
+
+    return data_path, metadata_path
+
+
+def export_array(array, filename, metadata, chunk_size=EXPORT_CHUNK_SIZE, cancel_event=None):
+    """Write a matrix already available (in memory or memory mapped)
+
+    Parameters
+    ----------
+    array : np.array
+        The matrix (frames, dimensions)
+
+    filename : str or pathlib.Path
+        The name of the export
+
+    metadata : dict
+        The metadata (see define_metadata)
+
+    chunk_size : int
+        The number of frames written at once (default: EXPORT_CHUNK_SIZE)
+
+    cancel_event : threading.Event
+        The event interrupting the export between two chunks, None if it can't be cancelled (default: None)
+
+    Returns
+    -------
+    tuple(pathlib.Path, pathlib.Path)
+        The path of the matrix and the path of the metadata
+    """
+    chunks = ((start, array[start : start + chunk_size]) for start in range(0, array.shape[0], chunk_size))
+    return export_chunks(chunks, array.shape, filename, metadata, array.dtype, cancel_event)
+
+
+def load_export(filename, mmap_mode="r"):
+    """Load an export
+
+    Parameters
+    ----------
+    filename : str or pathlib.Path
+        The name of the export
+
+    mmap_mode : str
+        The memory mapping mode given to numpy.load, None to load the matrix in memory (default: "r")
+
+    Returns
+    -------
+    tuple(np.array, dict)
+        The matrix and the metadata
+    """
+    data_path, metadata_path = get_export_paths(filename)
+    with open(metadata_path) as f_metadata:
+        metadata = json.load(f_metadata)
+
+    return np.load(data_path, mmap_mode=mmap_mode), metadata
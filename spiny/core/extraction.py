@@ -0,0 +1,157 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pyqtgraph.Qt import QtCore
+
+# NOTE: the cancellation is part of the analyses, which don't depend on Qt
+from spiny.dsp.process import check_cancelled, ExtractionCancelled  # noqa: F401
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Delay (in ms) without any new request before a debounced extraction starts
+DEBOUNCE_DELAY = 400
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class ExtractionManager(QtCore.QObject):
+    """Run the extractions of the data plugins in the background
+
+    Only one extraction is relevant at a time: submitting a job cancels the previous one (the job
+    stops at its next call to check_cancelled and its result is discarded). The jobs run one after
+    the other on a dedicated worker, the computations themselves being parallelised by the shared DSP
+    pool. A job never changes the state read by the main thread: it returns its result, which is
+    committed to its controller and followed by the refresh from the Qt main thread through a queued signal.
+
+    Attributes
+    ----------
+    _generation : int
+        The identifier of the last submitted job, the results of the other jobs are discarded
+
+    _cancel_event : threading.Event
+        The event cancelling the running job
+
+    _export_executor : ThreadPoolExecutor
+        The worker of the exports, which are never cancelled by a new extraction
+    """
+
+    sigExtracted = QtCore.Signal(object, int, object)
+
+    def __init__(self):
+        super().__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spiny-extraction")
+        self._generation = 0
+        self._cancel_event = threading.Event()
+        self._export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spiny-export")
+
+        # Debounce the rapid requests
+        self._pending = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._runPending)
+
+        # NOTE: the signal is emitted by the worker, the refresh has to be done by the main thread
+        self.sigExtracted.connect(self._onExtracted, QtCore.Qt.ConnectionType.QueuedConnection)
+
+    def cancel(self):
+        """Cancel the running job and the pending request"""
+        self._timer.stop()
+        self._pending = None
+        self._generation += 1
+        self._cancel_event.set()
+
+    def submit(self, controller, job):
+        """Cancel the running job and run a new one
+
+        Parameters
+        ----------
+        controller : DataController
+            The controller refreshed once the job is done
+
+        job : function
+            The function run by the worker, it receives the cancellation event as its only argument and
+            returns the result given to the commitExtraction method of the controller
+        """
+        self.cancel()
+        self._cancel_event = threading.Event()
+        self._executor.submit(self._run, controller, job, self._cancel_event, self._generation)
+
+    def export(self, controller, job):
+        """Run an export in the background
+
+        Contrary to the extractions, the exports are run one after the other until they are done: a new
+        extraction doesn't cancel them.
+
+        Parameters
+        ----------
+        controller : DataController
+            The controller whose data are exported
+
+        job : function
+            The function run by the worker, it doesn't receive any argument
+        """
+        self._export_executor.submit(self._runExport, controller, job)
+
+    def schedule(self, request, delay=DEBOUNCE_DELAY):
+        """Call request (from the main thread) once no other request has been scheduled during delay ms
+
+        The running job is cancelled immediately as its parameters are outdated.
+
+        Parameters
+        ----------
+        request : function
+            The function to call, generally the extract method of a controller
+
+        delay : int
+            The delay in ms (default: DEBOUNCE_DELAY)
+        """
+        self.cancel()
+        self._pending = request
+        self._timer.start(delay)
+
+    def _runPending(self):
+        request, self._pending = self._pending, None
+        if request is not None:
+            request()
+
+    def _run(self, controller, job, cancel_event, generation):
+        if cancel_event.is_set():
+            return
+
+        try:
+            result = job(cancel_event)
+        except ExtractionCancelled:
+            self.logger.debug(f"Extraction of {controller._name} cancelled")
+            return
+        except Exception:
+            self.logger.exception(f"Extraction of {controller._name} failed")
+            return
+
+        if not cancel_event.is_set():
+            self.sigExtracted.emit(controller, generation, result)
+
+    def _runExport(self, controller, job):
+        try:
+            job()
+        except Exception:
+            self.logger.exception(f"Export of {controller._name} failed")
+
+    def _onExtracted(self, controller, generation, result):
+        # A new job has been submitted since this one was done
+        if generation != self._generation:
+            return
+
+        controller.commitExtraction(result)
+        controller.refresh()
+
+
+extraction_manager = ExtractionManager()
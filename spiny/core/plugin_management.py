@@ -1,13 +1,75 @@
+import copy
+
 from pyqtgraph.dockarea import Dock
 
+from .extraction import extraction_manager
+
 
 class DataController:
     def __init__(self):
         pass
 
-    def extract(self):
-        self._extractor.extract()
-        self.refresh()
+    def extract(self, **parameters):
+        """Extract the data in the background, the widget is refreshed once the extraction is done
+
+        The job works on a copy of the extractor holding the new parameters, so it never shares its state
+        with the main thread nor with a cancelled job. The copy replaces the state of the extractor once
+        the job is done (see commitExtraction).
+
+        Parameters
+        ----------
+        parameters : dict
+            The new extraction parameters (by name of the attribute of the extractor)
+        """
+        extractor = copy.copy(self._extractor)
+        for name, value in parameters.items():
+            setattr(extractor, name, value)
+
+        extraction_manager.submit(self, lambda cancel_event: self.runExtraction(extractor, cancel_event))
+
+    def runExtraction(self, extractor, cancel_event):
+        """Extraction job run by the background worker
+
+        Parameters
+        ----------
+        extractor : object
+            The copy of the extractor owned by the job
+
+        cancel_event : threading.Event
+            The event set when the extraction is cancelled
+
+        Returns
+        -------
+        object
+            The extractor holding the result
+        """
+        extractor.extract(cancel_event=cancel_event)
+        return extractor
+
+    def commitExtraction(self, extractor):
+        """Replace the state of the extractor by the one of the copy extracted in the background (main thread only)
+
+        Parameters
+        ----------
+        extractor : object
+            The extractor returned by the job, None if the job doesn't produce any state
+        """
+        if extractor is not None:
+            vars(self._extractor).update(vars(extractor))
+
+    def export(self, filename):
+        """Export the data of the whole signal in the background (see spiny.core.export)
+
+        The export works on a copy of the extractor, so it keeps the parameters it was requested with and
+        it isn't cancelled by the next extractions.
+
+        Parameters
+        ----------
+        filename : str or pathlib.Path
+            The name of the export
+        """
+        extractor = copy.copy(self._extractor)
+        extraction_manager.export(self, lambda: extractor.export(filename))
 
     def refresh(self):
         self._widget.refresh()
@@ -1,5 +1,6 @@
 from .player import player as player
 from .control import PlayerControllerWidget
 from .control import controller
+from .features import feature_store, STFTParameters
 
-__all__ = ["player", "PlayerControllerWidget", "controller"]
+__all__ = ["player", "PlayerControllerWidget", "controller", "feature_store", "STFTParameters"]
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the feature store shared by the data plugins.
+
+    The spectral features (band energy, spectral flux, long-term spectrum) of the signal loaded in the
+    player are computed once per set of analysis parameters, whichever plugin or overlay needs them
+    first: a single pass of the STFT gives all the features of each frame (see
+    spiny.dsp.spectral.compute_frame_features). The power spectrum is never kept, only the features,
+    whose size doesn't depend on the FFT length, are cached.
+
+LICENSE
+"""
+
+import math
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import scipy.signal
+import librosa
+
+from spiny.dsp import fft
+from .player import player
+from spiny.dsp.process import STFT_BLOCK_SIZE, frame_count, frame_signal, analysis_window
+from spiny.dsp.spectral import sum_power, compute_frame_features, compute_band_power, band_power_to_rms
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class STFTParameters(NamedTuple):
+    """Parameters of a short-term analysis (in samples)"""
+
+    n_fft: int
+    hop_length: int
+    win_length: int
+    window: str = "hamming"
+
+    @classmethod
+    def fromMilliseconds(cls, fft_length=2048, frameshift=5, framelength=30, window="hamming"):
+        """Define the parameters the way the plugins do (the FFT length is the half of n_fft)
+
+        Parameters
+        ----------
+        fft_length : int
+            The half of the FFT length (in samples) (default: 2048)
+
+        frameshift : float
+            The frameshift (in ms) (default: 5)
+
+        framelength : float
+            The frame length (in ms) (default: 30)
+
+        window : str
+            The name of the window (default: "hamming")
+
+        Returns
+        -------
+        STFTParameters
+            The parameters for the sampling rate of the player
+        """
+        return cls(
+            2 * fft_length,
+            int(0.001 * frameshift * player._sampling_rate),
+            int(0.001 * framelength * player._sampling_rate),
+            window,
+        )
+
+
+class FeatureStore:
+    """Session cache of the spectral features of the signal loaded in the player
+
+    The features are indexed by their name and their analysis parameters and are dropped as soon as a
+    new signal is loaded. The computation of a feature is done once, even if several threads need it at
+    the same time.
+
+    The features of each frame share a single pass of the STFT per set of analysis parameters (see
+    getFrameFeatures). The band energy of a band which was not known when this pass ran needs its own
+    pass, restricted to the bins of the band.
+
+    Attributes
+    ----------
+    _signal : np.array
+        The signal the cached features have been computed on
+
+    _features : dict
+        The features indexed by (name, STFTParameters, other parameters)
+
+    _block_size : int
+        The number of frames between two prefix sums of the power spectrum
+    """
+
+    def __init__(self, block_size=STFT_BLOCK_SIZE):
+        """
+        Parameters
+        ----------
+        block_size : int
+            The number of frames between two prefix sums of the power spectrum (default: STFT_BLOCK_SIZE)
+        """
+        self._block_size = block_size
+        self._signal = None
+        self._features = dict()
+        self._lock = threading.Lock()
+        self._feature_locks = dict()
+
+    def clear(self):
+        """Drop all the cached features"""
+        with self._lock:
+            self._features = dict()
+            self._feature_locks = dict()
+
+    def _checkSignal(self):
+        # NOTE: a new wav file means a new array in the player
+        with self._lock:
+            if self._signal is not player._wav:
+                self._signal = player._wav
+                self._features = dict()
+                self._feature_locks = dict()
+
+    def _contains(self, key):
+        self._checkSignal()
+        with self._lock:
+            return key in self._features
+
+    def _getFeature(self, key, compute):
+        """Get a feature, computing it if needed
+
+        Parameters
+        ----------
+        key : tuple
+            The name and the parameters of the feature
+
+        compute : function
+            The function computing the feature from the signal samples (1D)
+
+        Returns
+        -------
+        np.array
+            The read-only feature
+        """
+        self._checkSignal()
+        with self._lock:
+            feature_lock = self._feature_locks.setdefault(key, threading.Lock())
+
+        # NOTE: the other features are not blocked during the computation
+        with feature_lock:
+            with self._lock:
+                feature = self._features.get(key, None)
+            if feature is None:
+                feature = compute(self._signal[:, 0])
+                if isinstance(feature, np.ndarray):
+                    feature.setflags(write=False)
+                with self._lock:
+                    self._features[key] = feature
+
+        return feature
+
+    def containsFrameFeatures(self, parameters):
+        """Check if the features of each frame for the given parameters are already available
+
+        Parameters
+        ----------
+        parameters : STFTParameters
+            The analysis parameters
+
+        Returns
+        -------
+        bool
+            True if the features are cached
+        """
+        return self._contains(("frame_features", parameters))
+
+    def getFrameFeatures(self, parameters, bands=()):
+        """Get the features of each frame (band power, spectral flux and prefix sums of the power spectrum)
+
+        All of them are computed by the same pass of the STFT (see spiny.dsp.spectral.compute_frame_features).
+        The prefix sums are accumulated in double precision as the difference of two large sums has to stay
+        accurate for a short range of quiet frames.
+
+        Parameters
+        ----------
+        parameters : STFTParameters
+            The analysis parameters
+
+        bands : sequence of tuple(int, int)
+            The ranges [first bin, last bin[ of the bands whose power is computed if the pass has to be run
+            (default: none)
+
+        Returns
+        -------
+        spiny.dsp.spectral.FrameFeatures
+            The read-only features
+        """
+
+        def _compute(signal):
+            features = compute_frame_features(signal, *parameters, bands=bands, block_size=self._block_size)
+            for array in (features.cumulated_power, features.spectral_flux, *features.band_power.values()):
+                array.setflags(write=False)
+            return features
+
+        return self._getFeature(("frame_features", parameters), _compute)
+
+    def getLongTermSpectrum(self, parameters, start_time, end_time, amin=1e-5):
+        """Get the long-term average spectrum (in dB) of the frames between two times
+
+        Once the prefix sums of the power spectrum are available (see getFrameFeatures), at most two blocks
+        of frames are analysed whatever the length of the range. The reference (0 dB) is a full scale sinusoid.
+
+        Parameters
+        ----------
+        parameters : STFTParameters
+            The analysis parameters
+
+        start_time : float
+            The start of the range (in seconds)
+
+        end_time : float
+            The end of the range (in seconds)
+
+        amin : float
+            The minimal normalised magnitude (default: 1e-5)
+
+        Returns
+        -------
+        tuple(np.array, np.array)
+            The frequencies (in Hz) and the average spectrum
+        """
+        features = self.getFrameFeatures(parameters)
+        cumulated_power, block_size = features.cumulated_power, features.block_size
+        signal = self._signal[:, 0]
+        nb_frames = frame_count(signal.shape[0], parameters.n_fft, parameters.hop_length)
+
+        # Frames whose centre is in the range, at least one
+        start = min(max(math.ceil(start_time * player._sampling_rate / parameters.hop_length), 0), nb_frames - 1)
+        end = min(max(math.floor(end_time * player._sampling_rate / parameters.hop_length) + 1, start + 1), nb_frames)
+
+        # The complete blocks come from the prefix sums, the frames at the ends are analysed
+        first_block, last_block = -(-start // block_size), end // block_size
+        if first_block < last_block:
+            power = cumulated_power[last_block] - cumulated_power[first_block]
+            power += sum_power(signal, *parameters, start, first_block * block_size)
+            power += sum_power(signal, *parameters, last_block * block_size, end)
+        else:
+            power = sum_power(signal, *parameters, start, end)
+        power /= end - start
+
+        fft_window = analysis_window(parameters.window, parameters.win_length, parameters.n_fft)
+        ref_power = (0.5 * np.sum(fft_window)) ** 2
+        spectrum = 10 * np.log10(np.maximum(power / ref_power, amin**2))
+        frequencies = np.arange(parameters.n_fft // 2 + 1) * player._sampling_rate / parameters.n_fft
+
+        return frequencies, spectrum
+
+    def getBandEnergy(self, parameters, band):
+        """Get the RMS amplitude of the signal in a frequency band for each frame
+
+        The energy of the band is derived from the power of the band using the Parseval theorem (see
+        spiny.dsp.spectral.band_power_to_rms). The power comes from the features of each frame, computed
+        with this band if they are not available yet.
+
+        Parameters
+        ----------
+        parameters : STFTParameters
+            The analysis parameters
+
+        band : tuple(float, float)
+            The minimal and the maximal frequencies (in Hz)
+
+        Returns
+        -------
+        np.array
+            The RMS amplitude of each frame
+        """
+        bins = tuple(int(frequency * parameters.n_fft / player._sampling_rate) for frequency in band)
+
+        def _compute(signal):
+            band_power = self.getFrameFeatures(parameters, (bins,)).band_power.get(bins, None)
+            if band_power is None:
+                # NOTE: the pass of the parameters ran without this band, only its bins are kept by this one
+                band_power = compute_band_power(signal, *parameters, bins)
+            return band_power_to_rms(band_power, parameters.n_fft, parameters.win_length, parameters.window)
+
+        return self._getFeature(("band_energy", parameters, bins), _compute)
+
+    def getSpectralFlux(self, parameters):
+        """Get the spectral flux (the L2 norm of the positive variations of the magnitude) of each frame
+
+        Parameters
+        ----------
+        parameters : STFTParameters
+            The analysis parameters
+
+        Returns
+        -------
+        np.array
+            The read-only spectral flux of each frame (0 for the first one)
+        """
+        return self.getFrameFeatures(parameters).spectral_flux
+
+    def getSlice(self, parameters, time, lpc_order=None, amin=1e-5):
+        """Get the spectrum and the LPC envelope (in dB) of the frame at a given time
+
+        Only the FFT of the frame is computed and the LPC analysis is done on the windowed frame. The
+        reference (0 dB) is a full scale sinusoid.
+
+        Parameters
+        ----------
+        parameters : STFTParameters
+            The analysis parameters
+
+        time : float
+            The time (in seconds)
+
+        lpc_order : int
+            The order of the LPC analysis, None to use 2 + sampling rate / 1000 (default: None)
+
+        amin : float
+            The minimal normalised magnitude (default: 1e-5)
+
+        Returns
+        -------
+        tuple(np.array, np.array, np.array)
+            The frequencies (in Hz), the spectrum and the LPC envelope (None if the frame is silent)
+        """
+        self._checkSignal()
+        signal = self._signal[:, 0]
+        n_fft, hop_length, win_length, window = parameters
+        nb_frames = frame_count(len(signal), n_fft, hop_length)
+        index = min(max(round(time * player._sampling_rate / hop_length), 0), nb_frames - 1)
+
+        fft_window = analysis_window(window, win_length, n_fft)
+        frame = frame_signal(signal, n_fft, hop_length, index, index + 1)[0] * fft_window
+        power = np.abs(fft.rfft(frame)) ** 2
+
+        ref_power = (0.5 * np.sum(fft_window)) ** 2
+        spectrum = 10 * np.log10(np.maximum(power / ref_power, amin**2))
+        frequencies = np.arange(n_fft // 2 + 1) * player._sampling_rate / n_fft
+
+        # The LPC model is |X|^2 = residual energy / |A|^2
+        if lpc_order is None:
+            lpc_order = 2 + int(player._sampling_rate / 1000)
+        if np.sum(frame**2) < amin**2:
+            return frequencies, spectrum, None
+
+        coefficients = librosa.lpc(frame, order=lpc_order)
+        residual = scipy.signal.lfilter(coefficients, [1.0], frame)
+        envelope = np.sum(residual**2) / np.abs(fft.rfft(coefficients, n=n_fft)) ** 2
+        envelope = 10 * np.log10(np.maximum(envelope / ref_power, amin**2))
+
+        return frequencies, spectrum, envelope
+
+
+feature_store = FeatureStore()
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the Praat analyses of the signal (spectrogram, formants, intensity).
+
+    The spectrogram is computed by chunks in the process pool.
+
+    Praat holds the GIL and runs on a single core, so a long signal is cut into overlapping chunks
+    analysed by separate processes. A frame computed by Praat only depends on the samples around the
+    sample preceding its centre, so the chunks are placed to reproduce the sample Praat would pick for
+    each frame of the whole signal: the stitched spectrogram is exactly the one of a single call.
+
+    The jobs run by the workers are defined in spiny.dsp.praat.
+
+LICENSE
+"""
+
+import math
+
+import numpy as np
+import parselmouth
+
+from spiny.dsp.praat import praat_spectrogram_chunk
+from ..extraction import check_cancelled
+from spiny.dsp.process import get_process_pool, get_process_pool_size
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Number of frames analysed by a job (10 s with the default time step)
+PRAAT_CHUNK_FRAMES = 5000
+
+# Maximal number of frames added to a chunk to align it on the frames of the whole signal
+PRAAT_MAX_EXTRA_FRAMES = 32
+
+# Maximal number of chunks analysed to reproduce the frames of a job
+PRAAT_MAX_CHUNKS = 4
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def praat_frames(nb_samples, sampling_rate, physical_width, time_step):
+    """Replicate the placement of the frames of a Praat short-term analysis (Sampled_shortTermAnalysis)
+
+    The frames are centred in the signal and the computations are done in the same order as Praat
+    does them, so the indexes are the ones Praat uses, even when a centre falls on a sample.
+
+    Parameters
+    ----------
+    nb_samples : int
+        The number of samples of the signal
+
+    sampling_rate : float
+        The sampling rate
+
+    physical_width : float
+        The duration of the analysis window (in seconds)
+
+    time_step : float
+        The time between two frames (in seconds)
+
+    Returns
+    -------
+    tuple(np.array, np.array)
+        The time of each frame (in seconds) and the index of the sample preceding its centre
+    """
+    dx = 1 / sampling_rate
+    x1 = 0.5 * dx
+    if dx * nb_samples < physical_width:
+        return np.zeros(0), np.zeros(0, dtype=int)
+
+    nb_frames = 1 + math.floor((dx * nb_samples - physical_width) / time_step)
+    t1 = x1 + 0.5 * ((nb_samples - 1) * dx - (nb_frames - 1) * time_step)
+    times = t1 + np.arange(nb_frames) * time_step
+    return times, np.floor((times - x1) / dx).astype(int)
+
+
+def plan_chunk(left_samples, nb_samples, start, end, sampling_rate, physical_width, time_step):
+    """Define the chunks of signal reproducing the frames [start, end[ of the whole signal
+
+    The frames of a chunk are centred in the chunk, so the length and the position of the chunk are
+    chosen to make its frames pick the same samples as the frames of the whole signal. When the centres
+    fall on samples, the choice of Praat depends on the rounding: the chunks are then shifted by half a
+    sample on each side, and two chunks are needed to get all the frames.
+
+    Parameters
+    ----------
+    left_samples : np.array
+        The index of the sample preceding the centre of each frame of the whole signal (see praat_frames)
+
+    nb_samples : int
+        The number of samples of the whole signal
+
+    start : int
+        The index of the first frame
+
+    end : int
+        The index following the last frame
+
+    sampling_rate : float
+        The sampling rate
+
+    physical_width : float
+        The duration of the analysis window (in seconds)
+
+    time_step : float
+        The time between two frames (in seconds)
+
+    Returns
+    -------
+    list of tuple(int, int, np.array)
+        For each chunk, the index of its first sample, its number of samples and the index in the
+        chunk of each frame [start, end[ it provides (-1 for the frames provided by another chunk)
+    """
+    nb_targets = end - start
+    targets = left_samples[start:end]
+    step = time_step * sampling_rate
+
+    # Shift (in samples) between the centres of the frames of a chunk and the ones of the whole signal
+    candidates = []
+    for nb_frames in range(nb_targets, nb_targets + PRAAT_MAX_EXTRA_FRAMES):
+        center = int((physical_width + (nb_frames - 0.5) * time_step) * sampling_rate)
+        for chunk_size in range(max(center - int(step) - 2, 1), center + int(step) + 2):
+            if 1 + math.floor(((1 / sampling_rate) * chunk_size - physical_width) / time_step) != nb_frames:
+                continue
+            shift = ((nb_samples - chunk_size) - (left_samples.shape[0] - nb_frames) * step) / 2 + start * step
+            candidates.append((abs(shift - round(shift)), chunk_size))
+
+    # The aligned chunks and the chunks shifted by half a sample are the best placements
+    placements = []
+    for key in [lambda c: c[0], lambda c: abs(c[0] - 0.5)]:
+        for _, chunk_size in sorted(candidates, key=key)[:PRAAT_MAX_EXTRA_FRAMES]:
+            _, chunk_left_samples = praat_frames(chunk_size, sampling_rate, physical_width, time_step)
+            chunk_left_samples = chunk_left_samples[:nb_targets]
+            for first_sample in np.unique(targets - chunk_left_samples):
+                placements.append((int(first_sample), chunk_size, (chunk_left_samples + first_sample) == targets))
+
+    # Cover the frames with as few chunks as possible
+    chunks = []
+    missing = np.ones(nb_targets, dtype=bool)
+    while np.any(missing) and (len(chunks) < PRAAT_MAX_CHUNKS):
+        first_sample, chunk_size, matched = max(placements, key=lambda p: np.count_nonzero(p[2] & missing))
+        matched = matched & missing
+        if not np.any(matched):
+            break
+        chunks.append((first_sample, chunk_size, np.where(matched, np.arange(nb_targets), -1)))
+        missing &= ~matched
+
+    if not np.any(missing):
+        return chunks
+
+    raise RuntimeError("The chunks can't reproduce the frames of the whole signal")
+
+
+def praat_spectrogram(
+    signal,
+    sampling_rate,
+    window_length=0.005,
+    maximum_frequency=5000,
+    time_step=0.002,
+    frequency_step=20,
+    chunk_frames=PRAAT_CHUNK_FRAMES,
+    cancel_event=None,
+):
+    """Compute the spectrogram of Praat (To Spectrogram with a Gaussian window) by chunks in the process pool
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    sampling_rate : float
+        The sampling rate
+
+    window_length : float
+        The effective duration of the analysis window (in seconds) (default: 0.005)
+
+    maximum_frequency : float
+        The maximal analysed frequency (in Hz) (default: 5000)
+
+    time_step : float
+        The time between two frames (in seconds) (default: 0.002)
+
+    frequency_step : float
+        The distance between two frequency bins (in Hz) (default: 20)
+
+    chunk_frames : int
+        The number of frames analysed by a job (default: PRAAT_CHUNK_FRAMES)
+
+    cancel_event : threading.Event
+        The event interrupting the extraction between two chunks, None if it can't be cancelled (default: None)
+
+    Returns
+    -------
+    tuple(np.array, np.array, np.array, tuple(float, float), float)
+        The log-power matrix (frames, frequency bins), the time of each frame, the frequency of each
+        bin, the frequency range and the time step
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    parameters = (window_length, maximum_frequency, time_step, frequency_step)
+
+    # Praat's adjustments of the time step and the width of the Gaussian window
+    time_step = max(time_step, window_length / math.sqrt(math.pi) / 8)
+    physical_width = 2 * window_length
+    times, left_samples = praat_frames(signal.shape[0], sampling_rate, physical_width, time_step)
+    nb_frames = times.shape[0]
+
+    # No need to pay for the dispatch
+    if (nb_frames <= chunk_frames) or (get_process_pool_size() <= 1):
+        values, (ymin, ymax, frequencies, frameshift) = praat_spectrogram_chunk(signal, sampling_rate, *parameters)
+        return values, times, frequencies, (ymin, ymax), frameshift
+
+    # Define the chunks (the padding outside the signal is never used by the kept frames)
+    jobs = []
+    for start in range(0, nb_frames, chunk_frames):
+        end = min(start + chunk_frames, nb_frames)
+        for first_sample, nb_samples, frames in plan_chunk(
+            left_samples, signal.shape[0], start, end, sampling_rate, physical_width, time_step
+        ):
+            samples = np.zeros(nb_samples)
+            lo, hi = max(first_sample, 0), min(first_sample + nb_samples, signal.shape[0])
+            samples[lo - first_sample : hi - first_sample] = signal[lo:hi]
+            future = get_process_pool().submit(praat_spectrogram_chunk, samples, sampling_rate, *parameters)
+            jobs.append((start, frames, future))
+
+    spectrum = None
+    try:
+        for start, frames, future in jobs:
+            check_cancelled(cancel_event)
+            values, (ymin, ymax, frequencies, frameshift) = future.result()
+            if spectrum is None:
+                spectrum = np.empty((nb_frames, values.shape[1]), dtype=values.dtype)
+
+            kept = frames >= 0
+            spectrum[start + np.flatnonzero(kept)] = values[frames[kept]]
+    finally:
+        for _, _, future in jobs:
+            future.cancel()
+
+    return spectrum, times, frequencies, (ymin, ymax), frameshift
+
+
+def praat_formants(
+    signal, sampling_rate, max_number_of_formants=5, maximum_formant=5500, window_length=0.025, time_step=0.0
+):
+    """Compute the formant tracks of Praat (To Formant (burg))
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    sampling_rate : float
+        The sampling rate
+
+    max_number_of_formants : float
+        The maximal number of formants (default: 5)
+
+    maximum_formant : float
+        The ceiling of the formant search range (in Hz) (default: 5500)
+
+    window_length : float
+        The effective duration of the analysis window (in seconds) (default: 0.025)
+
+    time_step : float
+        The time between two frames (in seconds), 0 to let Praat use a quarter of the window (default: 0.0)
+
+    Returns
+    -------
+    tuple(np.array, np.array)
+        The time of each frame and the frequency of each formant (frames, formants), NaN where undefined
+    """
+    sound = parselmouth.Sound(np.asarray(signal, dtype=np.float64), sampling_rate)
+    formant = sound.to_formant_burg(
+        time_step=time_step if time_step > 0 else None,
+        max_number_of_formants=max_number_of_formants,
+        maximum_formant=maximum_formant,
+        window_length=window_length,
+    )
+
+    # NOTE: the matrix of a formant contains 0 when the formant is not found in the frame
+    frequencies = np.stack(
+        [
+            parselmouth.praat.call(formant, "To Matrix", index + 1).values[0]
+            for index in range(math.ceil(max_number_of_formants))
+        ],
+        axis=1,
+    )
+    frequencies[frequencies <= 0] = np.nan
+
+    return formant.xs(), frequencies
+
+
+def praat_intensity(signal, sampling_rate, minimum_pitch=100, time_step=0.0):
+    """Compute the intensity track of Praat (To Intensity)
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    sampling_rate : float
+        The sampling rate
+
+    minimum_pitch : float
+        The lowest pitch defining the analysis window (in Hz) (default: 100)
+
+    time_step : float
+        The time between two frames (in seconds), 0 to let Praat derive it from the minimal pitch (default: 0.0)
+
+    Returns
+    -------
+    tuple(np.array, np.array)
+        The time of each frame and the intensity (in dB)
+    """
+    sound = parselmouth.Sound(np.asarray(signal, dtype=np.float64), sampling_rate)
+    intensity = sound.to_intensity(minimum_pitch=minimum_pitch, time_step=time_step if time_step > 0 else None)
+
+    return intensity.xs(), intensity.values[0]
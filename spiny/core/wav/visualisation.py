@@ -1,14 +1,17 @@
 # Python
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 # PyQTGraph
 import pyqtgraph as pg
-from pyqtgraph.Qt import QtGui, QtWidgets
+from pyqtgraph.Qt import QtCore, QtGui, QtWidgets
 from pyqtgraph.dockarea import Dock
 
 # SpINY
 from spiny.gui.items import SelectablePlotItem
 from .player import player
+from .features import feature_store, STFTParameters
 
 ###############################################################################
 # Classes
@@ -145,3 +148,147 @@ class WavDock(Dock):
 
         self.wav_plot = WavPlotWidget(name="%s waveform" % self.name)
         self.addWidget(self.wav_plot)
+
+
+class SpectralSliceDock(Dock):
+    """Dock showing the spectrum and the LPC envelope of the frame under the mouse cursor
+
+    The dock follows the mouse on any registered plot whose x axis is the time. Only the FFT of the
+    frame under the cursor is computed (see FeatureStore.getSlice), so the slice follows the mouse at
+    display rate.
+
+    The dock also shows the long-term average spectrum of the region selected on these plots. It is
+    derived from the prefix sums of the power spectrum, which are computed in the background the first
+    time a region is selected, so updating the selection costs the same whatever its length.
+
+    Attributes
+    ----------
+    slice_plot : pg.PlotWidget
+        The plot rendering the spectrum and the envelope
+
+    _parameters : STFTParameters
+        The analysis parameters of the slice
+
+    _selection : tuple(float, float)
+        The (start, end) times of the selected region, None if nothing is selected
+    """
+
+    # Maximal number of updates per second
+    RATE_LIMIT = 60
+
+    # Emitted by the worker once the prefix sums of the power spectrum are available
+    sigCumulated = QtCore.Signal(object)
+
+    def __init__(self, name, size):
+        """
+        Parameters
+        ----------
+        name : string
+            The name of the dock
+
+        size : tuple(int, int)
+            The size (width, height) of the dock
+        """
+        Dock.__init__(self, name=name, size=size)
+
+        self._parameters = STFTParameters.fromMilliseconds()
+        self._proxies = dict()
+        self._selection = None
+
+        # NOTE: a single worker, the prefix sums are computed once per analysis parameters
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spiny-ltas")
+        self.sigCumulated.connect(self._onCumulated, QtCore.Qt.ConnectionType.QueuedConnection)
+
+        self.slice_plot = pg.PlotWidget(name="%s plot" % self.name)
+        self.slice_plot.setLabel("bottom", "Frequency", units="Hz")
+        self.slice_plot.setLabel("left", "Amplitude", units="dB")
+        self.slice_plot.setMouseEnabled(x=False, y=False)
+        self.slice_plot.setYRange(-100, 0)
+        self.slice_plot.addLegend()
+
+        color = QtWidgets.QApplication.instance().palette().color(QtGui.QPalette.Text)
+        self._spectrum_curve = self.slice_plot.plot(pen=color, name="Spectrum")
+        self._envelope_curve = self.slice_plot.plot(pen=pg.mkPen({"color": "#F00", "width": 2}), name="LPC envelope")
+        self._ltas_curve = self.slice_plot.plot(pen=pg.mkPen({"color": "#08F", "width": 2}), name="Selection LTAS")
+        self.addWidget(self.slice_plot)
+
+    def setParameters(self, parameters):
+        """Set the analysis parameters (generally the ones of the rendered spectrogram to reuse its STFT)
+
+        Parameters
+        ----------
+        parameters : STFTParameters
+            The analysis parameters
+        """
+        self._parameters = parameters
+        self.updateSelection(self._selection)
+
+    def track(self, widget, view_box):
+        """Follow the mouse and the region selection on a plot
+
+        Parameters
+        ----------
+        widget : QtWidgets.QGraphicsView
+            The widget containing the plot
+
+        view_box : pg.ViewBox
+            The view box whose x axis is the time
+        """
+        if widget in self._proxies:
+            return
+
+        # NOTE: the proxy has to be kept alive and limits the rate of the updates
+        self._proxies[widget] = pg.SignalProxy(
+            widget.scene().sigMouseMoved,
+            rateLimit=SpectralSliceDock.RATE_LIMIT,
+            slot=lambda event: self.updateSlice(view_box.mapSceneToView(event[0]).x()),
+        )
+        if hasattr(view_box, "sigSelectionChanged"):
+            view_box.sigSelectionChanged.connect(self.updateSelection)
+
+    def updateSlice(self, time):
+        """Render the slice at a given time
+
+        Parameters
+        ----------
+        time : float
+            The time (in seconds)
+        """
+        if (time < 0) or (time > player._wav.shape[0] / player._sampling_rate):
+            return
+
+        frequencies, spectrum, envelope = feature_store.getSlice(self._parameters, time)
+        self._spectrum_curve.setData(frequencies, spectrum)
+        if envelope is None:
+            self._envelope_curve.clear()
+        else:
+            self._envelope_curve.setData(frequencies, envelope)
+        self.setTitle(f"{self.name()} ({time:.3f} s)")
+
+    def updateSelection(self, selection):
+        """Render the long-term average spectrum of a selected region
+
+        Parameters
+        ----------
+        selection : tuple(float, float)
+            The (start, end) times of the region (in seconds), None to clear the spectrum
+        """
+        self._selection = selection
+        if selection is None:
+            self._ltas_curve.clear()
+            return
+
+        # The prefix sums are computed once in the background, the selection is rendered when they are ready
+        parameters = self._parameters
+        if not feature_store.containsFrameFeatures(parameters):
+            future = self._executor.submit(feature_store.getFrameFeatures, parameters)
+            future.add_done_callback(lambda future: self.sigCumulated.emit(parameters))
+            return
+
+        frequencies, spectrum = feature_store.getLongTermSpectrum(parameters, *selection)
+        self._ltas_curve.setData(frequencies, spectrum)
+
+    def _onCumulated(self, parameters):
+        # The parameters have been changed since the computation started
+        if (parameters == self._parameters) and feature_store.containsFrameFeatures(parameters):
+            self.updateSelection(self._selection)
@@ -0,0 +1,244 @@
+import math
+import functools
+
+import numpy as np
+import scipy.fft
+
+from .process import check_cancelled
+from . import fft
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Constants of the Mexican hat (derivative of Gaussian, m = 2) given by Torrence and Compo (1998), table 2
+# - the ratio between the Fourier period and the scale
+MEXICAN_HAT_FOURIER_FACTOR = 2 * math.pi / math.sqrt(2.5)
+# - the reconstruction factor
+MEXICAN_HAT_C_DELTA = 3.541
+# - the value of the wavelet at 0
+MEXICAN_HAT_PSI0 = 0.867
+
+# Half support of the Mexican hat relative to its scale (the wavelet is below 1e-5 of its maximum outside)
+MEXICAN_HAT_SUPPORT = 5.0
+
+# Length of the segments of a long signal relative to the support of the largest wavelet
+CWT_SEGMENT_SUPPORTS = 8
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def mexican_hat_scales(frame_rate, first_freq, num_scales, scale_distance):
+    """Define the scales of the transform
+
+    The scales follow the convention of the wavelet prosody toolkit: the Fourier frequency of the first
+    scale is first_freq and the next scales are spaced by scale_distance octaves.
+
+    Parameters
+    ----------
+    frame_rate : float
+        The frame rate of the analysed signal (in Hz)
+
+    first_freq : float
+        The Fourier frequency of the first scale (in Hz)
+
+    num_scales : int
+        The number of scales
+
+    scale_distance : float
+        The distance between two scales (in octaves)
+
+    Returns
+    -------
+    tuple(np.array, np.array)
+        The scales (in seconds) and their Fourier frequencies (in Hz)
+    """
+    first_scale = 1 / (MEXICAN_HAT_FOURIER_FACTOR * first_freq)
+    scales = first_scale * 2 ** (np.arange(num_scales) * scale_distance)
+    return scales, 1 / (MEXICAN_HAT_FOURIER_FACTOR * scales)
+
+
+def cwt_padding(frame_rate, first_freq, num_scales, scale_distance):
+    """Get the number of frames on each side of a frame influencing its coefficients
+
+    Parameters
+    ----------
+    frame_rate : float
+        The frame rate of the analysed signal (in Hz)
+
+    first_freq : float
+        The Fourier frequency of the first scale (in Hz)
+
+    num_scales : int
+        The number of scales
+
+    scale_distance : float
+        The distance between two scales (in octaves)
+
+    Returns
+    -------
+    int
+        The half support (in frames) of the wavelet of the largest scale
+    """
+    scales, _ = mexican_hat_scales(frame_rate, first_freq, num_scales, scale_distance)
+    return math.ceil(MEXICAN_HAT_SUPPORT * scales[-1] * frame_rate)
+
+
+@functools.lru_cache(maxsize=16)
+def mexican_hat_bank(n_fft, frame_rate, first_freq, num_scales, scale_distance):
+    """Generate the spectra of the Mexican hat wavelets of all the scales
+
+    The spectra are normalised to unit energy (Torrence and Compo, 1998) and scaled so the sum of the
+    coefficients over the scales reconstructs the signal (equation 11), as the wavelet prosody toolkit
+    does. As the Mexican hat is real and even, its spectrum is real and only the bins of a real FFT
+    are kept. The result is cached and shared by all the callers.
+
+    Parameters
+    ----------
+    n_fft : int
+        The FFT length
+
+    frame_rate : float
+        The frame rate of the analysed signal (in Hz)
+
+    first_freq : float
+        The Fourier frequency of the first scale (in Hz)
+
+    num_scales : int
+        The number of scales
+
+    scale_distance : float
+        The distance between two scales (in octaves)
+
+    Returns
+    -------
+    np.array
+        The (read-only) spectra (num_scales, n_fft // 2 + 1)
+    """
+    dt = 1 / frame_rate
+    scales, _ = mexican_hat_scales(frame_rate, first_freq, num_scales, scale_distance)
+    angular_frequencies = 2 * np.pi * np.fft.rfftfreq(n_fft, dt)
+
+    # Unit energy spectra
+    scaled = scales[:, None] * angular_frequencies[None, :]
+    bank = np.sqrt(2 * np.pi * scales[:, None] / dt) * scaled**2 * np.exp(-(scaled**2) / 2) / math.sqrt(math.gamma(2.5))
+
+    # Scaling for the reconstruction
+    bank *= scale_distance * math.sqrt(dt) / (MEXICAN_HAT_C_DELTA * MEXICAN_HAT_PSI0 * np.sqrt(scales[:, None]))
+
+    bank.setflags(write=False)
+    return bank
+
+
+def iter_cwt(signal, frame_rate=200, first_freq=32, num_scales=34, scale_distance=0.25):
+    """Compute the continuous wavelet transform (Mexican hat) of the signal segment by segment
+
+    The transform of a segment is computed in the frequency domain: the FFT of the segment is multiplied
+    by the cached spectra of the wavelets of all the scales and a single batched inverse FFT gives the
+    coefficients. Each segment is extended on both sides by the support of the largest wavelet and these
+    margins, affected by the edges of the segment, are discarded. The signal is zero padded, so the
+    coefficients of a frame don't depend on the segmentation.
+
+    A signal shorter than a segment is analysed at once. Otherwise, the segments are a few times longer
+    than the support of the largest wavelet, so the memory needed doesn't depend on the length of the signal.
+
+    Parameters
+    ----------
+    signal : np.array
+        The analysed signal (1D)
+
+    frame_rate : float
+        The frame rate of the analysed signal (in Hz) (default: 200)
+
+    first_freq : float
+        The Fourier frequency of the first scale (in Hz) (default: 32)
+
+    num_scales : int
+        The number of scales (default: 34)
+
+    scale_distance : float
+        The distance between two scales (in octaves) (default: 0.25)
+
+    Yields
+    ------
+    tuple(int, np.array)
+        The index of the first frame of the segment and its coefficients (frames, num_scales)
+    """
+    signal = np.asarray(signal, dtype=np.float64)
+    nb_frames = signal.shape[0]
+    padding = cwt_padding(frame_rate, first_freq, num_scales, scale_distance)
+    segment_fft = scipy.fft.next_fast_len(CWT_SEGMENT_SUPPORTS * (2 * padding + 1), real=True)
+
+    # NOTE: the padding avoids the wrap-around of the circular convolution computed by the FFT
+    if nb_frames + padding <= segment_fft:
+        n_fft = scipy.fft.next_fast_len(nb_frames + padding, real=True)
+        bank = mexican_hat_bank(n_fft, frame_rate, first_freq, num_scales, scale_distance)
+        coefficients = fft.irfft(fft.rfft(signal, n=n_fft)[None, :] * bank, n=n_fft, axis=1)
+        yield 0, coefficients[:, :nb_frames].T
+        return
+
+    bank = mexican_hat_bank(segment_fft, frame_rate, first_freq, num_scales, scale_distance)
+    segment_frames = segment_fft - 2 * padding
+    for start in range(0, nb_frames, segment_frames):
+        end = min(start + segment_frames, nb_frames)
+
+        # The segment and its margins, zero padded outside the signal
+        offset = start - padding
+        lo, hi = max(offset, 0), min(end + padding, nb_frames)
+        segment = np.zeros(segment_fft)
+        segment[lo - offset : hi - offset] = signal[lo:hi]
+
+        coefficients = fft.irfft(fft.rfft(segment)[None, :] * bank, n=segment_fft, axis=1)
+        yield start, coefficients[:, padding : padding + end - start].T
+
+
+def cwt_analysis(
+    signal, frame_rate=200, first_freq=32, num_scales=34, scale_distance=0.25, out=None, cancel_event=None
+):
+    """Compute the continuous wavelet transform (Mexican hat) of the signal for all the scales at once
+
+    The coefficients are computed by segments (see iter_cwt) and written in a preallocated matrix, which
+    can be memory-mapped.
+
+    Parameters
+    ----------
+    signal : np.array
+        The analysed signal (1D)
+
+    frame_rate : float
+        The frame rate of the analysed signal (in Hz) (default: 200)
+
+    first_freq : float
+        The Fourier frequency of the first scale (in Hz) (default: 32)
+
+    num_scales : int
+        The number of scales (default: 34)
+
+    scale_distance : float
+        The distance between two scales (in octaves) (default: 0.25)
+
+    out : np.array
+        The matrix (frames, num_scales) receiving the coefficients, None to allocate it (default: None)
+
+    cancel_event : threading.Event
+        The event interrupting the analysis between two segments, None if it can't be cancelled (default: None)
+
+    Returns
+    -------
+    tuple(np.array, np.array, np.array)
+        The coefficients (num_scales, frames) (a view of out), the scales (in seconds) and their Fourier
+        frequencies (in Hz)
+    """
+    if out is None:
+        out = np.empty((len(signal), num_scales), dtype=np.float32)
+
+    for start, coefficients in iter_cwt(signal, frame_rate, first_freq, num_scales, scale_distance):
+        check_cancelled(cancel_event)
+        out[start : start + coefficients.shape[0]] = coefficients
+
+    scales, freqs = mexican_hat_scales(frame_rate, first_freq, num_scales, scale_distance)
+    return out.T, scales, freqs
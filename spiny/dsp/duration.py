@@ -0,0 +1,106 @@
+import numpy as np
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Labels of the segments which are not units (silences, pauses and punctuation), compared in lower case
+DURATION_SILENCE_LABELS = ["", " ", "#", "_", "-", "+", "*", ".", ",", "?"]
+DURATION_SILENCE_LABELS += ["sil", "!sil", "pau", "!pau", "sp", "<s>", "</s>", "<p>", "<p:>"]
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def tier_duration_signal(segments, nb_frames, frame_rate, bump=False):
+    """Generate the duration signal of a tier
+
+    Each unit contributes the log of its duration (in frames). By default, the signal takes on each frame
+    the value of the unit covering it. With bump, the value is reached at the centre of the unit and the
+    signal goes down to 0 at its boundaries, so two adjacent units are separated by a valley. The silences
+    (see DURATION_SILENCE_LABELS) and the frames outside of any unit are 0.
+
+    Parameters
+    ----------
+    segments : sequence of tuple(float, float, str)
+        The (start time, end time, label) of the segments of the tier (times in seconds)
+
+    nb_frames : int
+        The number of frames of the signal
+
+    frame_rate : float
+        The frame rate of the signal (in Hz)
+
+    bump : bool
+        Emphasize the differences between adjacent units (default: False)
+
+    Returns
+    -------
+    np.array
+        The duration signal (nb_frames)
+    """
+    signal = np.zeros(nb_frames)
+    if len(segments) == 0:
+        return signal
+
+    segments = np.asarray(segments, dtype=object).reshape(-1, 3)
+    segments = segments[np.argsort(segments[:, 0].astype(np.float64), kind="stable")]
+    starts = np.clip(np.round(segments[:, 0].astype(np.float64) * frame_rate).astype(int), 0, nb_frames)
+    ends = np.clip(np.round(segments[:, 1].astype(np.float64) * frame_rate).astype(int), 0, nb_frames)
+
+    # Keep the units
+    labels = np.char.lower(segments[:, 2].astype(str))
+    is_unit = np.logical_not(np.isin(labels, DURATION_SILENCE_LABELS)) & (ends > starts)
+    starts, ends = starts[is_unit], ends[is_unit]
+    lengths = ends - starts
+    durations = np.log(lengths + 1.0)
+
+    if bump:
+        # Triangles going through 0 at the boundaries and the duration at the centre of the units
+        points = np.stack([starts, (starts + ends) / 2, ends], axis=1).ravel()
+        values = np.stack([np.zeros_like(durations), durations, np.zeros_like(durations)], axis=1).ravel()
+        return np.interp(np.arange(nb_frames), points, values) if points.shape[0] > 0 else signal
+
+    # Frames covered by each unit
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    signal[np.repeat(starts, lengths) + offsets] = np.repeat(durations, lengths)
+
+    return signal
+
+
+def duration_signal(tiers, nb_frames, frame_rate, delta=False, bump=False):
+    """Generate the duration signal of the tiers (the sum of the duration signal of each tier)
+
+    Parameters
+    ----------
+    tiers : list of sequence of tuple(float, float, str)
+        The (start time, end time, label) of the segments of each tier (times in seconds)
+
+    nb_frames : int
+        The number of frames of the signal
+
+    frame_rate : float
+        The frame rate of the signal (in Hz)
+
+    delta : bool
+        Use the point-wise difference of the duration signal (default: False)
+
+    bump : bool
+        Emphasize the differences between adjacent units (default: False)
+
+    Returns
+    -------
+    np.array
+        The duration signal (nb_frames)
+    """
+    signal = np.zeros(nb_frames)
+    for segments in tiers:
+        signal += tier_duration_signal(segments, nb_frames, frame_rate, bump)
+
+    if delta and (nb_frames > 0):
+        signal = np.diff(signal, prepend=signal[0])
+
+    return signal
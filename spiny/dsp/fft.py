@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the FFT backends used by the spectral analyses.
+
+    All the transforms of the analyses go through rfft/fft/irfft so the backend and the number of cores
+    used by the spectral analyses are defined in a single place (see set_fft_backend and set_nb_workers).
+
+LICENSE
+"""
+
+import os
+import threading
+
+import numpy as np
+import scipy.fft
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Available backends (name => (rfft, fft, irfft), all with the signature f(x, n, axis, workers))
+FFT_BACKENDS = {
+    "scipy": (
+        lambda x, n, axis, workers: scipy.fft.rfft(x, n=n, axis=axis, workers=workers),
+        lambda x, n, axis, workers: scipy.fft.fft(x, n=n, axis=axis, workers=workers),
+        lambda x, n, axis, workers: scipy.fft.irfft(x, n=n, axis=axis, workers=workers),
+    ),
+    # NOTE: numpy is always single threaded and computes in double precision
+    "numpy": (
+        lambda x, n, axis, workers: np.fft.rfft(x, n=n, axis=axis),
+        lambda x, n, axis, workers: np.fft.fft(x, n=n, axis=axis),
+        lambda x, n, axis, workers: np.fft.irfft(x, n=n, axis=axis),
+    ),
+}
+
+# The current backend and number of workers
+_BACKEND = "scipy"
+_NB_WORKERS = os.cpu_count()
+
+# Per thread number of workers (the threads of the DSP pool already run in parallel)
+_LOCAL = threading.local()
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def set_fft_backend(name):
+    """Select the backend used by all the spectral analyses
+
+    Parameters
+    ----------
+    name : str
+        The name of the backend (see FFT_BACKENDS)
+    """
+    global _BACKEND
+    if name not in FFT_BACKENDS:
+        raise ValueError(f"Unknown FFT backend {name}, the available ones are {list(FFT_BACKENDS.keys())}")
+    _BACKEND = name
+
+
+def get_fft_backend():
+    """Get the name of the backend used by all the spectral analyses
+
+    Returns
+    -------
+    str
+        The name of the backend
+    """
+    return _BACKEND
+
+
+def set_nb_workers(nb_workers):
+    """Set the number of cores used by the spectral analyses
+
+    This number is the size of the DSP pool running the blocks of frames and the number of workers
+    of a transform computed outside of the pool. The pool is resized on its next use.
+
+    Parameters
+    ----------
+    nb_workers : int
+        The number of cores, None to use all of them
+    """
+    global _NB_WORKERS
+    _NB_WORKERS = nb_workers if nb_workers is not None else os.cpu_count()
+
+
+def get_nb_workers(in_pool=True):
+    """Get the number of workers a transform can use in the current thread
+
+    Parameters
+    ----------
+    in_pool : bool
+        Take into account that the threads of the DSP pool are single threaded (default: True)
+
+    Returns
+    -------
+    int
+        The number of workers
+    """
+    if in_pool:
+        return getattr(_LOCAL, "nb_workers", _NB_WORKERS)
+    return _NB_WORKERS
+
+
+def mark_pool_thread():
+    """Initialiser of the threads of the DSP pool, their transforms are single threaded"""
+    _LOCAL.nb_workers = 1
+
+
+def rfft(x, n=None, axis=-1):
+    """Compute the FFT of a real input with the current backend
+
+    Parameters
+    ----------
+    x : np.array
+        The real input
+
+    n : int
+        The FFT length, None to use the length of x along axis (default: None)
+
+    axis : int
+        The axis of the transform (default: -1)
+
+    Returns
+    -------
+    np.array
+        The n // 2 + 1 first bins of the transform
+    """
+    return FFT_BACKENDS[_BACKEND][0](x, n, axis, get_nb_workers())
+
+
+def fft(x, n=None, axis=-1):
+    """Compute the FFT of a complex input with the current backend
+
+    Parameters
+    ----------
+    x : np.array
+        The input
+
+    n : int
+        The FFT length, None to use the length of x along axis (default: None)
+
+    axis : int
+        The axis of the transform (default: -1)
+
+    Returns
+    -------
+    np.array
+        The transform
+    """
+    return FFT_BACKENDS[_BACKEND][1](x, n, axis, get_nb_workers())
+
+
+def irfft(x, n=None, axis=-1):
+    """Compute the inverse FFT of the positive frequencies of a real signal with the current backend
+
+    Parameters
+    ----------
+    x : np.array
+        The n // 2 + 1 first bins of the transform
+
+    n : int
+        The length of the output, None to use 2 * (m - 1) where m is the length of x along axis (default: None)
+
+    axis : int
+        The axis of the transform (default: -1)
+
+    Returns
+    -------
+    np.array
+        The real signal
+    """
+    return FFT_BACKENDS[_BACKEND][2](x, n, axis, get_nb_workers())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the Praat jobs run by the process pool (see spiny.dsp.process.get_process_pool).
+
+    The workers are spawned and import this module to get the jobs. Importing spiny.core creates Qt
+    widgets, which can't be done in a worker, so this module must only depend on the analysis libraries.
+    The chunks are planned and stitched by spiny.core.wav.praat.
+
+LICENSE
+"""
+
+import numpy as np
+import parselmouth
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def praat_spectrogram_chunk(samples, sampling_rate, window_length, maximum_frequency, time_step, frequency_step):
+    """Compute the Praat spectrogram (in dB) of a chunk of signal
+
+    Parameters
+    ----------
+    samples : np.array
+        The samples of the chunk
+
+    sampling_rate : float
+        The sampling rate
+
+    window_length : float
+        The effective duration of the (Gaussian) analysis window (in seconds)
+
+    maximum_frequency : float
+        The maximal analysed frequency (in Hz)
+
+    time_step : float
+        The time between two frames (in seconds)
+
+    frequency_step : float
+        The distance between two frequency bins (in Hz)
+
+    Returns
+    -------
+    tuple(np.array, tuple(float, float, np.array, float))
+        The log-power matrix (frames, frequency bins) and the axes (minimal and maximal frequencies,
+        frequency of each bin and time step)
+    """
+    sound = parselmouth.Sound(samples, sampling_rate)
+    spectrogram = sound.to_spectrogram(
+        window_length=window_length,
+        maximum_frequency=maximum_frequency,
+        time_step=time_step,
+        frequency_step=frequency_step,
+    )
+    # NOTE: the padding of the chunks gives silent frames (which are discarded)
+    with np.errstate(divide="ignore"):
+        values = 10 * np.log10(spectrogram.values.T)
+
+    # NOTE: the spectrogram itself can't be sent back to the main process
+    return values, (spectrogram.ymin, spectrogram.ymax, spectrogram.ys(), spectrogram.get_time_step())
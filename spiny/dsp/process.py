@@ -0,0 +1,682 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the signal processing helpers shared by the data plugins.
+
+    Like all the modules of spiny.dsp, it doesn't depend on Qt nor on the player, so it can be imported
+    by the workers of the process pool.
+
+    The short-term analysis follows the convention of librosa.stft with center=True and a constant
+    (zero) padding. Frames can be computed for any range [start, end[ without touching the rest of
+    the signal, which allows the plugins to only compute what is actually rendered.
+
+LICENSE
+"""
+
+import functools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+import scipy.signal
+import librosa
+
+from . import fft
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Number of frames processed by a job of the chunked STFT
+STFT_BLOCK_SIZE = 512
+
+# Pool shared by the chunked analyses (the FFTs release the GIL so threads are enough)
+_POOL = None
+_POOL_SIZE = None
+
+# Pool of the analyses holding the GIL (Praat)
+_PROCESS_POOL = None
+_PROCESS_POOL_SIZE = None
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class ExtractionCancelled(Exception):
+    """Raised by an extraction job which noticed it has been cancelled"""
+
+    pass
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def check_cancelled(cancel_event):
+    """Interrupt the current extraction job if it has been cancelled
+
+    The extractors call this function between two steps of their computation.
+
+    Parameters
+    ----------
+    cancel_event : threading.Event
+        The event set when the job is cancelled, None if the job can't be cancelled
+
+    Raises
+    ------
+    ExtractionCancelled
+        If the job has been cancelled
+    """
+    if (cancel_event is not None) and cancel_event.is_set():
+        raise ExtractionCancelled()
+
+
+def frame_count(n_samples, n_fft, hop_length):
+    """Get the number of frames of a centred short-term analysis
+
+    Parameters
+    ----------
+    n_samples : int
+        The number of samples of the signal
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    Returns
+    -------
+    int
+        The number of frames
+    """
+    return 1 + (n_samples + 2 * (n_fft // 2) - n_fft) // hop_length
+
+
+@functools.lru_cache(maxsize=16)
+def analysis_window(window, win_length, n_fft, dtype=np.float64):
+    """Generate the analysis window centred and zero padded to the FFT length
+
+    The result is cached and read-only as it is shared by all the callers.
+
+    Parameters
+    ----------
+    window : str
+        The name of the window (see scipy.signal.get_window)
+
+    win_length : int
+        The window length (in samples)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    dtype : np.dtype
+        The type of the window coefficients (default: np.float64)
+
+    Returns
+    -------
+    np.array
+        The padded window
+    """
+    fft_window = librosa.filters.get_window(window, win_length, fftbins=True)
+    fft_window = librosa.util.pad_center(fft_window, size=n_fft).astype(dtype)
+    fft_window.setflags(write=False)
+    return fft_window
+
+
+def frame_signal(signal, n_fft, hop_length, start, end):
+    """Get the frames [start, end[ of the centred and zero padded signal
+
+    Only the part of the signal covered by the frames is padded (and therefore copied) when the
+    frames are overlapping the signal boundaries. Otherwise, the frames are a strided view on the signal.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    start : int
+        The index of the first frame
+
+    end : int
+        The index following the last frame
+
+    Returns
+    -------
+    np.array
+        A read-only matrix (end - start, n_fft) of frames
+    """
+    offset = start * hop_length - n_fft // 2
+    length = (end - start - 1) * hop_length + n_fft
+    lo = max(offset, 0)
+    hi = min(offset + length, signal.shape[0])
+
+    if (lo == offset) and (hi == offset + length):
+        chunk = signal[lo:hi]
+    else:
+        chunk = np.zeros(length, dtype=signal.dtype)
+        if hi > lo:
+            chunk[lo - offset : hi - offset] = signal[lo:hi]
+
+    return np.lib.stride_tricks.sliding_window_view(chunk, n_fft)[::hop_length]
+
+
+def stft(signal, n_fft, hop_length, win_length, window, start=0, end=None):
+    """Compute the short-term Fourier transform of the frames [start, end[
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    start : int
+        The index of the first frame (default: 0)
+
+    end : int
+        The index following the last frame, None means the last frame of the signal (default: None)
+
+    Returns
+    -------
+    np.array
+        The complex spectrum matrix (end - start, n_fft // 2 + 1)
+    """
+    if end is None:
+        end = frame_count(signal.shape[0], n_fft, hop_length)
+
+    frames = frame_signal(signal, n_fft, hop_length, start, end)
+    return fft.rfft(frames * analysis_window(window, win_length, n_fft), axis=1)
+
+
+def get_pool():
+    """Get the thread pool shared by the chunked analyses
+
+    The pool is (re)created with the number of workers defined by fft.set_nb_workers.
+
+    Returns
+    -------
+    ThreadPoolExecutor
+        The pool
+    """
+    global _POOL, _POOL_SIZE
+    nb_workers = fft.get_nb_workers(in_pool=False)
+    if (_POOL is None) or (_POOL_SIZE != nb_workers):
+        if _POOL is not None:
+            _POOL.shutdown(wait=False)
+        _POOL = ThreadPoolExecutor(
+            max_workers=nb_workers, thread_name_prefix="spiny-dsp", initializer=fft.mark_pool_thread
+        )
+        _POOL_SIZE = nb_workers
+    return _POOL
+
+
+def get_process_pool_size():
+    """Get the number of workers of the process pool (without creating it)
+
+    Returns
+    -------
+    int
+        The number of workers
+    """
+    return fft.get_nb_workers(in_pool=False)
+
+
+def get_process_pool():
+    """Get the process pool shared by the analyses which can't run concurrently in threads
+
+    The pool is (re)created with the number of workers defined by fft.set_nb_workers. The workers are
+    spawned, a fork of the GUI (and of its threads) is not safe.
+
+    Returns
+    -------
+    ProcessPoolExecutor
+        The pool
+    """
+    global _PROCESS_POOL, _PROCESS_POOL_SIZE
+    nb_workers = get_process_pool_size()
+    if (_PROCESS_POOL is None) or (_PROCESS_POOL_SIZE != nb_workers):
+        if _PROCESS_POOL is not None:
+            _PROCESS_POOL.shutdown(wait=False)
+        _PROCESS_POOL = ProcessPoolExecutor(max_workers=nb_workers, mp_context=multiprocessing.get_context("spawn"))
+        _PROCESS_POOL_SIZE = nb_workers
+    return _PROCESS_POOL
+
+
+def chunked_stft(
+    signal,
+    n_fft,
+    hop_length,
+    win_length,
+    window,
+    start=0,
+    end=None,
+    band=None,
+    transform=None,
+    out=None,
+    block_size=STFT_BLOCK_SIZE,
+):
+    """Compute the short-term Fourier transform of the frames [start, end[ concurrently
+
+    The frames are split in blocks of block_size frames. As each block gets its own frames (including the
+    overlap with the neighbouring blocks), the blocks are independent and are computed by the shared thread
+    pool. The bins outside the band are dropped right after the FFT of a block and, if a transform is given,
+    the block is converted (magnitude in dB, power, ...) into the output matrix at once, so the complex
+    spectrum of the whole range never exists. The analysis is done in the precision of the output matrix.
+    Without band, transform nor output matrix, the result is identical to stft.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    start : int
+        The index of the first frame (default: 0)
+
+    end : int
+        The index following the last frame, None means the last frame of the signal (default: None)
+
+    band : tuple(int, int)
+        The range [first bin, last bin[ to keep, None to keep all the bins (default: None)
+
+    transform : function
+        The function transform(spectrum, block) filling a block of the output matrix from its complex
+        spectrum, None to keep the complex spectrum (default: None)
+
+    out : np.array
+        The output matrix (end - start, band size), None to allocate a complex128 one (default: None)
+
+    block_size : int
+        The number of frames per block (default: STFT_BLOCK_SIZE)
+
+    Returns
+    -------
+    np.array
+        The output matrix (end - start, band size)
+    """
+    if end is None:
+        end = frame_count(signal.shape[0], n_fft, hop_length)
+    if band is None:
+        band = (0, n_fft // 2 + 1)
+    if out is None:
+        out = np.empty((end - start, band[1] - band[0]), dtype=np.complex128)
+
+    # NOTE: a float32 (or complex64) output means a single precision analysis
+    real_dtype = np.finfo(out.dtype).dtype
+    signal = signal.astype(real_dtype, copy=False)
+    fft_window = analysis_window(window, win_length, n_fft, real_dtype.type)
+
+    def _process_block(block_start, block_end):
+        frames = frame_signal(signal, n_fft, hop_length, block_start, block_end)
+        spectrum = fft.rfft(frames * fft_window, axis=1)[:, band[0] : band[1]]
+
+        block = out[block_start - start : block_end - start]
+        if transform is None:
+            block[...] = spectrum
+        else:
+            transform(spectrum, block)
+
+    run_blocks(_process_block, start, end, block_size)
+
+    return out
+
+
+def run_blocks(process_block, start, end, block_size):
+    """Apply process_block(block_start, block_end) on the blocks of frames covering [start, end[
+
+    The blocks are dispatched to the shared thread pool unless there is only one block.
+
+    Parameters
+    ----------
+    process_block : function
+        The function processing a block, the blocks are independent
+
+    start : int
+        The index of the first frame
+
+    end : int
+        The index following the last frame
+
+    block_size : int
+        The number of frames per block
+    """
+    if end - start <= block_size:
+        process_block(start, end)
+        return
+
+    blocks = [(block_start, min(block_start + block_size, end)) for block_start in range(start, end, block_size)]
+
+    # NOTE: list() propagates the exceptions raised by the jobs
+    list(get_pool().map(lambda block: process_block(*block), blocks))
+
+
+def stft_db(
+    signal,
+    n_fft,
+    hop_length,
+    win_length,
+    window,
+    start=0,
+    end=None,
+    band=None,
+    ref=1.0,
+    amin=1e-5,
+    out=None,
+    block_size=STFT_BLOCK_SIZE,
+):
+    """Compute the log-magnitude (in dB) of the frames [start, end[ restricted to a frequency band
+
+    The analysis is done by chunked_stft in single precision (float32/complex64). The FFT bins outside
+    the band are dropped right after the FFT and the magnitude, the normalisation and the dB conversion
+    are done in place in the output matrix, so the memory scales with the band and not with the FFT
+    length. The values are the same as librosa.amplitude_to_db(np.abs(X) / ref, amin=amin, top_db=None).
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    start : int
+        The index of the first frame (default: 0)
+
+    end : int
+        The index following the last frame, None means the last frame of the signal (default: None)
+
+    band : tuple(int, int)
+        The range [first bin, last bin[ to keep, None to keep all the bins (default: None)
+
+    ref : float
+        The magnitude corresponding to 0 dB (default: 1.0)
+
+    amin : float
+        The minimal normalised magnitude (default: 1e-5)
+
+    out : np.array
+        The float32 output matrix (end - start, band size), None to allocate it (default: None)
+
+    block_size : int
+        The number of frames per block (default: STFT_BLOCK_SIZE)
+
+    Returns
+    -------
+    np.array
+        The log-magnitude matrix (end - start, band size)
+    """
+    if end is None:
+        end = frame_count(signal.shape[0], n_fft, hop_length)
+    if band is None:
+        band = (0, n_fft // 2 + 1)
+    if out is None:
+        out = np.empty((end - start, band[1] - band[0]), dtype=np.float32)
+
+    def _to_db(spectrum, block):
+        np.abs(spectrum, out=block)
+        block *= 1 / ref
+        np.maximum(block, amin, out=block)
+        np.log10(block, out=block)
+        block *= 20
+
+    return chunked_stft(signal, n_fft, hop_length, win_length, window, start, end, band, _to_db, out, block_size)
+
+
+def iter_stft_db(
+    signal,
+    n_fft,
+    hop_length,
+    win_length,
+    window,
+    start=0,
+    end=None,
+    band=None,
+    ref=1.0,
+    amin=1e-5,
+    block_size=STFT_BLOCK_SIZE,
+):
+    """Stream the log-magnitude (in dB) of the frames [start, end[ block by block
+
+    The blocks are computed by the shared thread pool with a bounded look-ahead (one block per worker),
+    so the memory used doesn't depend on the number of frames. As only the samples covered by a block are
+    read, the signal can be a memory-mapped array. A fixed reference is used for the normalisation so the
+    blocks don't depend on each other.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    start : int
+        The index of the first frame (default: 0)
+
+    end : int
+        The index following the last frame, None means the last frame of the signal (default: None)
+
+    band : tuple(int, int)
+        The range [first bin, last bin[ to keep, None to keep all the bins (default: None)
+
+    ref : float
+        The magnitude corresponding to 0 dB (default: 1.0)
+
+    amin : float
+        The minimal normalised magnitude (default: 1e-5)
+
+    block_size : int
+        The number of frames per block (default: STFT_BLOCK_SIZE)
+
+    Yields
+    ------
+    tuple(int, np.array)
+        The index of the first frame of the block and the log-magnitude of the frames of the block
+    """
+    if end is None:
+        end = frame_count(signal.shape[0], n_fft, hop_length)
+
+    def _process_block(block_start):
+        block_end = min(block_start + block_size, end)
+        # NOTE: the block size is given so the block is never dispatched again from a worker of the pool
+        return stft_db(
+            signal, n_fft, hop_length, win_length, window, block_start, block_end, band, ref, amin, None, block_size
+        )
+
+    pool = get_pool()
+    pending = deque()
+    for block_start in range(start, end, block_size):
+        pending.append((block_start, pool.submit(_process_block, block_start)))
+        if len(pending) >= _POOL_SIZE:
+            first_frame, future = pending.popleft()
+            yield first_frame, future.result()
+
+    while pending:
+        first_frame, future = pending.popleft()
+        yield first_frame, future.result()
+
+
+@functools.lru_cache(maxsize=16)
+def dpss_tapers(win_length, n_fft, time_bandwidth, nb_tapers, dtype=np.float64):
+    """Generate the DPSS (Slepian) tapers centred and zero padded to the FFT length
+
+    The result is cached and read-only as it is shared by all the callers.
+
+    Parameters
+    ----------
+    win_length : int
+        The taper length (in samples)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    time_bandwidth : float
+        The time-half bandwidth product (NW)
+
+    nb_tapers : int
+        The number of tapers (generally 2 * NW - 1)
+
+    dtype : np.dtype
+        The type of the taper coefficients (default: np.float64)
+
+    Returns
+    -------
+    np.array
+        The padded tapers (nb_tapers, n_fft)
+    """
+    tapers = scipy.signal.windows.dpss(win_length, time_bandwidth, Kmax=nb_tapers, sym=False)
+    tapers = np.atleast_2d(tapers)
+    offset = (n_fft - win_length) // 2
+    padded_tapers = np.zeros((nb_tapers, n_fft), dtype=dtype)
+    padded_tapers[:, offset : offset + win_length] = tapers
+    padded_tapers.setflags(write=False)
+    return padded_tapers
+
+
+def multitaper_db(
+    signal,
+    n_fft,
+    hop_length,
+    win_length,
+    time_bandwidth,
+    nb_tapers,
+    start=0,
+    end=None,
+    band=None,
+    ref=1.0,
+    amin=1e-5,
+    block_size=STFT_BLOCK_SIZE,
+):
+    """Compute the multitaper log-magnitude (in dB) of the frames [start, end[ restricted to a frequency band
+
+    The power spectrum of a frame is the average of the power spectra obtained with each DPSS taper. The
+    tapers are applied by broadcasting on the strided view of the frames, so all the tapered frames of a
+    block are transformed by a single batched real FFT. The cost is therefore about nb_tapers times the
+    one of the STFT.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The taper length (in samples)
+
+    time_bandwidth : float
+        The time-half bandwidth product (NW)
+
+    nb_tapers : int
+        The number of tapers
+
+    start : int
+        The index of the first frame (default: 0)
+
+    end : int
+        The index following the last frame, None means the last frame of the signal (default: None)
+
+    band : tuple(int, int)
+        The range [first bin, last bin[ to keep, None to keep all the bins (default: None)
+
+    ref : float
+        The magnitude corresponding to 0 dB (default: 1.0)
+
+    amin : float
+        The minimal normalised magnitude (default: 1e-5)
+
+    block_size : int
+        The number of frames per block (default: STFT_BLOCK_SIZE)
+
+    Returns
+    -------
+    np.array
+        The log-magnitude matrix (end - start, band size)
+    """
+    if end is None:
+        end = frame_count(signal.shape[0], n_fft, hop_length)
+    if band is None:
+        band = (0, n_fft // 2 + 1)
+    out = np.empty((end - start, band[1] - band[0]), dtype=np.float32)
+
+    signal = signal.astype(np.float32, copy=False)
+    tapers = dpss_tapers(win_length, n_fft, time_bandwidth, nb_tapers, np.float32)
+
+    def _process_block(block_start, block_end):
+        frames = frame_signal(signal, n_fft, hop_length, block_start, block_end)
+
+        # (frames, tapers, n_fft) => (frames, tapers, bins)
+        spectra = fft.rfft(frames[:, None, :] * tapers[None, :, :], axis=-1)[:, :, band[0] : band[1]]
+        power = spectra.real**2 + spectra.imag**2
+
+        block = out[block_start - start : block_end - start]
+        np.mean(power, axis=1, out=block)
+        block *= 1 / ref**2
+        np.maximum(block, amin**2, out=block)
+        np.log10(block, out=block)
+        block *= 10
+
+    run_blocks(_process_block, start, end, block_size)
+
+    return out
@@ -0,0 +1,69 @@
+import numpy as np
+import scipy.signal
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Frequency band (in Hz) of the scales defining the prosodic prominence (from the syllables to the words)
+PROMINENCE_BAND = (1.0, 8.0)
+
+# Minimal distance (in seconds) between two peaks (or two valleys) of the prominence signal
+PEAK_MIN_DISTANCE = 0.1
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def prominence_signal(cwt, freqs, band=PROMINENCE_BAND):
+    """Average the scales of the CWT whose Fourier frequency is in the band
+
+    Parameters
+    ----------
+    cwt : np.array
+        The coefficients (scales, frames)
+
+    freqs : np.array
+        The Fourier frequency of each scale (in Hz)
+
+    band : tuple(float, float)
+        The frequency band (in Hz) (default: PROMINENCE_BAND)
+
+    Returns
+    -------
+    np.array
+        The prominence signal (frames)
+    """
+    selected = (freqs >= band[0]) & (freqs <= band[1])
+    if not np.any(selected):
+        raise ValueError(f"No scale has a frequency in [{band[0]}, {band[1]}] Hz")
+
+    return np.mean(cwt[selected], axis=0)
+
+
+def pick_peaks(signal, frame_rate, min_distance=PEAK_MIN_DISTANCE):
+    """Find the (positive) peaks and the (negative) valleys of the prominence signal
+
+    Parameters
+    ----------
+    signal : np.array
+        The prominence signal
+
+    frame_rate : float
+        The frame rate of the signal (in Hz)
+
+    min_distance : float
+        The minimal distance (in seconds) between two peaks or two valleys (default: PEAK_MIN_DISTANCE)
+
+    Returns
+    -------
+    tuple(np.array, np.array)
+        The index of the frame of each peak and of each valley
+    """
+    distance = max(int(round(min_distance * frame_rate)), 1)
+    peaks, _ = scipy.signal.find_peaks(signal, height=0, distance=distance)
+    valleys, _ = scipy.signal.find_peaks(-signal, height=0, distance=distance)
+    return peaks, valleys
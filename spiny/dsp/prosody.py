@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the stages of the prosody pipeline (energy, F0, duration, feature combination and CWT).
+
+    The stages are shared by the wavelet plugin, which caches them for the signal of the player, and by
+    the prosody labeller, whose workers run the whole pipeline on a wav file (see extract_prominence). The
+    parameters of all the stages are gathered in ProsodyParameters.
+
+LICENSE
+"""
+
+from typing import NamedTuple
+
+import numpy as np
+import soundfile
+
+# Wavelet part
+# - acoustic features
+from wavelet_prosody_toolkit.prosody_tools import f0_processing
+
+# - helpers
+from wavelet_prosody_toolkit.prosody_tools import misc
+from wavelet_prosody_toolkit.prosody_tools import smooth_and_interp
+
+from . import fft
+from .spectral import compute_band_energy
+from .duration import duration_signal
+from .cwt import cwt_analysis
+from .prominence import PROMINENCE_BAND, prominence_signal
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Analysis of the energy (half of the FFT length in samples and window length in ms, as the spectrum plugin)
+ENERGY_FFT_LENGTH = 2048
+ENERGY_FRAMELENGTH = 30
+ENERGY_WINDOW = "hamming"
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class ProsodyParameters(NamedTuple):
+    """Parameters of the prosody pipeline"""
+
+    frameshift: float = 1 / 200.0
+
+    # Energy
+    energy_band: tuple = (200, 5000)
+    smooth_energy: bool = True
+
+    # F0
+    min_f0: float = 50.0
+    max_f0: float = 400.0
+    harmonics: float = 50.0
+    voicing: float = 80.0
+    pitch_tracker: str = "inst_freq"
+
+    # Duration
+    delta_duration: bool = False
+    bump_duration: bool = False
+
+    # Feature combination (F0, energy, duration)
+    weights: tuple = (1.0, 1.0, 0.5)
+    combination: str = "sum"
+    detrend: bool = True
+
+    # Wavelet (Mexican hat)
+    first_freq: float = 32.0
+    num_scales: int = 34
+    scale_distance: float = 0.25
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def energy_analysis(sampling_rate, frameshift):
+    """Get the short-term analysis of the energy
+
+    Parameters
+    ----------
+    sampling_rate : float
+        The sampling rate
+
+    frameshift : float
+        The frameshift (in seconds)
+
+    Returns
+    -------
+    tuple(int, int, int, str)
+        The FFT length, the frameshift and the window length (in samples) and the name of the window
+    """
+    return (
+        2 * ENERGY_FFT_LENGTH,
+        int(frameshift * sampling_rate),
+        int(0.001 * ENERGY_FRAMELENGTH * sampling_rate),
+        ENERGY_WINDOW,
+    )
+
+
+def extract_energy(signal, sampling_rate, parameters):
+    """Compute the RMS energy of the band of each frame
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    sampling_rate : float
+        The sampling rate
+
+    parameters : ProsodyParameters
+        The parameters of the pipeline
+
+    Returns
+    -------
+    np.array
+        The RMS energy of each frame (to be smoothed by smooth_energy)
+    """
+    n_fft, hop_length, win_length, window = energy_analysis(sampling_rate, parameters.frameshift)
+    bins = tuple(int(frequency * n_fft / sampling_rate) for frequency in parameters.energy_band)
+    return compute_band_energy(signal, n_fft, hop_length, win_length, window, bins)
+
+
+def smooth_energy(energy, smooth=True):
+    """Smooth the energy (peak smoothing)
+
+    Parameters
+    ----------
+    energy : np.array
+        The RMS energy of each frame
+
+    smooth : bool
+        Whether the energy is smoothed (default: True)
+
+    Returns
+    -------
+    np.array
+        The smoothed energy
+    """
+    if not smooth:
+        return energy
+
+    return smooth_and_interp.peak_smooth(energy, 30, 3)  # FIXME: 30? 3?
+
+
+def f0_range(min_f0, max_f0):
+    """Get the F0 range given to the tracker (the maximal F0 is at least 10 Hz and above the minimal one)
+
+    Parameters
+    ----------
+    min_f0 : float
+        The minimal F0 (in Hz)
+
+    max_f0 : float
+        The maximal F0 (in Hz)
+
+    Returns
+    -------
+    tuple(float, float)
+        The minimal and the maximal F0 (in Hz)
+    """
+    max_f0 = np.max([max_f0, 10.0])
+    min_f0 = np.min([max_f0 - 1.0, min_f0])
+    return min_f0, max_f0
+
+
+def extract_f0(signal, sampling_rate, parameters):
+    """Track the (raw) F0
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    sampling_rate : float
+        The sampling rate
+
+    parameters : ProsodyParameters
+        The parameters of the pipeline
+
+    Returns
+    -------
+    np.array
+        The raw F0 (to be processed by f0_processing.process)
+    """
+    min_f0, max_f0 = f0_range(parameters.min_f0, parameters.max_f0)
+    return f0_processing.extract_f0(
+        signal, sampling_rate, min_f0, max_f0, parameters.harmonics, parameters.voicing, parameters.pitch_tracker
+    )
+
+
+def process_f0(raw_pitch):
+    """Clean and interpolate the raw F0
+
+    Parameters
+    ----------
+    raw_pitch : np.array
+        The raw F0 (see extract_f0)
+
+    Returns
+    -------
+    np.array
+        The interpolated F0
+    """
+    # FIXME: fix errors, smooth and interpolate
+    return f0_processing.process(raw_pitch)
+
+
+def extract_duration(duration_tiers, nb_samples, sampling_rate, parameters):
+    """Generate the duration signal of the tiers at the frameshift of the pipeline
+
+    Parameters
+    ----------
+    duration_tiers : list of tuple
+        The segments (start time, end time, label) of each tier generating the duration signal
+
+    nb_samples : int
+        The number of samples of the signal
+
+    sampling_rate : float
+        The sampling rate
+
+    parameters : ProsodyParameters
+        The parameters of the pipeline
+
+    Returns
+    -------
+    np.array
+        The duration signal, None if there is no tier
+    """
+    if not duration_tiers:
+        return None
+
+    nb_frames = int(nb_samples / sampling_rate / parameters.frameshift)
+    return duration_signal(
+        duration_tiers,
+        nb_frames,
+        1 / parameters.frameshift,
+        delta=parameters.delta_duration,
+        bump=parameters.bump_duration,
+    )
+
+
+def combine_features(features, weights, combination="sum", detrend=True):
+    """Combine the weighted features into the signal analysed by the wavelet transform
+
+    Parameters
+    ----------
+    features : list of np.array
+        The features (in the order of the weights, the missing ones being None)
+
+    weights : tuple of float
+        The weight of each feature
+
+    combination : str
+        The combination of the normalised features, "sum" or "product" (default: "sum")
+
+    detrend : bool
+        Whether the bias of the combined signal is removed (default: True)
+
+    Returns
+    -------
+    np.array
+        The combined signal
+    """
+    weights = [weight for feature, weight in zip(features, weights) if feature is not None]
+    features = [feature for feature in features if feature is not None]
+    nb_frames = np.min([feature.shape[0] for feature in features])
+    features = [feature[:nb_frames] for feature in features]
+
+    if combination == "product":
+        params = np.ones(nb_frames)
+        for feature, weight in zip(features, weights):
+            if (weight > 0) and (np.std(feature) > 0):
+                params *= misc.normalize_minmax(feature) + weight
+    else:
+        params = np.zeros(nb_frames)
+        for feature, weight in zip(features, weights):
+            if np.std(feature) > 0:
+                params += misc.normalize_std(feature) * weight
+
+    if detrend:
+        params = smooth_and_interp.remove_bias(params, 800)  # FIXME: 800?
+
+    return misc.normalize_std(params)
+
+
+def extract_wavelet(params, parameters, out=None, cancel_event=None):
+    """Compute the CWT of the combined signal (see spiny.dsp.cwt.cwt_analysis)
+
+    Parameters
+    ----------
+    params : np.array
+        The combined signal
+
+    parameters : ProsodyParameters
+        The parameters of the pipeline
+
+    out : np.array
+        The matrix (frames, num_scales) receiving the coefficients, None to allocate it (default: None)
+
+    cancel_event : threading.Event
+        The event interrupting the CWT between two segments, None if it can't be cancelled (default: None)
+
+    Returns
+    -------
+    tuple(np.array, np.array, np.array)
+        The coefficients (scales, frames), the scales (in seconds) and their Fourier frequencies (in Hz)
+    """
+    return cwt_analysis(
+        params,
+        frame_rate=1 / parameters.frameshift,
+        first_freq=parameters.first_freq,
+        num_scales=parameters.num_scales,
+        scale_distance=parameters.scale_distance,
+        out=out,
+        cancel_event=cancel_event,
+    )
+
+
+def extract_prominence(wav_file, parameters, duration_tiers, band=PROMINENCE_BAND):
+    """Run the whole pipeline on a wav file and compute its prominence signal
+
+    This is the job run by the workers of the prosody labeller. The wav file is read directly (at its own
+    sampling rate and downmixed to mono), the player is not involved.
+
+    Parameters
+    ----------
+    wav_file : str or pathlib.Path
+        The wav file
+
+    parameters : ProsodyParameters
+        The parameters of the pipeline
+
+    duration_tiers : list of tuple
+        The segments (start time, end time, label) of each tier generating the duration signal
+
+    band : tuple(float, float)
+        The frequency band (in Hz) of the scales defining the prominence (default: PROMINENCE_BAND)
+
+    Returns
+    -------
+    np.array
+        The prominence signal (one value every frameshift)
+    """
+    # NOTE: the jobs already run in parallel, the pipeline doesn't need the pool
+    fft.set_nb_workers(1)
+
+    wav, sampling_rate = soundfile.read(str(wav_file), dtype="float32", always_2d=True)
+    signal = np.mean(wav, axis=1)
+
+    # Features
+    energy = smooth_energy(extract_energy(signal, sampling_rate, parameters), parameters.smooth_energy)
+    pitch = process_f0(extract_f0(signal, sampling_rate, parameters))
+    duration = extract_duration(duration_tiers, signal.shape[0], sampling_rate, parameters)
+
+    # Combination and CWT
+    params = combine_features([pitch, energy, duration], parameters.weights, parameters.combination, parameters.detrend)
+    cwt, _, freqs = extract_wavelet(params, parameters)
+
+    return prominence_signal(cwt, freqs, band)
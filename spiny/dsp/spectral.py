@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Module containing the spectral features of a signal (band energy, spectral flux, cumulated power).
+
+    The features are derived from the power spectrum computed block by block, which is never kept. The
+    features of each frame (band power, spectral flux and prefix sums of the power spectrum) are computed
+    together by a single pass of the STFT (see compute_frame_features). The feature store (see
+    spiny.core.wav.features) caches them for the signal of the player.
+
+LICENSE
+"""
+
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from .process import STFT_BLOCK_SIZE, frame_count, analysis_window, chunked_stft, run_blocks
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class FrameFeatures(NamedTuple):
+    """Features of each frame computed by a single pass of the STFT (see compute_frame_features)"""
+
+    # Prefix sums of the power spectrum every block_size frames (ceil(frames / block_size) + 1, n_fft // 2 + 1)
+    cumulated_power: np.ndarray
+
+    # Spectral flux of each frame (0 for the first one)
+    spectral_flux: np.ndarray
+
+    # Power of each frame in the bands of the pass, indexed by their range of bins
+    band_power: dict
+
+    # Number of frames between two prefix sums
+    block_size: int
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def power_frames(signal, n_fft, hop_length, win_length, window, start, end, block_size=STFT_BLOCK_SIZE):
+    """Compute the power spectrum of the frames [start, end[ in single precision
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    start : int
+        The index of the first frame
+
+    end : int
+        The index following the last frame
+
+    block_size : int
+        The number of frames per block (default: STFT_BLOCK_SIZE)
+
+    Returns
+    -------
+    np.array
+        The power spectrum matrix (end - start, n_fft // 2 + 1)
+    """
+    power = np.empty((end - start, n_fft // 2 + 1), dtype=np.float32)
+
+    def _to_power(spectrum, block):
+        np.multiply(spectrum.real, spectrum.real, out=block)
+        block += spectrum.imag**2
+
+    return chunked_stft(
+        signal, n_fft, hop_length, win_length, window, start, end, transform=_to_power, out=power, block_size=block_size
+    )
+
+
+def sum_power(signal, n_fft, hop_length, win_length, window, start, end, block_size=STFT_BLOCK_SIZE):
+    """Sum the power spectra of the frames [start, end[ in double precision
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    start : int
+        The index of the first frame
+
+    end : int
+        The index following the last frame
+
+    block_size : int
+        The number of frames per block (default: STFT_BLOCK_SIZE)
+
+    Returns
+    -------
+    np.array
+        The sum of the power spectra (n_fft // 2 + 1)
+    """
+    if end <= start:
+        return np.zeros(n_fft // 2 + 1, dtype=np.float64)
+
+    power = power_frames(signal, n_fft, hop_length, win_length, window, start, end, block_size)
+    return np.sum(power, axis=0, dtype=np.float64)
+
+
+def compute_band_power(signal, n_fft, hop_length, win_length, window, bins):
+    """Compute the power of the bins [first bin, last bin[ of each frame
+
+    Only the bins of the band are kept after the FFT of a block, so the memory doesn't depend on the FFT length.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    bins : tuple(int, int)
+        The range [first bin, last bin[ of the band
+
+    Returns
+    -------
+    np.array
+        The power of the band of each frame (frames)
+    """
+    nb_frames = frame_count(signal.shape[0], n_fft, hop_length)
+    band_power = np.empty((nb_frames, 1), dtype=np.float32)
+
+    def _to_band_power(spectrum, block):
+        block[:, 0] = np.sum(spectrum.real**2 + spectrum.imag**2, axis=1, dtype=np.float64)
+
+    chunked_stft(signal, n_fft, hop_length, win_length, window, band=bins, transform=_to_band_power, out=band_power)
+    return band_power[:, 0].astype(np.float64)
+
+
+def compute_band_energy(signal, n_fft, hop_length, win_length, window, bins):
+    """Compute the RMS amplitude of the bins [first bin, last bin[ of each frame
+
+    The energy of the band is derived from its power using the Parseval theorem.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    bins : tuple(int, int)
+        The range [first bin, last bin[ of the band
+
+    Returns
+    -------
+    np.array
+        The RMS amplitude of each frame
+    """
+    band_power = compute_band_power(signal, n_fft, hop_length, win_length, window, bins)
+    return band_power_to_rms(band_power, n_fft, win_length, window)
+
+
+def band_power_to_rms(band_power, n_fft, win_length, window):
+    """Convert the power of a band of the windowed frames into the RMS amplitude of the band (Parseval theorem)
+
+    Parameters
+    ----------
+    band_power : np.array
+        The power of the band of each frame
+
+    n_fft : int
+        The FFT length (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    Returns
+    -------
+    np.array
+        The RMS amplitude of each frame
+    """
+    fft_window = analysis_window(window, win_length, n_fft)
+
+    # NOTE: the bins of positive frequencies count twice (for the negative ones)
+    return np.sqrt(2 * band_power / (n_fft * np.sum(fft_window**2)))
+
+
+def compute_frame_features(signal, n_fft, hop_length, win_length, window, bands=(), block_size=STFT_BLOCK_SIZE):
+    """Compute the features of each frame with a single pass of the STFT
+
+    The power spectrum of a block of frames gives at once the power of the bands, the spectral flux of the
+    frames of the block and the sum of the block, which is the next row of the prefix sums. The blocks are
+    independent and are computed by the shared thread pool; the flux of the first frame of a block needs the
+    last frame of the previous block, so the magnitude of the frames at the edge of two blocks is carried from
+    one block to the other (it is kept until both blocks are analysed).
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The FFT length (in samples)
+
+    hop_length : int
+        The frameshift (in samples)
+
+    win_length : int
+        The window length (in samples)
+
+    window : str
+        The name of the window
+
+    bands : sequence of tuple(int, int)
+        The ranges [first bin, last bin[ of the bands whose power is computed (default: none)
+
+    block_size : int
+        The number of frames per block, and between two prefix sums (default: STFT_BLOCK_SIZE)
+
+    Returns
+    -------
+    FrameFeatures
+        The features of each frame
+    """
+    nb_frames = frame_count(signal.shape[0], n_fft, hop_length)
+    cumulated_power = np.zeros((-(-nb_frames // block_size) + 1, n_fft // 2 + 1), dtype=np.float64)
+    spectral_flux = np.zeros(nb_frames, dtype=np.float64)
+    band_power = {tuple(bins): np.empty(nb_frames, dtype=np.float64) for bins in bands}
+
+    # The magnitude of the last frame of a block ("last") and of the first frame of the next one ("first"),
+    # indexed by the index of the latter
+    edges = dict()
+    edges_lock = threading.Lock()
+
+    def _join_edge(frame, side, magnitude):
+        with edges_lock:
+            edge = edges.setdefault(frame, dict())
+            edge[side] = magnitude
+            if len(edge) < 2:
+                return
+            del edges[frame]
+
+        spectral_flux[frame] = np.sqrt(np.sum(np.maximum(edge["first"] - edge["last"], 0) ** 2))
+
+    # NOTE: the blocks are already run by the pool, their frames are analysed at once
+    def _process_block(block_start, block_end):
+        power = power_frames(signal, n_fft, hop_length, win_length, window, block_start, block_end, block_size)
+
+        cumulated_power[block_start // block_size + 1] = np.sum(power, axis=0, dtype=np.float64)
+        for (first_bin, last_bin), values in band_power.items():
+            values[block_start:block_end] = np.sum(power[:, first_bin:last_bin], axis=1, dtype=np.float64)
+
+        magnitude = np.sqrt(power)
+        increase = np.maximum(np.diff(magnitude, axis=0), 0)
+        spectral_flux[block_start + 1 : block_end] = np.sqrt(np.sum(increase**2, axis=1))
+        if block_start > 0:
+            _join_edge(block_start, "first", magnitude[0])
+        if block_end < nb_frames:
+            _join_edge(block_end, "last", magnitude[-1])
+
+    run_blocks(_process_block, 0, nb_frames, block_size)
+    np.cumsum(cumulated_power, axis=0, out=cumulated_power)
+
+    return FrameFeatures(cumulated_power, spectral_flux, band_power, block_size)
@@ -206,8 +206,13 @@ class SelectableViewBox(pg.ViewBox):
 
     _dragPoint : SegmentItem
         Handle to save the highlighted region
+
+    sigSelectionChanged : QtCore.Signal
+        Signal emitted with the (start, end) times of the highlighted region, or None once it is removed
     """
 
+    sigSelectionChanged = QtCore.Signal(object)
+
     def __init__(self, lock_y_axis=False, *args, **kwargs):
         """
         Parameters
@@ -263,6 +268,10 @@ class SelectableViewBox(pg.ViewBox):
                 self._dragPoint = SegmentItem(segment)
                 self.parentWidget().addItem(self._dragPoint)
 
+                # NOTE: the region is also changed by moving its boundaries
+                self._dragPoint.sigRegionChanged.connect(self._emitSelection)
+                self._emitSelection()
+
             self._select = True
 
         # Finish
@@ -330,6 +339,11 @@ class SelectableViewBox(pg.ViewBox):
         else:
             self.setRange(QtCore.QRectF(tl, br), padding=0)
 
+    def _emitSelection(self, *args):
+        if self._dragPoint is not None:
+            self.sigSelectionChanged.emit(tuple(sorted(self._dragPoint.getRegion())))
+
     def removeSegment(self):
         self.parentWidget().removeItem(self._dragPoint)
         self._dragPoint = None
+        self.sigSelectionChanged.emit(None)
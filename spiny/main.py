@@ -34,6 +34,7 @@ try:
     from spiny.annotations import load_annotations
     from spiny.ui import build_gui
     from spiny.core import player
+    from spiny.dsp import fft
 except Exception as ex:
     raise ex
 
@@ -137,12 +138,32 @@ def define_argument_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         "-d",
         "--dimension",
-        default=0,
+        default=None,
         type=int,
-        help="The dimension of the coefficient vector (negative shape is assumed to be (-1, d), positive (d, -1))",
+        help="The dimension of the coefficient vector (negative shape is assumed to be (-1, d), positive (d, -1)), "
+        + "inferred from the .npy and HTK files",
+    )
+    parser.add_argument(
+        "-f",
+        "--frameshift",
+        default=None,
+        type=float,
+        help="The frameshift in milliseconds, inferred from the HTK files or from the duration of the wav file",
     )
-    parser.add_argument("-f", "--frameshift", default=5, type=float, help="The frameshift in milliseconds")
     parser.add_argument("-w", "--wav_file", default="", required=True, type=str, help="The wave file")
+    parser.add_argument(
+        "-j",
+        "--nb-workers",
+        default=None,
+        type=int,
+        help="The number of cores used by the spectral analyses (all of them by default)",
+    )
+    parser.add_argument(
+        "--fft-backend",
+        default=fft.get_fft_backend(),
+        choices=list(fft.FFT_BACKENDS.keys()),
+        help="The FFT backend used by the spectral analyses",
+    )
 
     # Return parser
     return parser
@@ -161,6 +182,10 @@ def main():
         )
         sys.exit(-1)
 
+    # Configure the spectral analyses
+    fft.set_fft_backend(args.fft_backend)
+    fft.set_nb_workers(args.nb_workers)
+
     # Load waves
     logger.info("Loading wav")
     player.loadNewWav(args.wav_file)
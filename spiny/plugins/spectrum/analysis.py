@@ -0,0 +1,333 @@
+from typing import NamedTuple
+
+import numpy as np
+
+from spiny.core import check_cancelled
+from spiny.dsp import fft
+from spiny.core.export import define_metadata, export_chunks
+from spiny.dsp.process import (
+    STFT_BLOCK_SIZE,
+    frame_count,
+    analysis_window,
+    dpss_tapers,
+    stft_db,
+    iter_stft_db,
+    multitaper_db,
+)
+from .pyramid import SpectrogramPyramid
+from .cqt import ConstantQAnalysis
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class SpectrumParameters(NamedTuple):
+    """Extraction parameters of the spectrogram (the display-time ones are not part of them)"""
+
+    fft_length: int = 2048
+    frameshift: float = 5
+    framelength: float = 5
+    window: str = "hamming"
+    transform: str = "STFT"
+    bins_per_octave: int = 24
+    time_bandwidth: float = 3
+    cutoff: tuple = (400, 5000)
+
+
+class SpectrumAnalysis:
+    """Spectrogram of a signal for a fixed set of extraction parameters
+
+    The parameters and the signal never change once the analysis is created: a new set of parameters
+    means a new analysis. A background job can therefore keep computing the frames of an analysis while
+    the main thread switches to another one, they never share any mutable state except the tile caches
+    which are protected by their own lock.
+
+    NOTE: the frames are not taken from the feature store, which only keeps reductions of each frame (band
+          power, flux, prefix sums): the spectrogram needs the dB frames of the band at any hop, and only
+          for the viewed tiles, which the tile caches bound.
+
+    Attributes
+    ----------
+    _parameters : SpectrumParameters
+        The extraction parameters, cutoff being the extracted band
+
+    _signal : np.array
+        The signal samples (1D)
+
+    _sampling_rate : float
+        The sampling rate of the signal
+
+    _cqt : ConstantQAnalysis
+        The constant-Q analysis, None if the transform is not the CQT
+
+    _pyramid : SpectrogramPyramid
+        The multi-resolution tiles computed while rendering
+    """
+
+    def __init__(self, signal, sampling_rate, parameters):
+        """
+        Parameters
+        ----------
+        signal : np.array
+            The signal samples (1D)
+
+        sampling_rate : float
+            The sampling rate of the signal
+
+        parameters : SpectrumParameters
+            The extraction parameters
+        """
+        self._parameters = parameters
+        self._signal = signal
+        self._sampling_rate = sampling_rate
+
+        # NOTE: the CQT kernels are cached, the decimated segments are computed with the frames
+        self._cqt = None
+        if parameters.transform == "CQT":
+            self._cqt = ConstantQAnalysis(
+                signal, sampling_rate, parameters.bins_per_octave, parameters.cutoff[0], parameters.cutoff[1]
+            )
+
+        self._pyramid = SpectrogramPyramid(self)
+
+    def getBins(self, cutoff):
+        """Convert a frequency band to a range of FFT bins
+
+        Parameters
+        ----------
+        cutoff : tuple(int, int)
+            The minimal and the maximal frequencies (in Hz)
+
+        Returns
+        -------
+        tuple(int, int)
+            The range [first bin, last bin[
+        """
+        return (
+            int(cutoff[0] * 2 * self._parameters.fft_length / self._sampling_rate),
+            int(cutoff[1] * 2 * self._parameters.fft_length / self._sampling_rate),
+        )
+
+    def getAnalysisParameters(self):
+        """Get the analysis parameters in samples
+
+        Returns
+        -------
+        tuple(int, int, int)
+            The FFT length, the frameshift and the frame length
+        """
+        fft_length = self._parameters.fft_length
+        frameshift = int(0.001 * self._parameters.frameshift * self._sampling_rate)
+        framelength = int(0.001 * self._parameters.framelength * self._sampling_rate)
+        assert (
+            framelength < fft_length
+        ), f"The framelength ({framelength} samples) has to be less than the FFT length ({fft_length} samples)"
+
+        return fft_length * 2, frameshift, framelength
+
+    def getReference(self):
+        """Get the magnitude corresponding to 0 dB
+
+        The reference is a full scale sinusoid (and not the maximum of the spectrum) so every part of the
+        signal shares the same scale and can be computed independently.
+
+        Returns
+        -------
+        float
+            The reference magnitude
+        """
+        n_fft, _, framelength = self.getAnalysisParameters()
+        if self._parameters.transform == "Multitaper":
+            # The power of the tapered spectra are averaged, so are the powers of the reference
+            tapers = dpss_tapers(framelength, n_fft, self._parameters.time_bandwidth, self.getNbTapers())
+            return np.sqrt(np.mean((0.5 * np.sum(tapers, axis=1)) ** 2))
+
+        return 0.5 * np.sum(analysis_window(self._parameters.window, framelength, n_fft))
+
+    def getNbTapers(self):
+        """Get the number of DPSS tapers of the multitaper analysis (2NW - 1)
+
+        Returns
+        -------
+        int
+            The number of tapers
+        """
+        return max(int(2 * self._parameters.time_bandwidth) - 1, 1)
+
+    def getNbFrames(self, hop_length):
+        n_fft, _, _ = self.getAnalysisParameters()
+        return frame_count(self._signal.shape[0], n_fft, hop_length)
+
+    def extractFrames(self, start, end, hop_length=None):
+        """Extract the spectrum of the frames [start, end[ on the extracted band
+
+        The amplitude thresholds and the displayed band are not applied, they are display-time transforms.
+
+        Parameters
+        ----------
+        start : int
+            The index of the first frame
+
+        end : int
+            The index following the last frame
+
+        hop_length : int
+            The frameshift in samples, None to use the frameshift of the analysis (default: None)
+
+        Returns
+        -------
+        np.array
+            The spectrum (in dB) of the frames restricted to the extracted band
+        """
+        n_fft, frameshift, framelength = self.getAnalysisParameters()
+        if hop_length is None:
+            hop_length = frameshift
+
+        if self._cqt is not None:
+            return self._cqt.extractFrames(start, end, hop_length)
+
+        # Extract Amplitude in the dB
+        band = self.getBins(self._parameters.cutoff)
+
+        if self._parameters.transform == "Multitaper":
+            return multitaper_db(
+                self._signal,
+                n_fft,
+                hop_length,
+                framelength,
+                self._parameters.time_bandwidth,
+                self.getNbTapers(),
+                start,
+                end,
+                band,
+                self.getReference(),
+            )
+
+        return stft_db(
+            self._signal, n_fft, hop_length, framelength, self._parameters.window, start, end, band, self.getReference()
+        )
+
+    def getShape(self):
+        """Get the shape of the spectrum of the whole signal
+
+        Returns
+        -------
+        tuple(int, int)
+            The number of frames and the number of bins of the extracted band
+        """
+        _, frameshift, _ = self.getAnalysisParameters()
+        if self._cqt is not None:
+            return self.getNbFrames(frameshift), len(self._cqt._frequencies)
+
+        band = self.getBins(self._parameters.cutoff)
+        return self.getNbFrames(frameshift), band[1] - band[0]
+
+    def getFrequencies(self):
+        """Get the frequency of each bin of the extracted band
+
+        Returns
+        -------
+        np.array
+            The frequencies (in Hz)
+        """
+        if self._cqt is not None:
+            return self._cqt._frequencies
+
+        n_fft, _, _ = self.getAnalysisParameters()
+        band = self.getBins(self._parameters.cutoff)
+        return np.arange(band[0], band[1]) * self._sampling_rate / n_fft
+
+    def iterSpectrum(self, cancel_event=None):
+        """Stream the spectrum of the whole signal at the frameshift of the analysis
+
+        Parameters
+        ----------
+        cancel_event : threading.Event
+            The event interrupting the extraction between two blocks, None if it can't be cancelled (default: None)
+
+        Yields
+        ------
+        tuple(int, np.array)
+            The index of the first frame of the block and the spectrum (in dB) of the frames of the block
+        """
+        n_fft, frameshift, framelength = self.getAnalysisParameters()
+        nb_frames, _ = self.getShape()
+
+        if self._parameters.transform == "STFT":
+            band = self.getBins(self._parameters.cutoff)
+            window = self._parameters.window
+            for start, block in iter_stft_db(
+                self._signal, n_fft, frameshift, framelength, window, band=band, ref=self.getReference()
+            ):
+                check_cancelled(cancel_event)
+                yield start, block
+        else:
+            # NOTE: each chunk is split in blocks computed by the pool, the frames are aligned on the hop
+            chunk_size = STFT_BLOCK_SIZE * fft.get_nb_workers(in_pool=False)
+            for start in range(0, nb_frames, chunk_size):
+                check_cancelled(cancel_event)
+                yield start, self.extractFrames(start, min(start + chunk_size, nb_frames), frameshift)
+
+    def extract(self, output_file=None, cancel_event=None):
+        """Extract the spectrum of the whole signal at the frameshift of the analysis
+
+        The frames are streamed block by block into a preallocated matrix restricted to the extracted band or,
+        if an output file is given, into a memory-mapped .npy file. In the latter case, the peak memory doesn't
+        depend on the duration of the signal.
+
+        Parameters
+        ----------
+        output_file : str or pathlib.Path
+            The .npy file receiving the spectrum, None to keep it in memory (default: None)
+
+        cancel_event : threading.Event
+            The event interrupting the extraction between two blocks, None if it can't be cancelled (default: None)
+
+        Returns
+        -------
+        np.array
+            The spectrum (in dB) restricted to the extracted band
+        """
+        if output_file is None:
+            spectrum = np.empty(self.getShape(), dtype=np.float32)
+        else:
+            spectrum = np.lib.format.open_memmap(output_file, mode="w+", dtype=np.float32, shape=self.getShape())
+
+        for start, block in self.iterSpectrum(cancel_event):
+            spectrum[start : start + block.shape[0]] = block
+
+        if output_file is not None:
+            spectrum.flush()
+
+        return spectrum
+
+    def export(self, filename, cancel_event=None):
+        """Export the spectrum of the whole signal on the extracted band
+
+        The spectrum is computed and written block by block, it is never entirely in memory.
+
+        Parameters
+        ----------
+        filename : str or pathlib.Path
+            The name of the export (see spiny.core.export)
+
+        cancel_event : threading.Event
+            The event interrupting the export between two blocks, None if it can't be cancelled (default: None)
+        """
+        n_fft, frameshift, framelength = self.getAnalysisParameters()
+        metadata = define_metadata(
+            "Spectrogram",
+            frameshift / self._sampling_rate,
+            y_label="frequency",
+            y_unit="Hz",
+            y_values=self.getFrequencies(),
+            value_unit="dB",
+            transform=self._parameters.transform,
+            fft_length=n_fft,
+            frameshift_samples=frameshift,
+            framelength_samples=framelength,
+            window=self._parameters.window,
+        )
+        export_chunks(self.iterSpectrum(), self.getShape(), filename, metadata, cancel_event=cancel_event)
@@ -1,5 +1,7 @@
 from pyqtgraph.Qt import QtWidgets, QtCore
-from spiny.core import DataController
+from spiny.core import DataController, extraction_manager, check_cancelled
+from .analysis import SpectrumParameters
+from .scales import FREQUENCY_SCALES
 
 
 class SpectrumController(DataController):
@@ -12,14 +14,76 @@ class SpectrumController(DataController):
         self._wav_plot = wav_plot
 
     def extract(self):
-        self._extractor._cutoff = (int(self._wMinFreq.text()), int(self._wMaxFreq.text()))
-        self._extractor._threshold_amp = (int(self._wMinAmp.text()), int(self._wMaxAmp.text()))
-        self._extractor._frameshift = int(self._wFrameshift.text())
-        self._extractor._framelength = int(self._wFramelength.text())
-        self._extractor._fft_length = int(self._wFFTLength.text())
-        self._extractor._window = self._wWindow.text()
-        self._extractor.extract()
-        self.refresh()
+        try:
+            frameshift = int(self._wFrameshift.text())
+            framelength = int(self._wFramelength.text())
+            fft_length = int(self._wFFTLength.text())
+            bins_per_octave = int(self._wBinsPerOctave.text())
+            time_bandwidth = float(self._wTimeBandwidth.text())
+        except ValueError:
+            # The user is still typing
+            return
+
+        # Restart from the displayed band
+        self.updateDisplay()
+        parameters = SpectrumParameters(
+            fft_length,
+            frameshift,
+            framelength,
+            self._wWindow.text(),
+            self._wTransform.currentText(),
+            bins_per_octave,
+            time_bandwidth,
+            self._extractor._cutoff,
+        )
+
+        # NOTE: the spectrogram is computed tile by tile while rendering, the job only computes the tiles of the
+        #       current view. It works on its own analysis, so replacing it later never affects the job.
+        extraction_manager.cancel()
+        analysis = self._extractor.setParameters(parameters)
+        viewport = self._widget.getViewportRange()
+        extraction_manager.submit(self, lambda cancel_event: self.runExtraction(analysis, viewport, cancel_event))
+
+    def runExtraction(self, analysis, viewport, cancel_event):
+        """Compute the tiles of the given view in the background so the refresh doesn't have to
+
+        Parameters
+        ----------
+        analysis : SpectrumAnalysis
+            The analysis computing the tiles
+
+        viewport : tuple(float, float, float)
+            The range to render (see SpectrogramPlotWidget.getViewportRange), None if nothing is visible
+
+        cancel_event : threading.Event
+            The event set when the extraction is cancelled
+        """
+        if (analysis is not None) and (viewport is not None):
+            check_cancelled(cancel_event)
+            analysis._pyramid.getRange(*viewport)
+
+    def updateDisplay(self, *args):
+        """Apply the refresh parameters on the rendered spectrogram without extracting it again"""
+        try:
+            cutoff = (int(self._wMinFreq.text()), int(self._wMaxFreq.text()))
+            threshold_amp = (int(self._wMinAmp.text()), int(self._wMaxAmp.text()))
+            n_bands = int(self._wNbBands.text())
+        except ValueError:
+            # The user is still typing
+            return
+
+        if (cutoff[0] < 0) or (cutoff[0] >= cutoff[1]) or (threshold_amp[0] >= threshold_amp[1]) or (n_bands <= 0):
+            return
+
+        self._extractor._threshold_amp = threshold_amp
+        scale = (self._wScale.currentText(), n_bands)
+        if (cutoff == self._extractor._cutoff) and (scale == (self._extractor._scale, self._extractor._n_bands)):
+            self._widget.updateLevels()
+        else:
+            self._extractor._scale, self._extractor._n_bands = scale
+            self._extractor.setCutoff(cutoff)
+            self._widget.updateLimits()
+            self._widget.updateViewport()
 
     def setControlPanel(self, panel):
 
@@ -37,15 +101,32 @@ class SpectrumController(DataController):
         refresh_box_layout.addWidget(self._wMaxFreq, 1, 1)
 
         # Amplitude widgets
+        # NOTE: 0 dB is a full scale sinusoid, speech generally peaks between -10 and -20 dB
         l1 = QtWidgets.QLabel("Min Amp.")
-        self._wMinAmp = QtWidgets.QLineEdit("-70")
+        self._wMinAmp = QtWidgets.QLineEdit("-90")
         l2 = QtWidgets.QLabel("Max Amp.")
-        self._wMaxAmp = QtWidgets.QLineEdit("0")
+        self._wMaxAmp = QtWidgets.QLineEdit("-20")
         refresh_box_layout.addWidget(l1, 2, 0)
         refresh_box_layout.addWidget(l2, 3, 0)
         refresh_box_layout.addWidget(self._wMinAmp, 2, 1)
         refresh_box_layout.addWidget(self._wMaxAmp, 3, 1)
 
+        # Frequency scale widgets
+        l1 = QtWidgets.QLabel("Freq. scale")
+        self._wScale = QtWidgets.QComboBox()
+        self._wScale.addItems(list(FREQUENCY_SCALES.keys()))
+        l2 = QtWidgets.QLabel("Nb. bands")
+        self._wNbBands = QtWidgets.QLineEdit("80")
+        refresh_box_layout.addWidget(l1, 4, 0)
+        refresh_box_layout.addWidget(l2, 5, 0)
+        refresh_box_layout.addWidget(self._wScale, 4, 1)
+        refresh_box_layout.addWidget(self._wNbBands, 5, 1)
+
+        # The display is updated while typing
+        for widget in [self._wMinFreq, self._wMaxFreq, self._wMinAmp, self._wMaxAmp, self._wNbBands]:
+            widget.textEdited.connect(self.updateDisplay)
+        self._wScale.currentTextChanged.connect(self.updateDisplay)
+
         refresh_box = QtWidgets.QGroupBox("Refresh parameters")
         refresh_box.setLayout(refresh_box_layout)
 
@@ -72,6 +153,34 @@ class SpectrumController(DataController):
         extract_box_layout.addWidget(l1, 7, 0)
         extract_box_layout.addWidget(self._wWindow, 7, 1)
 
+        l1 = QtWidgets.QLabel("Transform")
+        self._wTransform = QtWidgets.QComboBox()
+        self._wTransform.addItems(["STFT", "Multitaper", "CQT"])
+        extract_box_layout.addWidget(l1, 8, 0)
+        extract_box_layout.addWidget(self._wTransform, 8, 1)
+
+        l1 = QtWidgets.QLabel("Bins per octave (CQT)")
+        self._wBinsPerOctave = QtWidgets.QLineEdit("24")
+        extract_box_layout.addWidget(l1, 9, 0)
+        extract_box_layout.addWidget(self._wBinsPerOctave, 9, 1)
+
+        l1 = QtWidgets.QLabel("Time-bandwidth (multitaper)")
+        self._wTimeBandwidth = QtWidgets.QLineEdit("3")
+        extract_box_layout.addWidget(l1, 10, 0)
+        extract_box_layout.addWidget(self._wTimeBandwidth, 10, 1)
+
+        # The extraction is started once the user stops editing the parameters
+        for widget in [
+            self._wFFTLength,
+            self._wFrameshift,
+            self._wFramelength,
+            self._wWindow,
+            self._wBinsPerOctave,
+            self._wTimeBandwidth,
+        ]:
+            widget.textEdited.connect(lambda *args: extraction_manager.schedule(self.extract))
+        self._wTransform.currentTextChanged.connect(lambda *args: extraction_manager.schedule(self.extract))
+
         extract_box = QtWidgets.QGroupBox("Extraction parameters")
         extract_box.setLayout(extract_box_layout)
 
@@ -81,8 +190,7 @@ class SpectrumController(DataController):
         main_layout.addWidget(refresh_box)
         main_layout.addWidget(extract_box)
 
-        # Don't forget to add the extract button
-        # TODO: for now everything needs to be extracted
+        # Don't forget to add the extract button (only needed for the extraction parameters)
         bExtract = QtWidgets.QPushButton("Extract")
         bExtract.clicked.connect(self.extract)
         bExtract.setDefault(False)
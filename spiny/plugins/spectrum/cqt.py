@@ -0,0 +1,286 @@
+import math
+import functools
+
+import numpy as np
+import scipy.signal
+import scipy.sparse
+import librosa
+
+from spiny.dsp import fft
+from spiny.dsp.process import STFT_BLOCK_SIZE, run_blocks
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Lowest analysed frequency (C1), the kernels get too long below
+CQT_MIN_FREQUENCY = 32.70
+
+# Highest analysed frequency relative to the sampling rate, the kernels have to stay below the Nyquist frequency
+CQT_MAX_FREQUENCY_RATIO = 0.45
+
+# Number of decimated samples filtered on each side of a segment, more than the half length of the
+# anti-aliasing filter of scipy.signal.resample_poly (10 decimated samples)
+CQT_DECIMATION_MARGIN = 16
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+@functools.lru_cache(maxsize=16)
+def cqt_kernel(sampling_rate, bins_per_octave, fmin, window="hann", sparsity=0.01):
+    """Generate the sparse spectral kernel of the octave starting at fmin
+
+    The temporal kernel of a bin is a windowed complex exponential whose length is inversely proportional to
+    its frequency and which is centred in the FFT frame. Following Brown and Puckette, the analysis is done in
+    the frequency domain: the coefficients of a bin are the FFT of the frame multiplied by the spectral kernel.
+    As the spectral kernel is concentrated around the frequency of the bin, its smallest values are discarded
+    and it is stored as a sparse matrix. The result is cached and shared by all the callers.
+
+    Parameters
+    ----------
+    sampling_rate : float
+        The sampling rate
+
+    bins_per_octave : int
+        The number of bins per octave
+
+    fmin : float
+        The frequency of the first bin of the octave (in Hz)
+
+    window : str
+        The name of the window of the temporal kernels (default: "hann")
+
+    sparsity : float
+        The part of the magnitude of each kernel which can be discarded (default: 0.01)
+
+    Returns
+    -------
+    tuple(scipy.sparse.csr_matrix, int)
+        The spectral kernel (n_fft // 2 + 1, bins_per_octave) and the FFT length n_fft
+    """
+    quality = 1 / (2 ** (1 / bins_per_octave) - 1)
+    frequencies = fmin * 2 ** (np.arange(bins_per_octave) / bins_per_octave)
+    lengths = np.ceil(quality * sampling_rate / frequencies).astype(int)
+    n_fft = 2 ** math.ceil(math.log2(lengths[0]))
+
+    # Temporal kernels normalised so a full scale sinusoid gives a magnitude of 0.5
+    temporal_kernel = np.zeros((n_fft, bins_per_octave), dtype=np.complex128)
+    for k, (frequency, length) in enumerate(zip(frequencies, lengths)):
+        kernel_window = librosa.filters.get_window(window, length, fftbins=True)
+        t = np.arange(length) - length // 2
+        temporal_kernel[n_fft // 2 + t, k] = (
+            kernel_window * np.exp(2j * np.pi * frequency * t / sampling_rate) / np.sum(kernel_window)
+        )
+
+    # NOTE: the kernels are analytic, so only the positive frequencies (the bins of a real FFT) are kept
+    spectral_kernel = np.conj(fft.fft(temporal_kernel, axis=0))[: n_fft // 2 + 1] / n_fft
+
+    # Discard the smallest values carrying (together) less than sparsity of the magnitude of each kernel
+    magnitude = np.abs(spectral_kernel)
+    sorted_magnitude = np.sort(magnitude, axis=0)
+    cumulated = np.cumsum(sorted_magnitude, axis=0)
+    nb_discarded = np.sum(cumulated < sparsity * cumulated[-1], axis=0)
+    threshold = sorted_magnitude[nb_discarded, np.arange(bins_per_octave)]
+    spectral_kernel[magnitude < threshold] = 0
+
+    return scipy.sparse.csr_matrix(spectral_kernel.astype(np.complex64)), n_fft
+
+
+def decimate_segment(signal, factor, start, end, margin=CQT_DECIMATION_MARGIN):
+    """Get the samples [start, end[ of the signal decimated by factor (0 outside of the signal)
+
+    Only the part of the signal covering these samples and the margin of the anti-aliasing filter is
+    decimated, so the result is the one of the decimation of the whole signal but the memory used
+    doesn't depend on its duration.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    factor : int
+        The decimation factor
+
+    start : int
+        The index of the first decimated sample
+
+    end : int
+        The index following the last decimated sample
+
+    margin : int
+        The number of decimated samples filtered on each side (default: CQT_DECIMATION_MARGIN)
+
+    Returns
+    -------
+    np.array
+        The decimated samples (end - start)
+    """
+    out = np.zeros(end - start, dtype=np.float32)
+    nb_decimated = -(-signal.shape[0] // factor)
+    lo, hi = max(start, 0), min(end, nb_decimated)
+    if hi <= lo:
+        return out
+
+    if factor == 1:
+        out[lo - start : hi - start] = signal[lo:hi]
+        return out
+
+    # NOTE: the segment starts on a multiple of factor, so its decimated samples are the ones of the whole signal
+    segment_lo, segment_hi = max(lo - margin, 0), min(hi + margin, nb_decimated)
+    decimated = scipy.signal.resample_poly(signal[segment_lo * factor : segment_hi * factor], 1, factor)
+    out[lo - start : hi - start] = decimated[lo - segment_lo : hi - segment_lo]
+    return out
+
+
+def gather_frames(signal, n_fft, centers):
+    """Get the frames of n_fft samples centred on the given samples
+
+    The signal is zero padded at the boundaries. Contrary to frame_signal, the centres don't have to be
+    regularly spaced.
+
+    Parameters
+    ----------
+    signal : np.array
+        The signal samples (1D)
+
+    n_fft : int
+        The frame length (in samples)
+
+    centers : np.array
+        The sorted indexes of the centre of each frame
+
+    Returns
+    -------
+    np.array
+        The matrix (len(centers), n_fft) of frames
+    """
+    offset = centers[0] - n_fft // 2
+    length = centers[-1] - centers[0] + n_fft
+    lo = max(offset, 0)
+    hi = min(offset + length, signal.shape[0])
+
+    chunk = np.zeros(length, dtype=signal.dtype)
+    if hi > lo:
+        chunk[lo - offset : hi - offset] = signal[lo:hi]
+
+    return chunk[(centers - centers[0])[:, None] + np.arange(n_fft)]
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class ConstantQAnalysis:
+    """Constant-Q transform of a signal computed octave by octave
+
+    All the octaves share the spectral kernel of the highest one: the octave o is analysed on the signal
+    decimated by 2^o, on which the kernel covers frequencies divided by 2^o. The FFT length is therefore
+    the one of the highest octave and a frame costs a few short FFTs, which is about the cost of an STFT
+    frame. The frame i is centred on the sample i * hop_length for every octave, so any range of frames
+    can be computed independently and the long signals are processed by blocks of frames. Each block only
+    decimates the segment of the signal it covers, so the memory doesn't depend on the duration of the signal.
+
+    Attributes
+    ----------
+    _frequencies : np.array
+        The frequency of each bin (in Hz)
+
+    _signal : np.array
+        The signal samples (1D)
+    """
+
+    def __init__(self, signal, sampling_rate, bins_per_octave, fmin, fmax, window="hann"):
+        """
+        Parameters
+        ----------
+        signal : np.array
+            The signal samples (1D)
+
+        sampling_rate : float
+            The sampling rate
+
+        bins_per_octave : int
+            The number of bins per octave
+
+        fmin : float
+            The minimal frequency (in Hz)
+
+        fmax : float
+            The maximal frequency (in Hz)
+
+        window : str
+            The name of the window of the temporal kernels (default: "hann")
+        """
+        fmin = max(fmin, CQT_MIN_FREQUENCY)
+        fmax = min(fmax, CQT_MAX_FREQUENCY_RATIO * sampling_rate)
+        nb_bins = max(math.ceil(bins_per_octave * math.log2(fmax / fmin)), 1)
+
+        self._bins_per_octave = bins_per_octave
+        self._frequencies = fmin * 2 ** (np.arange(nb_bins) / bins_per_octave)
+        self._nb_octaves = math.ceil(nb_bins / bins_per_octave)
+
+        # The kernel is defined by the highest octave
+        top_fmin = fmin * 2 ** ((nb_bins - bins_per_octave) / bins_per_octave)
+        self._kernel, self._n_fft = cqt_kernel(sampling_rate, bins_per_octave, top_fmin, window)
+
+        self._signal = signal
+
+    def extractFrames(self, start, end, hop_length, ref=0.5, amin=1e-5, block_size=STFT_BLOCK_SIZE):
+        """Compute the log-magnitude (in dB) of the frames [start, end[
+
+        Parameters
+        ----------
+        start : int
+            The index of the first frame
+
+        end : int
+            The index following the last frame
+
+        hop_length : int
+            The frameshift (in samples of the original signal)
+
+        ref : float
+            The magnitude corresponding to 0 dB (default: 0.5, a full scale sinusoid)
+
+        amin : float
+            The minimal normalised magnitude (default: 1e-5)
+
+        block_size : int
+            The number of frames per block (default: STFT_BLOCK_SIZE)
+
+        Returns
+        -------
+        np.array
+            The log-magnitude matrix (end - start, number of bins)
+        """
+        nb_bins = len(self._frequencies)
+        out = np.empty((end - start, nb_bins), dtype=np.float32)
+
+        def _process_block(block_start, block_end):
+            block = out[block_start - start : block_end - start]
+            for octave in range(self._nb_octaves):
+                # Bins of the octave and the corresponding columns of the kernel (the lowest octave can be partial)
+                last_bin = nb_bins - octave * self._bins_per_octave
+                first_bin = max(last_bin - self._bins_per_octave, 0)
+                kernel = self._kernel[:, self._bins_per_octave - (last_bin - first_bin) :]
+
+                # NOTE: the centres are rounded when the hop is not a multiple of the decimation factor
+                centers = np.round(np.arange(block_start, block_end) * hop_length / 2**octave).astype(int)
+                lo = centers[0] - self._n_fft // 2
+                hi = centers[-1] - self._n_fft // 2 + self._n_fft
+                frames = gather_frames(decimate_segment(self._signal, 2**octave, lo, hi), self._n_fft, centers - lo)
+                block[:, first_bin:last_bin] = np.abs(fft.rfft(frames, axis=1) @ kernel)
+
+            block *= 1 / ref
+            np.maximum(block, amin, out=block)
+            np.log10(block, out=block)
+            block *= 20
+
+        run_blocks(_process_block, start, end, block_size)
+
+        return out
@@ -1,10 +1,27 @@
 import numpy as np
-import librosa
 
 from spiny.core import player
+from spiny.core.wav import STFTParameters
+from .analysis import SpectrumParameters, SpectrumAnalysis
+from .scales import warped_filterbank, warp_spectrum
 
 
 class SpectrumExtractor:
+    """Extractor of the spectrogram
+
+    The extraction parameters define an immutable analysis (see SpectrumAnalysis) which is replaced as a
+    whole when they change, the extractor itself only holds the display-time parameters (displayed band,
+    amplitude thresholds and frequency scale).
+
+    Attributes
+    ----------
+    _parameters : SpectrumParameters
+        The extraction parameters of the current analysis
+
+    _analysis : SpectrumAnalysis
+        The current analysis, None until a signal is analysed
+    """
+
     def __init__(
         self,
         fft_length=2048,
@@ -12,49 +29,174 @@ class SpectrumExtractor:
         framelength=5,
         window="hamming",
         cutoff=(400, 5000),
-        threshold_amp=(-40, 0),
+        threshold_amp=(-90, -20),
+        scale="Linear",
+        n_bands=80,
+        transform="STFT",
+        bins_per_octave=24,
+        time_bandwidth=3,
     ):
-        self._spectrum = np.zeros((10, 10))
+        # The band actually extracted (the cutoff of the parameters), the displayed band is a view on it
+        self._parameters = SpectrumParameters(
+            fft_length, frameshift, framelength, window, transform, bins_per_octave, time_bandwidth, cutoff
+        )
+        self._analysis = None
 
-        # Define default parameters
-        self._fft_length = fft_length
-        self._frameshift = frameshift
-        self._framelength = framelength
-        self._window = window
+        # Display-time parameters
         self._cutoff = cutoff
         self._threshold_amp = threshold_amp
+        self._scale = scale
+        self._n_bands = n_bands
+
+    def setParameters(self, parameters):
+        """Replace the analysis by the one of the signal of the player with new extraction parameters
+
+        The previous analysis is left untouched, so a job still computing it is never affected.
+
+        Parameters
+        ----------
+        parameters : SpectrumParameters
+            The extraction parameters
+
+        Returns
+        -------
+        SpectrumAnalysis
+            The new analysis, None if no signal is loaded
+        """
+        if self._analysis is not None:
+            # NOTE: the prefetched tiles of the previous analysis are not needed anymore
+            self._analysis._pyramid.clear()
+
+        self._parameters = parameters
+        self._analysis = None
+        if getattr(player, "_wav", None) is not None:
+            self._analysis = SpectrumAnalysis(player._wav[:, 0], player._sampling_rate, parameters)
+
+        return self._analysis
+
+    def setCutoff(self, cutoff):
+        """Update the displayed band
+
+        The analysis is only replaced if the band is not covered by the extracted one.
+
+        Parameters
+        ----------
+        cutoff : tuple(int, int)
+            The minimal and the maximal frequencies (in Hz)
+        """
+        self._cutoff = cutoff
+        extraction_cutoff = self._parameters.cutoff
+        if (cutoff[0] < extraction_cutoff[0]) or (cutoff[1] > extraction_cutoff[1]):
+            extraction_cutoff = (min(cutoff[0], extraction_cutoff[0]), max(cutoff[1], extraction_cutoff[1]))
+            self.setParameters(self._parameters._replace(cutoff=extraction_cutoff))
+
+    def getDisplayBins(self, analysis):
+        """Get the bins of the displayed band relative to the extracted band
+
+        Parameters
+        ----------
+        analysis : SpectrumAnalysis
+            The analysis which extracted the spectrum
 
-    def extract(self):
-        frameshift = int(0.001 * self._frameshift * player._sampling_rate)
-        framelength = int(0.001 * self._framelength * player._sampling_rate)
-        assert (
-            framelength < self._fft_length
-        ), f"The framelength ({framelength} samples) has to be less than the FFT length ({self._fft_length} samples)"
-
-        sp = librosa.core.stft(
-            player._wav[:, 0],
-            n_fft=self._fft_length * 2,
-            hop_length=frameshift,
-            win_length=framelength,
-            center=True,
-            window=self._window,
+        Returns
+        -------
+        slice
+            The slice to apply on the extracted spectrum
+        """
+        extraction_bins = analysis.getBins(analysis._parameters.cutoff)
+        display_bins = analysis.getBins(self._cutoff)
+        return slice(display_bins[0] - extraction_bins[0], display_bins[1] - extraction_bins[0])
+
+    def getDisplaySpectrum(self, spectrum, analysis):
+        """Apply the display-time transforms (displayed band and frequency scale) on an extracted spectrum
+
+        Parameters
+        ----------
+        spectrum : np.array
+            The spectrum (in dB) restricted to the extracted band
+
+        analysis : SpectrumAnalysis
+            The analysis which extracted the spectrum
+
+        Returns
+        -------
+        tuple(np.array, np.array)
+            The spectrum to render and the centre frequency of each band (None for the linear scale)
+        """
+        if analysis._cqt is not None:
+            frequencies = analysis._cqt._frequencies
+            display_bins = slice(*np.searchsorted(frequencies, self._cutoff))
+            return spectrum[:, display_bins], frequencies[display_bins]
+
+        if self._scale == "Linear":
+            return spectrum[:, self.getDisplayBins(analysis)], None
+
+        # NOTE: the filterbank only covers the displayed band which is part of the extracted band
+        n_fft, _, _ = analysis.getAnalysisParameters()
+        filterbank, centers = warped_filterbank(
+            self._scale, analysis._sampling_rate, n_fft, self._n_bands, self._cutoff[0], self._cutoff[1]
         )
+        extraction_bins = analysis.getBins(analysis._parameters.cutoff)
+        filterbank = filterbank[extraction_bins[0] : extraction_bins[1]]
+
+        return warp_spectrum(spectrum, filterbank), centers
+
+    def getNbDisplayBands(self):
+        """Get the number of rendered bands
 
-        # Extract Amplitude in the dB
-        sp = np.abs(sp)
-        sp = sp / np.max(sp)
-        sp = librosa.amplitude_to_db(sp)
+        Returns
+        -------
+        int
+            The number of bands, None if the frequency axis is linear
+        """
+        if (self._analysis is not None) and (self._analysis._cqt is not None):
+            return int(np.diff(np.searchsorted(self._analysis._cqt._frequencies, self._cutoff))[0])
 
-        # Transform and filter to make it ready for plotting
-        sp = sp.T
-        cutoff_coeff = (
-            int(self._cutoff[0] * 2 * self._fft_length / (player._sampling_rate)),
-            int(self._cutoff[1] * 2 * self._fft_length / (player._sampling_rate)),
+        if self._scale == "Linear":
+            return None
+
+        return self._n_bands
+
+    def getSTFTParameters(self):
+        """Get the parameters identifying the STFT of the current parameters in the feature store
+
+        Returns
+        -------
+        STFTParameters
+            The parameters
+        """
+        parameters = self._parameters
+        return STFTParameters.fromMilliseconds(
+            parameters.fft_length, parameters.frameshift, parameters.framelength, parameters.window
         )
-        sp = sp[:, cutoff_coeff[0] : cutoff_coeff[1]]
-        sp[sp < self._threshold_amp[0]] = self._threshold_amp[0]
-        sp[sp > self._threshold_amp[1]] = self._threshold_amp[1]
 
-        self._spectrum = sp
+    def extract(self, output_file=None, cancel_event=None):
+        """Extract the spectrum of the whole signal with the current analysis (see SpectrumAnalysis.extract)
+
+        Parameters
+        ----------
+        output_file : str or pathlib.Path
+            The .npy file receiving the spectrum, None to keep it in memory (default: None)
+
+        cancel_event : threading.Event
+            The event interrupting the extraction between two blocks, None if it can't be cancelled (default: None)
+
+        Returns
+        -------
+        np.array
+            The spectrum (in dB) restricted to the extracted band
+        """
+        return self._analysis.extract(output_file, cancel_event)
+
+    def export(self, filename, cancel_event=None):
+        """Export the spectrum of the whole signal with the current analysis (see SpectrumAnalysis.export)
+
+        Parameters
+        ----------
+        filename : str or pathlib.Path
+            The name of the export (see spiny.core.export)
 
-        return self._spectrum
+        cancel_event : threading.Event
+            The event interrupting the export between two blocks, None if it can't be cancelled (default: None)
+        """
+        self._analysis.export(filename, cancel_event)
@@ -0,0 +1,192 @@
+import math
+
+from spiny.core import player
+from .tiles import SpectrogramTileCache
+
+
+class SpectrogramPyramid:
+    """Multi-resolution spectrogram used to render any zoom level with about one frame per pixel
+
+    The level l of the pyramid is the spectrogram with a hop of (frameshift * 2^l) samples. Negative
+    levels are finer than the configured frameshift (down to one sample), they are extracted and are
+    used when zooming in. Positive levels pool the frames of the configured frameshift by their maximum,
+    so a short event is still visible in the overview. When the finer level is already available, a
+    coarser tile is obtained by pooling its pairs of frames. Levels are split in tiles which are only
+    computed when rendered and then cached. The tiles are computed in the background: the rendering takes
+    the available ones (see getAvailableRange) and is rendered again when the others are ready.
+
+    Attributes
+    ----------
+    _extractor : SpectrumAnalysis
+        The extractor used to compute the frames
+
+    _tiles : SpectrogramTileCache
+        The tiles of all the levels
+    """
+
+    def __init__(self, extractor, tile_size=256):
+        """
+        Parameters
+        ----------
+        extractor : SpectrumAnalysis
+            The extractor used to compute the frames
+
+        tile_size : int
+            The number of frames per tile (default: 256)
+        """
+        self._extractor = extractor
+        self._tiles = SpectrogramTileCache(extractor, tile_size)
+
+    def clear(self):
+        """Discard all the levels (needed as soon as an extraction parameter changes)"""
+        self._tiles.clear()
+
+    def setReadyCallback(self, callback):
+        """Set the function called (by the worker) each time a tile is computed (see SpectrogramTileCache)"""
+        self._tiles.setReadyCallback(callback)
+
+    def getLevels(self):
+        """Get the hop (in samples) of each level from the finest to the coarsest
+
+        The coarsest level is the first one fitting in a single tile.
+
+        Returns
+        -------
+        list of int
+            The hop of each level
+        """
+        _, frameshift, _ = self._extractor.getAnalysisParameters()
+
+        levels = [frameshift]
+        while levels[0] > 1:
+            levels.insert(0, levels[0] // 2)
+        while self._tiles.getNbFrames(levels[-1]) > self._tiles._tile_size:
+            levels.append(levels[-1] * 2)
+
+        return levels
+
+    def selectLevel(self, max_hop_length):
+        """Select the coarsest level whose hop is not larger than the given one
+
+        Parameters
+        ----------
+        max_hop_length : float
+            The maximal hop (in samples), generally the number of samples per pixel
+
+        Returns
+        -------
+        int
+            The hop of the selected level
+        """
+        levels = self.getLevels()
+        candidates = [hop_length for hop_length in levels if hop_length <= max_hop_length]
+        if not candidates:
+            return levels[0]
+
+        return candidates[-1]
+
+    def getFrameRange(self, max_hop_length, start_time, end_time):
+        """Get the adapted level and its frames covering the time range [start_time, end_time]
+
+        Parameters
+        ----------
+        max_hop_length : float
+            The maximal hop (in samples), generally the number of samples per pixel
+
+        start_time : float
+            The start of the range (in seconds)
+
+        end_time : float
+            The end of the range (in seconds)
+
+        Returns
+        -------
+        tuple(int, int, int)
+            The hop of the level, the index of the first and the index following the last frames
+        """
+        hop_length = self.selectLevel(max_hop_length)
+        start = max(int(start_time * player._sampling_rate / hop_length), 0)
+        end = min(math.ceil(end_time * player._sampling_rate / hop_length) + 1, self._tiles.getNbFrames(hop_length))
+
+        return hop_length, start, end
+
+    def getRange(self, max_hop_length, start_time, end_time):
+        """Get the frames of the adapted level covering the time range [start_time, end_time]
+
+        The call waits for the missing tiles, it is the access of the background jobs.
+
+        Parameters
+        ----------
+        max_hop_length : float
+            The maximal hop (in samples), generally the number of samples per pixel
+
+        start_time : float
+            The start of the range (in seconds)
+
+        end_time : float
+            The end of the range (in seconds)
+
+        Returns
+        -------
+        tuple(int, int, int, np.array)
+            The hop of the level, the index of the first and the index following the last frames
+            and the spectrum of these frames
+        """
+        hop_length, start, end = self.getFrameRange(max_hop_length, start_time, end_time)
+        return hop_length, start, end, self._tiles.getFrames(hop_length, start, end)
+
+    def getAvailableRange(self, max_hop_length, start_time, end_time):
+        """Get the available frames of the adapted level covering the time range [start_time, end_time]
+
+        The call never blocks: the missing tiles are scheduled and their frames are NaN (transparent).
+
+        Parameters
+        ----------
+        max_hop_length : float
+            The maximal hop (in samples), generally the number of samples per pixel
+
+        start_time : float
+            The start of the range (in seconds)
+
+        end_time : float
+            The end of the range (in seconds)
+
+        Returns
+        -------
+        tuple(int, int, int, np.array, bool)
+            The hop of the level, the index of the first and the index following the last frames, the
+            spectrum of these frames and True if all of them are available
+        """
+        hop_length, start, end = self.getFrameRange(max_hop_length, start_time, end_time)
+        return (hop_length, start, end, *self._tiles.getAvailableFrames(hop_length, start, end))
+
+    def prefetch(self, hop_length, start, end, direction, nb_tiles=2):
+        """Prefetch the tiles following the frames [start, end[ in the given direction
+
+        Parameters
+        ----------
+        hop_length : int
+            The hop of the level
+
+        start : int
+            The index of the first frame
+
+        end : int
+            The index following the last frame
+
+        direction : int
+            The panning direction (positive for the future, negative for the past, 0 for none)
+
+        nb_tiles : int
+            The number of tiles to prefetch (default: 2)
+        """
+        first_tile, last_tile = self._tiles.tileRange(start, end)
+        if direction > 0:
+            self._tiles.prefetch(hop_length, last_tile + 1, last_tile + nb_tiles)
+        elif direction < 0:
+            self._tiles.prefetch(hop_length, first_tile - nb_tiles, first_tile - 1)
+
+    def prefetchOverview(self):
+        """Prefetch the coarsest level so the fully zoomed out view is immediately available"""
+        hop_length = self.getLevels()[-1]
+        self._tiles.prefetch(hop_length, 0, 0)
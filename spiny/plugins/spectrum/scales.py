@@ -0,0 +1,106 @@
+import functools
+
+import numpy as np
+import scipy.sparse
+import librosa
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Available frequency scales (name => (Hz to warped scale, warped scale to Hz))
+FREQUENCY_SCALES = {
+    "Linear": None,
+    "Mel": (librosa.hz_to_mel, librosa.mel_to_hz),
+    "ERB": (
+        lambda f: 21.4 * np.log10(1 + 0.00437 * np.asarray(f)),
+        lambda e: (10 ** (np.asarray(e) / 21.4) - 1) / 0.00437,
+    ),
+    "Bark": (
+        lambda f: 26.81 * np.asarray(f) / (1960 + np.asarray(f)) - 0.53,
+        lambda z: 1960 * (np.asarray(z) + 0.53) / (26.28 - np.asarray(z)),
+    ),
+}
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+@functools.lru_cache(maxsize=16)
+def warped_filterbank(scale, sampling_rate, n_fft, n_bands, fmin, fmax):
+    """Generate the sparse filterbank projecting the FFT bins on bands equally spaced on a warped scale
+
+    Each band is a triangular filter normalised to sum to one, so a band is the average power of
+    the bins it covers. The result is cached and shared by all the callers.
+
+    Parameters
+    ----------
+    scale : str
+        The name of the scale (see FREQUENCY_SCALES)
+
+    sampling_rate : float
+        The sampling rate
+
+    n_fft : int
+        The FFT length (in samples)
+
+    n_bands : int
+        The number of bands
+
+    fmin : float
+        The minimal frequency (in Hz)
+
+    fmax : float
+        The maximal frequency (in Hz)
+
+    Returns
+    -------
+    tuple(scipy.sparse.csr_matrix, np.array)
+        The filterbank (n_fft // 2 + 1, n_bands) and the centre frequency of each band
+    """
+    to_scale, from_scale = FREQUENCY_SCALES[scale]
+    edges = from_scale(np.linspace(to_scale(fmin), to_scale(fmax), n_bands + 2))
+    lower, centers, upper = edges[:-2], edges[1:-1], edges[2:]
+    freqs = np.fft.rfftfreq(n_fft, 1 / sampling_rate)
+
+    # Triangular filters
+    rising = (freqs[:, None] - lower) / (centers - lower)
+    falling = (upper - freqs[:, None]) / (upper - centers)
+    weights = np.maximum(0, np.minimum(rising, falling))
+
+    # The narrowest bands may fall between two bins, they are then represented by the closest bin
+    empty = np.flatnonzero(weights.sum(axis=0) == 0)
+    weights[np.abs(freqs[:, None] - centers[empty]).argmin(axis=0), empty] = 1
+
+    weights /= weights.sum(axis=0)
+    return scipy.sparse.csr_matrix(weights.astype(np.float32)), centers
+
+
+def warp_spectrum(spectrum, filterbank, amin=1e-5):
+    """Project a log-magnitude spectrum on a filterbank
+
+    Parameters
+    ----------
+    spectrum : np.array
+        The log-magnitude (in dB) matrix (frames, bins)
+
+    filterbank : scipy.sparse.csr_matrix
+        The filterbank (bins, bands)
+
+    amin : float
+        The minimal magnitude (default: 1e-5)
+
+    Returns
+    -------
+    np.array
+        The log-magnitude (in dB) matrix (frames, bands)
+    """
+    power = np.power(np.float32(10), spectrum * np.float32(0.1))
+    warped = np.asarray(power @ filterbank)
+    np.maximum(warped, amin**2, out=warped)
+    np.log10(warped, out=warped)
+    warped *= 10
+    return warped
@@ -0,0 +1,391 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from spiny.dsp import fft
+from spiny.dsp.process import STFT_BLOCK_SIZE
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# NOTE: the worker computes the tiles requested by the rendering and the prefetched ones, the rendering never
+#       computes a tile itself. The FFT releases the GIL, so the worker doesn't block the rendering. It is shared
+#       by the caches of all the analyses, the tiles of a discarded analysis are skipped.
+TILE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spectrogram-tiles")
+
+# Maximal size of the tiles kept by a cache (in bytes)
+TILE_CACHE_SIZE = 256 * 1024 * 1024
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def pool_frames(frames, factor):
+    """Pool each group of factor consecutive frames by their maximum
+
+    As the values are in dB, the maximum is also the one of the power domain. A short event (burst,
+    click) therefore keeps its level in the pooled frame instead of being skipped.
+
+    Parameters
+    ----------
+    frames : np.array
+        The frames (frames, bins)
+
+    factor : int
+        The number of frames per group (the last group may be incomplete)
+
+    Returns
+    -------
+    np.array
+        The pooled frames (ceil(frames / factor), bins)
+    """
+    if factor == 1:
+        return frames
+
+    return np.maximum.reduceat(frames, np.arange(0, frames.shape[0], factor), axis=0)
+
+
+###############################################################################
+# Classes
+###############################################################################
+
+
+class SpectrogramTileCache:
+    """Cache of the spectrogram split into time tiles computed on demand
+
+    A tile gathers a fixed number of consecutive frames at a given hop size. Tiles are only computed
+    when they are rendered (or prefetched), so the memory used is proportional to what has been viewed
+    and not to the duration of the signal.
+
+    The tiles are always computed by the background worker (TILE_EXECUTOR). The rendering only takes the
+    tiles which are ready (see getAvailableFrames) and is notified when the missing ones are computed (see
+    setReadyCallback), so it never waits for a tile, even for the overview of a long signal.
+
+    The hops up to the frameshift of the extractor are extracted directly. A coarser hop h (the
+    frameshift times a power of 2) is never extracted as it would skip most of the signal: its frame i
+    is the maximum of the frames of the frameshift covering [i * h, (i + 1) * h[.
+
+    The cache is bounded: when the tiles exceed max_bytes, the least recently used ones are discarded,
+    starting with the levels which are not rendered, so panning and zooming in a long signal doesn't
+    accumulate every level in memory. A discarded tile is simply computed again when it is needed.
+
+    Attributes
+    ----------
+    _extractor : SpectrumAnalysis
+        The extractor used to compute the frames of a tile
+
+    _tile_size : int
+        The number of frames per tile
+
+    _max_bytes : int
+        The maximal size of the cached tiles (in bytes)
+
+    _tiles : OrderedDict
+        The computed tiles indexed by (hop_length, tile index), from the least to the most recently used
+
+    _visible_hop : int
+        The hop of the level rendered last, whose tiles are discarded last
+    """
+
+    def __init__(self, extractor, tile_size=256, max_bytes=TILE_CACHE_SIZE):
+        """
+        Parameters
+        ----------
+        extractor : SpectrumAnalysis
+            The extractor used to compute the frames of a tile
+
+        tile_size : int
+            The number of frames per tile (default: 256)
+
+        max_bytes : int
+            The maximal size of the cached tiles in bytes (default: TILE_CACHE_SIZE)
+        """
+        self._extractor = extractor
+        self._tile_size = tile_size
+        self._max_bytes = max_bytes
+        self._tiles = OrderedDict()
+        self._nb_bytes = 0
+        self._visible_hop = None
+        self._pending = dict()
+        self._generation = 0
+        self._ready_callback = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Discard all the tiles (needed as soon as an extraction parameter changes)"""
+        with self._lock:
+            self._generation += 1
+            self._tiles = OrderedDict()
+            self._nb_bytes = 0
+            self._pending = dict()
+
+    def setReadyCallback(self, callback):
+        """Set the function called (by the worker) each time a tile is computed
+
+        Parameters
+        ----------
+        callback : function
+            The function, without argument, None to remove it
+        """
+        self._ready_callback = callback
+
+    def getNbFrames(self, hop_length):
+        """Get the number of frames at a given hop
+
+        Parameters
+        ----------
+        hop_length : int
+            The frameshift in samples (the coarser ones are the frameshift of the extractor times a power of 2)
+
+        Returns
+        -------
+        int
+            The number of frames
+        """
+        _, frameshift, _ = self._extractor.getAnalysisParameters()
+        if hop_length <= frameshift:
+            return self._extractor.getNbFrames(hop_length)
+
+        return -(-self.getNbFrames(hop_length // 2) // 2)
+
+    def _storeTile(self, key, tile):
+        """Cache a tile and discard the least recently used ones beyond the size limit (the lock has to be held)"""
+        previous = self._tiles.pop(key, None)
+        if previous is not None:
+            self._nb_bytes -= previous.nbytes
+        self._tiles[key] = tile
+        self._nb_bytes += tile.nbytes
+
+        while (self._nb_bytes > self._max_bytes) and (len(self._tiles) > 1):
+            # NOTE: the tiles of the rendered level go last, the new tile is always kept
+            candidates = [other for other in self._tiles if other != key]
+            evicted = next((other for other in candidates if other[0] != self._visible_hop), candidates[0])
+            self._nb_bytes -= self._tiles.pop(evicted).nbytes
+
+    def _getCachedTile(self, key):
+        """Get a cached tile and mark it as the most recently used, None if not cached (the lock has to be held)"""
+        tile = self._tiles.get(key, None)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+
+        return tile
+
+    def _poolFinerLevel(self, hop_length, start, end):
+        """Get the frames [start, end[ by pooling the pairs of cached frames of the finer level, if available"""
+        finer_hop = hop_length // 2
+        finer_end = min(2 * end, self.getNbFrames(finer_hop))
+        first_tile, last_tile = self.tileRange(2 * start, finer_end)
+        with self._lock:
+            tiles = [self._getCachedTile((finer_hop, index)) for index in range(first_tile, last_tile + 1)]
+        if any(tile is None for tile in tiles):
+            return None
+
+        offset = first_tile * self._tile_size
+        return pool_frames(np.concatenate(tiles, axis=0)[2 * start - offset : finer_end - offset], 2)
+
+    def _poolFrameshiftLevel(self, hop_length, start, end):
+        """Get the frames [start, end[ by pooling the frames of the frameshift, extracted chunk by chunk"""
+        _, frameshift, _ = self._extractor.getAnalysisParameters()
+        factor = hop_length // frameshift
+        last_frame = min(end * factor, self._extractor.getNbFrames(frameshift))
+
+        # NOTE: the chunks are aligned on the groups and are split in blocks computed by the pool
+        chunk_size = factor * max((STFT_BLOCK_SIZE * fft.get_nb_workers(in_pool=False)) // factor, 1)
+        pooled = [
+            pool_frames(
+                self._extractor.extractFrames(chunk_start, min(chunk_start + chunk_size, last_frame), frameshift),
+                factor,
+            )
+            for chunk_start in range(start * factor, last_frame, chunk_size)
+        ]
+        return np.concatenate(pooled, axis=0)
+
+    def _computeTile(self, key, generation):
+        hop_length, index = key
+        start = index * self._tile_size
+        end = min(start + self._tile_size, self.getNbFrames(hop_length))
+
+        _, frameshift, _ = self._extractor.getAnalysisParameters()
+        if hop_length <= frameshift:
+            tile = self._extractor.extractFrames(start, end, hop_length)
+        else:
+            tile = self._poolFinerLevel(hop_length, start, end)
+            if tile is None:
+                tile = self._poolFrameshiftLevel(hop_length, start, end)
+
+        with self._lock:
+            # The parameters changed during the computation, the tile is outdated
+            if generation != self._generation:
+                return tile
+            self._storeTile(key, tile)
+            self._pending.pop(key, None)
+            callback = self._ready_callback
+
+        if callback is not None:
+            callback()
+
+        return tile
+
+    def _schedule(self, key):
+        """Schedule the computation of a tile by the worker (the lock has to be held)
+
+        Returns
+        -------
+        concurrent.futures.Future
+            The future of the tile, None if it is already computed
+        """
+        if key in self._tiles:
+            return None
+
+        future = self._pending.get(key, None)
+        if future is None:
+            future = TILE_EXECUTOR.submit(self._runScheduledTile, key, self._generation)
+            self._pending[key] = future
+
+        return future
+
+    def _runScheduledTile(self, key, generation):
+        with self._lock:
+            # The cache has been cleared since the tile was scheduled
+            if generation != self._generation:
+                return None
+
+        try:
+            return self._computeTile(key, generation)
+        finally:
+            # NOTE: a failed tile is scheduled again by the next request
+            with self._lock:
+                if generation == self._generation:
+                    self._pending.pop(key, None)
+
+    def getTile(self, hop_length, index):
+        """Get a tile, waiting for the worker to compute it if needed
+
+        This blocking access is the one of the background jobs, the rendering uses getAvailableFrames.
+
+        Parameters
+        ----------
+        hop_length : int
+            The frameshift in samples
+
+        index : int
+            The index of the tile
+
+        Returns
+        -------
+        np.array
+            The spectrum of the frames of the tile
+        """
+        key = (hop_length, index)
+        with self._lock:
+            tile = self._getCachedTile(key)
+            if tile is not None:
+                return tile
+            future = self._schedule(key)
+            generation = self._generation
+
+        tile = future.result()
+        if tile is None:
+            # NOTE: the cache has been cleared, the tile is only computed for the caller
+            tile = self._computeTile(key, generation)
+
+        return tile
+
+    def getFrames(self, hop_length, start, end):
+        """Get the spectrum of the frames [start, end[ assembled from the tiles
+
+        Parameters
+        ----------
+        hop_length : int
+            The frameshift in samples
+
+        start : int
+            The index of the first frame
+
+        end : int
+            The index following the last frame
+
+        Returns
+        -------
+        np.array
+            The spectrum of the frames
+        """
+        first_tile = start // self._tile_size
+        last_tile = (end - 1) // self._tile_size
+        tiles = [self.getTile(hop_length, index) for index in range(first_tile, last_tile + 1)]
+        offset = first_tile * self._tile_size
+
+        return np.concatenate(tiles, axis=0)[start - offset : end - offset]
+
+    def getAvailableFrames(self, hop_length, start, end, fill_value=np.nan):
+        """Get the spectrum of the frames [start, end[ from the tiles which are already computed
+
+        The missing tiles are scheduled and their frames are filled with fill_value, so this never blocks.
+
+        Parameters
+        ----------
+        hop_length : int
+            The frameshift in samples
+
+        start : int
+            The index of the first frame
+
+        end : int
+            The index following the last frame
+
+        fill_value : float
+            The value of the frames of the missing tiles (default: NaN, which is rendered transparent)
+
+        Returns
+        -------
+        tuple(np.array, bool)
+            The spectrum of the frames and True if all of them are available
+        """
+        first_tile, last_tile = self.tileRange(start, end)
+        with self._lock:
+            self._visible_hop = hop_length
+            tiles = dict()
+            for index in range(first_tile, last_tile + 1):
+                tile = self._getCachedTile((hop_length, index))
+                if tile is not None:
+                    tiles[index] = tile
+                else:
+                    self._schedule((hop_length, index))
+
+        nb_bins = next(iter(tiles.values())).shape[1] if tiles else self._extractor.getShape()[1]
+        frames = np.full((end - start, nb_bins), fill_value, dtype=np.float32)
+        for index, tile in tiles.items():
+            tile_start = index * self._tile_size
+            lo, hi = max(start, tile_start), min(end, tile_start + tile.shape[0])
+            frames[lo - start : hi - start] = tile[lo - tile_start : hi - tile_start]
+
+        return frames, len(tiles) == last_tile - first_tile + 1
+
+    def prefetch(self, hop_length, first_tile, last_tile):
+        """Schedule the computation of the tiles [first_tile, last_tile] in the background
+
+        Parameters
+        ----------
+        hop_length : int
+            The frameshift in samples
+
+        first_tile : int
+            The index of the first tile
+
+        last_tile : int
+            The index of the last tile
+        """
+        nb_tiles = -(-self.getNbFrames(hop_length) // self._tile_size)
+        with self._lock:
+            for index in range(max(first_tile, 0), min(last_tile, nb_tiles - 1) + 1):
+                self._schedule((hop_length, index))
+
+    def tileRange(self, start, end):
+        """Get the indexes of the first and the last tiles covering the frames [start, end["""
+        return start // self._tile_size, (end - 1) // self._tile_size
@@ -1,7 +1,10 @@
+import numpy as np
+
 # PyQTGraph
-from pyqtgraph.Qt import QtGui, QtWidgets
+from pyqtgraph.Qt import QtCore, QtGui, QtWidgets
 
 # SpINY
+from spiny.core import player
 from spiny.gui.widgets import DataWidget
 
 
@@ -20,6 +23,12 @@ class SpectrogramPlotWidget(DataWidget):
         The histogram widget to control the image colorimetrie
     """
 
+    # Part of the visible range computed on each side to smooth the panning
+    VIEW_MARGIN = 0.5
+
+    # Emitted by the tile worker once a tile is computed
+    sigTileReady = QtCore.Signal()
+
     def __init__(self, spectrum_extractor, parent=None, **kwargs):
         """
         Parameters
@@ -45,35 +54,135 @@ class SpectrogramPlotWidget(DataWidget):
 
         self._spectrum_extractor = spectrum_extractor
 
-    def refresh(self):
+        # Only render the visible part of the spectrogram
+        self._is_ready = False
+        self._last_center = None
+        self._plotItem.getViewBox().sigXRangeChanged.connect(self.updateViewport)
+        self._plotItem.getViewBox().sigResized.connect(self.updateViewport)
 
-        # 1. translate to the minimal frequency
-        tr = QtGui.QTransform()
-        min_y = self._spectrum_extractor._cutoff[0]
-        tr.translate(0, min_y)
+        # NOTE: the tiles are computed in the background, the viewport is rendered again when one is ready
+        self.sigTileReady.connect(self.updateViewport, QtCore.Qt.ConnectionType.QueuedConnection)
 
-        # 2. scale
-        y_scale = self._spectrum_extractor._cutoff[1] - self._spectrum_extractor._cutoff[0]
-        y_scale /= self._spectrum_extractor._spectrum.shape[1]
-        tr.scale(self._spectrum_extractor._frameshift * 0.001, y_scale)
+    def refresh(self):
+        self._is_ready = True
+        self._last_center = None
+        self.updateLimits()
+        self.updateViewport()
+        if self._spectrum_extractor._analysis is not None:
+            self._spectrum_extractor._analysis._pyramid.prefetchOverview()
 
-        # Generate image item
-        self._imageItem.setImage(self._spectrum_extractor._spectrum)
-        self._imageItem.setTransform(tr)
+        # Update the ticks and the histogram
+        if self._ticks is not None:
+            self.setTicks(self._ticks)
+
+    def updateLimits(self):
+        """Set the limits to focus the rendering"""
+        duration = player._wav.shape[0] / player._sampling_rate
+        y_max = self._spectrum_extractor.getNbDisplayBands()
+        if y_max is None:
+            y_max = self._spectrum_extractor._cutoff[1]
 
-        # Set the limits to focus the rendering
         self._plotItem.setLimits(
             minYRange=0,
-            maxYRange=self._spectrum_extractor._spectrum.shape[1] * y_scale,
+            maxYRange=y_max,
             yMin=0,
-            yMax=self._spectrum_extractor._spectrum.shape[1] * y_scale,
+            yMax=y_max,
             xMin=0,
-            xMax=self._spectrum_extractor._frameshift * 0.001 * self._spectrum_extractor._spectrum.shape[0],
+            xMax=duration,
         )
 
-        # Update the ticks and the histogram
-        if self._ticks is not None:
-            self.setTicks(self._ticks)
+    def _updateFrequencyAxis(self, centers):
+        """Label the frequency axis with the centre frequencies of the bands (None to restore the default axis)"""
+        axis = self._plotItem.getAxis("left")
+        if centers is None:
+            axis.setTicks(None)
+            return
+
+        step = max(len(centers) // 8, 1)
+        major = [(i + 0.5, f"{centers[i]:.0f}") for i in range(0, len(centers), step)]
+        axis.setTicks([major, []])
+
+    def getViewportRange(self):
+        """Get the range to render (the visible range plus a margin) and the pixel density
+
+        Returns
+        -------
+        tuple(float, float, float)
+            The number of samples per physical pixel, the start and the end of the range (in seconds),
+            None if nothing is visible
+        """
+        vb = self._plotItem.getViewBox()
+        (x_min, x_max), _ = vb.viewRange()
+        x_min = max(x_min, 0)
+        x_max = min(x_max, player._wav.shape[0] / player._sampling_rate)
+        if x_max <= x_min:
+            return None
+
+        width = max(vb.width() * self.devicePixelRatioF(), 1)
+        samples_per_pixel = (x_max - x_min) * player._sampling_rate / width
+        margin = (x_max - x_min) * SpectrogramPlotWidget.VIEW_MARGIN
+        return samples_per_pixel, x_min - margin, x_max + margin
+
+    def updateViewport(self, *args):
+        """Render the frames covering the visible range (plus a margin) at a hop matching the pixel density
+
+        Only the tiles already computed are rendered, the missing ones are transparent until the worker
+        computes them and notifies the widget (sigTileReady).
+        """
+        if not self._is_ready:
+            return
+
+        # NOTE: the analysis may be replaced at any time, the rendering sticks to the current one
+        analysis = self._spectrum_extractor._analysis
+        viewport = self.getViewportRange()
+        if (analysis is None) or (viewport is None):
+            return
+
+        # Select the level of the pyramid giving about one frame per physical pixel
+        pyramid = analysis._pyramid
+        pyramid.setReadyCallback(self.sigTileReady.emit)
+        hop_length, start, end, spectrum, _ = pyramid.getAvailableRange(*viewport)
+
+        # Anticipate the next tiles in the panning direction
+        center = (viewport[1] + viewport[2]) / 2
+        if self._last_center is not None:
+            direction = (center > self._last_center) - (center < self._last_center)
+            pyramid.prefetch(hop_length, start, end, direction)
+        self._last_center = center
+
+        # Nothing is computed yet, the worker notifies the widget once a tile is ready
+        if np.all(np.isnan(spectrum[:, 0])):
+            self._imageItem.clear()
+            return
+
+        # Restrict to the displayed band and apply the frequency scale
+        spectrum, centers = self._spectrum_extractor.getDisplaySpectrum(spectrum, analysis)
+
+        tr = QtGui.QTransform()
+        if centers is None:
+            # 1. translate to the first frame and to the minimal frequency
+            min_y = self._spectrum_extractor._cutoff[0]
+            tr.translate(start * hop_length / player._sampling_rate, min_y)
+
+            # 2. scale
+            y_scale = self._spectrum_extractor._cutoff[1] - self._spectrum_extractor._cutoff[0]
+            y_scale /= spectrum.shape[1]
+            tr.scale(hop_length / player._sampling_rate, y_scale)
+        else:
+            # The bands are equally spaced on a warped scale, the axis is labelled with their centre frequencies
+            tr.translate(start * hop_length / player._sampling_rate, 0)
+            tr.scale(hop_length / player._sampling_rate, 1)
+
+        self._updateFrequencyAxis(centers)
+
+        # Update image item, the amplitude thresholds are the levels of the lookup table
+        self._imageItem.setImage(spectrum, levels=self._spectrum_extractor._threshold_amp)
+        self._imageItem.setTransform(tr)
+        self.updateLevels()
+
+    def updateLevels(self):
+        """Apply the amplitude thresholds on the lookup table without touching the data"""
+        self._histItem.setLevels(*self._spectrum_extractor._threshold_amp)
 
     def setTicks(self, ticks):
         self._ticks = ticks
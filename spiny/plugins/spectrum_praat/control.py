@@ -1,5 +1,7 @@
+import copy
+
 from pyqtgraph.Qt import QtWidgets, QtCore
-from spiny.core import DataController
+from spiny.core import DataController, extraction_manager
 
 
 class SpectrumPraatController(DataController):
@@ -8,16 +10,156 @@ class SpectrumPraatController(DataController):
         self._extractor = extractor
         self._widget = widget
 
+        # The extraction parameters given to the next job
+        self._parameters = dict()
+
     def setWavPlot(self, wav_plot):
         self._wav_plot = wav_plot
 
     def extract(self):
-        self._extractor.extract()
-        self.refresh()
+        try:
+            window_length = float(self._wWindowLength.text()) / 1000
+            maximum_frequency = float(self._wMaxFreq.text())
+            time_step = float(self._wTimeStep.text()) / 1000
+            frequency_step = float(self._wFreqStep.text())
+            formant_parameters = (
+                float(self._wNbFormants.text()),
+                float(self._wMaxFormant.text()),
+                float(self._wFormantWindowLength.text()) / 1000,
+            )
+            intensity_parameters = (float(self._wMinPitch.text()),)
+        except ValueError:
+            # The user is still typing
+            return
+
+        self._parameters = dict(
+            _window_length=window_length,
+            _maximum_frequency=maximum_frequency,
+            _time_step=time_step,
+            _frequency_step=frequency_step,
+            _formant_parameters=formant_parameters,
+            _intensity_parameters=intensity_parameters,
+        )
+        self.updateOverlays()
+
+    def updateOverlays(self, *args):
+        """Show or hide the tracks, only the missing spectrogram and tracks are computed"""
+        self._extractor._show_formants = self._wFormants.isChecked()
+        self._extractor._show_intensity = self._wIntensity.isChecked()
+
+        # NOTE: the parameters are only given to the copy of the extractor owned by the job
+        extractor = copy.copy(self._extractor)
+        vars(extractor).update(self._parameters)
+        if extractor.needsExtraction():
+            super().extract(**self._parameters)
+        else:
+            self._widget.updateOverlays()
+
+    def commitExtraction(self, extractor):
+        super().commitExtraction(extractor)
+
+        # NOTE: the overlays may have been hidden during the extraction
+        self._extractor._show_formants = self._wFormants.isChecked()
+        self._extractor._show_intensity = self._wIntensity.isChecked()
 
     def setControlPanel(self, panel):
         groupBox = QtWidgets.QGroupBox("Spectrogram configuration")
         box = QtWidgets.QGridLayout()
         box.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop)
+
+        # Spectrogram parameters
+        l1 = QtWidgets.QLabel("Window length (ms)")
+        self._wWindowLength = QtWidgets.QLineEdit("5")
+        box.addWidget(l1, 0, 0)
+        box.addWidget(self._wWindowLength, 0, 1)
+
+        l1 = QtWidgets.QLabel("Max Freq.")
+        self._wMaxFreq = QtWidgets.QLineEdit("5000")
+        box.addWidget(l1, 1, 0)
+        box.addWidget(self._wMaxFreq, 1, 1)
+
+        l1 = QtWidgets.QLabel("Time step (ms)")
+        self._wTimeStep = QtWidgets.QLineEdit("2")
+        box.addWidget(l1, 2, 0)
+        box.addWidget(self._wTimeStep, 2, 1)
+
+        l1 = QtWidgets.QLabel("Freq. step (Hz)")
+        self._wFreqStep = QtWidgets.QLineEdit("20")
+        box.addWidget(l1, 3, 0)
+        box.addWidget(self._wFreqStep, 3, 1)
+
         groupBox.setLayout(box)
-        panel.addWidget(groupBox)
+
+        # Formants (Burg)
+        formant_box = QtWidgets.QGridLayout()
+        formant_box.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop)
+
+        self._wFormants = QtWidgets.QCheckBox("Show formants")
+        formant_box.addWidget(self._wFormants, 0, 0, 1, 2)
+
+        l1 = QtWidgets.QLabel("Max. formant (Hz)")
+        self._wMaxFormant = QtWidgets.QLineEdit("5500")
+        formant_box.addWidget(l1, 1, 0)
+        formant_box.addWidget(self._wMaxFormant, 1, 1)
+
+        l1 = QtWidgets.QLabel("Nb. formants")
+        self._wNbFormants = QtWidgets.QLineEdit("5")
+        formant_box.addWidget(l1, 2, 0)
+        formant_box.addWidget(self._wNbFormants, 2, 1)
+
+        l1 = QtWidgets.QLabel("Window length (ms)")
+        self._wFormantWindowLength = QtWidgets.QLineEdit("25")
+        formant_box.addWidget(l1, 3, 0)
+        formant_box.addWidget(self._wFormantWindowLength, 3, 1)
+
+        formant_group = QtWidgets.QGroupBox("Formants")
+        formant_group.setLayout(formant_box)
+
+        # Intensity
+        intensity_box = QtWidgets.QGridLayout()
+        intensity_box.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop)
+
+        self._wIntensity = QtWidgets.QCheckBox("Show intensity")
+        intensity_box.addWidget(self._wIntensity, 0, 0, 1, 2)
+
+        l1 = QtWidgets.QLabel("Min. pitch (Hz)")
+        self._wMinPitch = QtWidgets.QLineEdit("100")
+        intensity_box.addWidget(l1, 1, 0)
+        intensity_box.addWidget(self._wMinPitch, 1, 1)
+
+        intensity_group = QtWidgets.QGroupBox("Intensity")
+        intensity_group.setLayout(intensity_box)
+
+        # The visibility of the tracks doesn't need any computation once they are cached
+        self._wFormants.toggled.connect(self.updateOverlays)
+        self._wIntensity.toggled.connect(self.updateOverlays)
+
+        # The extraction is started once the user stops editing the parameters
+        for widget in [
+            self._wWindowLength,
+            self._wMaxFreq,
+            self._wTimeStep,
+            self._wFreqStep,
+            self._wMaxFormant,
+            self._wNbFormants,
+            self._wFormantWindowLength,
+            self._wMinPitch,
+        ]:
+            widget.textEdited.connect(lambda *args: extraction_manager.schedule(self.extract))
+
+        main_layout = QtWidgets.QVBoxLayout()
+        main_layout.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop)
+        main_layout.addWidget(groupBox)
+        main_layout.addWidget(formant_group)
+        main_layout.addWidget(intensity_group)
+
+        # Don't forget to add the extract button
+        bExtract = QtWidgets.QPushButton("Extract")
+        bExtract.clicked.connect(self.extract)
+        bExtract.setDefault(False)
+        bExtract.setAutoDefault(False)
+        main_layout.addWidget(bExtract)
+
+        main_widget = QtWidgets.QWidget()
+        main_widget.setLayout(main_layout)
+        panel.addWidget(main_widget)
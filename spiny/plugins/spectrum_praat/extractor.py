@@ -1,21 +1,163 @@
 import numpy as np
-import parselmouth
 
-
-from spiny.core import player
+from spiny.core import player, check_cancelled
+from spiny.core.export import define_metadata, export_array
+from spiny.core.wav.praat import praat_spectrogram, praat_formants, praat_intensity
 
 
 class SpectrumPraatExtractor:
+    """Extractor of the Praat spectrogram and of the formant and intensity tracks overlaid on it
+
+    The spectrogram and the tracks are cached with the parameters they have been computed with, so an
+    extraction only computes what is missing (the tracks which are hidden are not computed).
+
+    Attributes
+    ----------
+    _tracks : dict
+        The tracks (times, values) indexed by (name, parameters), dropped when a new signal is loaded
+
+    _show_formants : bool
+        Indicate if the formants are overlaid on the spectrogram
+
+    _show_intensity : bool
+        Indicate if the intensity is overlaid on the spectrogram
+    """
+
     def __init__(
         self,
+        window_length=0.005,
+        maximum_frequency=5000,
+        time_step=0.002,
+        frequency_step=20,
     ):
         self._spectrum = np.zeros((10, 10))
+        self._window_length = window_length
+        self._maximum_frequency = maximum_frequency
+        self._time_step = time_step
+        self._frequency_step = frequency_step
+
+        # Overlays
+        self._formant_parameters = (5, 5500, 0.025)
+        self._intensity_parameters = (100,)
+        self._show_formants = False
+        self._show_intensity = False
+
+        self._signal = None
+        self._spectrum_parameters = None
+        self._tracks = dict()
+
+    def _checkSignal(self):
+        # NOTE: a new wav file means a new array in the player
+        if self._signal is not player._wav:
+            self._signal = player._wav
+            self._spectrum_parameters = None
+            self._tracks = dict()
+
+    def __copy__(self):
+        # NOTE: a copy is extracted in the background, it completes its own cache of the tracks
+        extractor = SpectrumPraatExtractor.__new__(SpectrumPraatExtractor)
+        vars(extractor).update(vars(self))
+        extractor._tracks = dict(self._tracks)
+        return extractor
+
+    def getSpectrumParameters(self):
+        """Get the parameters of the spectrogram (window length, maximal frequency, time step, frequency step)"""
+        return (self._window_length, self._maximum_frequency, self._time_step, self._frequency_step)
+
+    def getFormants(self):
+        """Get the formant tracks computed with the current parameters
+
+        Returns
+        -------
+        tuple(np.array, np.array)
+            The time of each frame and the frequencies (frames, formants), None if they are not computed
+        """
+        return self._tracks.get(("formants", self._formant_parameters), None)
+
+    def getIntensity(self):
+        """Get the intensity track computed with the current parameters
+
+        Returns
+        -------
+        tuple(np.array, np.array)
+            The time of each frame and the intensity (in dB), None if it is not computed
+        """
+        return self._tracks.get(("intensity", self._intensity_parameters), None)
+
+    def needsExtraction(self):
+        """Check if the spectrogram or one of the displayed tracks has to be computed
+
+        Returns
+        -------
+        bool
+            True if an extraction is needed
+        """
+        self._checkSignal()
+        return (
+            (self._spectrum_parameters != self.getSpectrumParameters())
+            or (self._show_formants and (self.getFormants() is None))
+            or (self._show_intensity and (self.getIntensity() is None))
+        )
+
+    def extract(self, cancel_event=None):
+        self._checkSignal()
+        signal = player._wav[:, 0]
+
+        spectrum_parameters = self.getSpectrumParameters()
+        if self._spectrum_parameters != spectrum_parameters:
+            # NOTE: the long signals are analysed by chunks in the process pool, Praat runs on a single core
+            spectrum, times, frequencies, cutoff, frameshift = praat_spectrogram(
+                signal,
+                player._sampling_rate,
+                window_length=self._window_length,
+                maximum_frequency=self._maximum_frequency,
+                time_step=self._time_step,
+                frequency_step=self._frequency_step,
+                cancel_event=cancel_event,
+            )
+
+            # NOTE: a chunk of Praat can't be interrupted, a cancelled extraction is only dropped once done
+            check_cancelled(cancel_event)
+            self._spectrum = spectrum
+            self._frameshift = frameshift
+            self._cutoff = list(cutoff)
+            self._times = times
+            self._frequencies = frequencies
+            self._spectrum_parameters = spectrum_parameters
+
+        # Only the displayed tracks are computed
+        formant_parameters = self._formant_parameters
+        if self._show_formants and (("formants", formant_parameters) not in self._tracks):
+            tracks = praat_formants(signal, player._sampling_rate, *formant_parameters)
+            check_cancelled(cancel_event)
+            self._tracks[("formants", formant_parameters)] = tracks
+
+        intensity_parameters = self._intensity_parameters
+        if self._show_intensity and (("intensity", intensity_parameters) not in self._tracks):
+            tracks = praat_intensity(signal, player._sampling_rate, *intensity_parameters)
+            check_cancelled(cancel_event)
+            self._tracks[("intensity", intensity_parameters)] = tracks
 
-    def extract(self):
-        snd = parselmouth.Sound(player._wav[:, 0], player._sampling_rate)
-        sp = snd.to_spectrogram()
-        self._spectrum = sp.values.T
-        self._spectrum = 10 * np.log10(self._spectrum)
-        self._frameshift = sp.get_time_step()
-        self._cutoff = [sp.ymin, sp.ymax]
         return self._spectrum
+
+    def export(self, filename, cancel_event=None):
+        """Export the spectrogram computed by Praat
+
+        Parameters
+        ----------
+        filename : str or pathlib.Path
+            The name of the export (see spiny.core.export)
+
+        cancel_event : threading.Event
+            The event interrupting the export between two chunks, None if it can't be cancelled (default: None)
+        """
+        metadata = define_metadata(
+            "Spectrogram (Praat)",
+            self._frameshift,
+            start_time=self._times[0],
+            y_label="frequency",
+            y_unit="Hz",
+            y_values=self._frequencies,
+            value_unit="dB",
+        )
+        export_array(self._spectrum, filename, metadata, cancel_event=cancel_event)
@@ -1,3 +1,6 @@
+# Python
+import numpy as np
+
 # PyQTGraph
 import pyqtgraph as pg
 from pyqtgraph.Qt import QtGui, QtWidgets
@@ -5,6 +8,21 @@ from pyqtgraph.Qt import QtGui, QtWidgets
 # SpINY
 from spiny.gui.items import SelectablePlotItem
 
+###############################################################################
+# global constants
+###############################################################################
+
+# Intensity range (in dB) mapped on the frequency range of the spectrogram
+INTENSITY_RANGE = (50, 100)
+
+# Colors of the overlays
+FORMANT_COLOR = "#F00"
+INTENSITY_COLOR = "#FF0"
+
+###############################################################################
+# Classes
+###############################################################################
+
 
 class SpectrogramPraatPlotWidget(pg.PlotWidget):
     """Image plot widget allowing to highlight some regions
@@ -19,6 +37,12 @@ class SpectrogramPraatPlotWidget(pg.PlotWidget):
 
     hist : pg.HistogramLUTWidget
         The histogram widget to control the image colorimetrie
+
+    _formant_curves : list of pg.PlotCurveItem
+        The curves of the formant tracks overlaid on the spectrogram
+
+    _intensity_curve : pg.PlotCurveItem
+        The curve of the intensity track overlaid on the spectrogram
     """
 
     def __init__(self, spectrum_extractor, parent=None, **kwargs):
@@ -54,14 +78,33 @@ class SpectrogramPraatPlotWidget(pg.PlotWidget):
         # NOTE: needed to conserve the colormap
         self._ticks = None
 
+        # NOTE: the plot has to exist before the (background) extraction is done as the widget is docked first.
+        #       It is created when the plugin is imported, before the row-major order is the default one.
+        self._img = pg.ImageItem(axisOrder="row-major")
+        self.plotItem = SelectablePlotItem()
+        self.plotItem.getViewBox().addItem(self._img)
+        self.setCentralItem(self.plotItem)
+
+        # Overlays (the curves of the formants are created once their number is known)
+        self._formant_curves = []
+        self._intensity_curve = pg.PlotCurveItem(pen=pg.mkPen({"color": INTENSITY_COLOR, "width": 2}), connect="finite")
+        self.plotItem.addItem(self._intensity_curve)
+        self._rendered_spectrum = None
+
     def refresh(self):
-        self._img = pg.ImageItem()
+        # NOTE: the spectrogram is not rendered again when only the overlays have been extracted
+        if self._rendered_spectrum is not self._spectrum_extractor._spectrum:
+            self.refreshSpectrogram()
+        self.updateOverlays()
+
+    def refreshSpectrogram(self):
+        self._rendered_spectrum = self._spectrum_extractor._spectrum
         self._img.setImage(self._spectrum_extractor._spectrum.T)
 
-        # 1. translate to the minimal frequency
+        # 1. translate to the minimal frequency and to the start of the first frame
         tr = QtGui.QTransform()
         min_y = self._spectrum_extractor._cutoff[0]
-        tr.translate(0, min_y)
+        tr.translate(self._spectrum_extractor._times[0] - self._spectrum_extractor._frameshift / 2, min_y)
 
         # 2. scale
         y_scale = self._spectrum_extractor._cutoff[1] - self._spectrum_extractor._cutoff[0]
@@ -70,14 +113,41 @@ class SpectrogramPraatPlotWidget(pg.PlotWidget):
 
         self._img.setTransform(tr)
 
-        # Generate plot
-        self.plotItem = SelectablePlotItem()
-        self.plotItem.getViewBox().addItem(self._img)
-        self.setCentralItem(self.plotItem)
-
         if self._ticks is not None:
             self.setTicks(self._ticks)
 
+    def updateOverlays(self):
+        """Render the overlaid tracks which are displayed and already computed (nothing is computed here)"""
+        extractor = self._spectrum_extractor
+
+        formants = extractor.getFormants() if extractor._show_formants else None
+        if formants is None:
+            for curve in self._formant_curves:
+                curve.setVisible(False)
+        else:
+            times, frequencies = formants
+            while len(self._formant_curves) < frequencies.shape[1]:
+                curve = pg.PlotCurveItem(pen=pg.mkPen({"color": FORMANT_COLOR, "width": 2}), connect="finite")
+                self.plotItem.addItem(curve)
+                self._formant_curves.append(curve)
+
+            for index, curve in enumerate(self._formant_curves):
+                if index < frequencies.shape[1]:
+                    curve.setData(times, frequencies[:, index])
+                curve.setVisible(index < frequencies.shape[1])
+
+        intensity = extractor.getIntensity() if extractor._show_intensity else None
+        if intensity is None:
+            self._intensity_curve.setVisible(False)
+        else:
+            # The intensity range is mapped on the frequency range
+            times, values = intensity
+            min_db, max_db = INTENSITY_RANGE
+            cutoff = extractor._cutoff
+            values = (np.clip(values, min_db, max_db) - min_db) / (max_db - min_db)
+            self._intensity_curve.setData(times, cutoff[0] + values * (cutoff[1] - cutoff[0]))
+            self._intensity_curve.setVisible(True)
+
     def setTicks(self, ticks):
         self._ticks = ticks
         # Define and assign histogram
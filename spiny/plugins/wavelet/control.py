@@ -1,5 +1,5 @@
 from pyqtgraph.Qt import QtWidgets, QtCore
-from spiny.core import DataController
+from spiny.core import DataController, extraction_manager
 
 from spiny.annotations import controller as annotation_controller
 
@@ -15,8 +15,58 @@ class WaveletController(DataController):
         self._wav_plot = wav_plot
 
     def extract(self):
-        self._extractor.extract()
-        self.refresh()
+        try:
+            min_f0 = float(self.min_f0.text())
+            max_f0 = float(self.max_f0.text())
+            weights = (float(self.wF0.text()), float(self.wEnergy.text()), float(self.wDuration.text()))
+            num_scales = int(self.num_scales.text())
+            scale_distance = float(self.scale_distance.text())
+        except ValueError:
+            # The user is still typing
+            return
+
+        if (num_scales <= 0) or (scale_distance <= 0):
+            return
+
+        # NOTE: the job gets its own copy of the parameters, only the stages whose parameters have changed are
+        #       computed again
+        super().extract(
+            _min_f0=min_f0,
+            _max_f0=max_f0,
+            _voicing=float(self.voicing.value()),
+            _weights=weights,
+            _combination="product" if self.mul_feats.isChecked() else "sum",
+            _duration_tiers=self.getDurationTiers(),
+            _delta_duration=self.diffDur.isChecked(),
+            _bump_duration=self.bump.isChecked(),
+            _num_scales=num_scales,
+            _scale_distance=scale_distance,
+        )
+
+    def getDurationTiers(self):
+        """Get a copy of the segments of the tiers selected for the duration signal
+
+        Returns
+        -------
+        list of tuple
+            The (start time, end time, label) of the segments of each selected tier
+        """
+        model = annotation_controller.model
+        if model is None:
+            return []
+
+        # NOTE: the extraction runs in the background, so it gets a copy of the (editable) segments
+        tiers = []
+        for item in self.signalTiers.selectedItems():
+            if item.text() in model.annotations:
+                annotations = model.annotations[item.text()]
+                tiers.append(tuple((an.start_time, an.end_time, an.label) for an in annotations))
+
+        return tiers
+
+    def scheduleExtraction(self, *args):
+        """Extract once the user stops editing the parameters"""
+        extraction_manager.schedule(self.extract)
 
     def setControlPanel(self, panel):
 
@@ -29,6 +79,7 @@ class WaveletController(DataController):
         box_layout.addWidget(self.setF0Limits())
         box_layout.addWidget(self.prosodicFeats())
         box_layout.addWidget(self.featureCombination())
+        box_layout.addWidget(self.waveletScales())
         # box_layout.addWidget(self.weight())
         box_layout.addWidget(self.signalTiers())
         box_layout.addWidget(self.createTierList())
@@ -69,20 +120,20 @@ class WaveletController(DataController):
 
         # Min F0
         self.min_f0 = QtWidgets.QLineEdit("min F0")
-        self.min_f0.setText("50.0")  # str(self.configuration["f0"]["min_f0"]))
         self.min_f0.setInputMask("000")
-        # self.min_f0.textChanged.connect(self.onF0Changed)
+        self.min_f0.setText(str(int(self._extractor._min_f0)))
+        self.min_f0.textEdited.connect(self.scheduleExtraction)
 
         # Max F0
         self.max_f0 = QtWidgets.QLineEdit("max F0")
-        self.max_f0.setText("400.0")  # str(self.configuration["f0"]["max_f0"]))
         self.max_f0.setInputMask("000")
-        # self.max_f0.textChanged.connect(self.onF0Changed)
+        self.max_f0.setText(str(int(self._extractor._max_f0)))
+        self.max_f0.textEdited.connect(self.scheduleExtraction)
 
         # Voicing
         self.voicing = QtWidgets.QSlider(QtCore.Qt.Horizontal)
-        self.voicing.setSliderPosition(50)  # self.configuration["f0"]["voicing_threshold"])
-        # self.voicing.valueChanged.connect(self.onF0Changed)
+        self.voicing.setSliderPosition(int(self._extractor._voicing))
+        self.voicing.valueChanged.connect(self.scheduleExtraction)
 
         # Harmonics
         self.harmonics = QtWidgets.QSlider(QtCore.Qt.Horizontal)
@@ -122,25 +173,24 @@ class WaveletController(DataController):
 
         # F0 widgets
         l1 = QtWidgets.QLabel("F0")
-        self.wF0 = QtWidgets.QLineEdit("1.0")  # str(self.configuration["feature_combination"]["weights"]["f0"]))
+        self.wF0 = QtWidgets.QLineEdit(str(self._extractor._weights[0]))
         self.wF0.setInputMask("0.0")
         self.wF0.setMaxLength(3)
+        self.wF0.textEdited.connect(self.scheduleExtraction)
 
         # Energy widgets
         l2 = QtWidgets.QLabel("Energy")
-        self.wEnergy = QtWidgets.QLineEdit(
-            "1.0"
-        )  # str(self.configuration["feature_combination"]["weights"]["energy"]))
+        self.wEnergy = QtWidgets.QLineEdit(str(self._extractor._weights[1]))
         self.wEnergy.setInputMask("0.0")
         self.wEnergy.setMaxLength(3)
+        self.wEnergy.textEdited.connect(self.scheduleExtraction)
 
         # Duration widgets
         l3 = QtWidgets.QLabel("Duration")
-        self.wDuration = QtWidgets.QLineEdit(
-            "0.0"
-        )  # str(self.configuration["feature_combination"]["weights"]["duration"]))
+        self.wDuration = QtWidgets.QLineEdit(str(self._extractor._weights[2]))
         self.wDuration.setInputMask("0.0")
         self.wDuration.setMaxLength(3)
+        self.wDuration.textEdited.connect(self.scheduleExtraction)
 
         # Setup the groupbox
         box = QtWidgets.QGridLayout()
@@ -155,7 +205,7 @@ class WaveletController(DataController):
         return groupBox
 
     def signalTiers(self):
-        """?
+        """Setup the selection of the tiers generating the duration signal
 
         Parameters
         ----------
@@ -172,7 +222,7 @@ class WaveletController(DataController):
         # Signal tier
         self.signalTiers = QtWidgets.QListWidget()
         self.signalTiers.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
-        # NOTE: self.signalTiers.clicked.connect(self.onSignalRate)
+        self.signalTiers.itemSelectionChanged.connect(self.scheduleExtraction)
 
         # Signal rate
         self.signalRate = QtWidgets.QCheckBox("Estimate speech rate from signal")
@@ -185,14 +235,14 @@ class WaveletController(DataController):
             "Point-wise difference of the durations signal, "
             + "empirically found to improve boundary detection in some cases"
         )
-        # NOTE: self.diffDur.setChecked(self.configuration["duration"]["delta_duration"])
-        # NOTE: self.diffDur.clicked.connect(self.onSignalRate)
+        self.diffDur.setChecked(self._extractor._delta_duration)
+        self.diffDur.clicked.connect(self.scheduleExtraction)
 
         # Zero duration signal at unit boundaries
         self.bump = QtWidgets.QCheckBox("Emphasize differences")
         self.bump.setToolTip("duration signal with valleys relative to adjacent unit duration differences")
-        # NOTE: self.bump.setChecked(self.configuration["duration"]["bump"])
-        # NOTE: self.bump.clicked.connect(self.onSignalRate)
+        self.bump.setChecked(self._extractor._bump_duration)
+        self.bump.clicked.connect(self.scheduleExtraction)
 
         # Setup the group box
         box = QtWidgets.QVBoxLayout()
@@ -253,6 +303,37 @@ class WaveletController(DataController):
         groupBox.setVisible(False)
         return groupBox
 
+    def waveletScales(self):
+        """Setup the scales of the wavelet transform
+
+        Returns
+        -------
+        groupBox: QGroupBox
+            The groupbox containing the number of scales and the distance between them
+        """
+        groupBox = QtWidgets.QGroupBox("Wavelet Scales")
+        groupBox.setToolTip("Number of scales of the wavelet transform and distance between two scales (in octaves)")
+
+        # Number of scales
+        l1 = QtWidgets.QLabel("Scales")
+        self.num_scales = QtWidgets.QLineEdit(str(self._extractor._num_scales))
+        self.num_scales.setInputMask("00")
+        self.num_scales.textEdited.connect(self.scheduleExtraction)
+
+        # Distance between the scales
+        l2 = QtWidgets.QLabel("Distance (oct.)")
+        self.scale_distance = QtWidgets.QLineEdit(str(self._extractor._scale_distance))
+        self.scale_distance.textEdited.connect(self.scheduleExtraction)
+
+        box = QtWidgets.QGridLayout()
+        box.addWidget(l1, 0, 0)
+        box.addWidget(l2, 0, 1)
+        box.addWidget(self.num_scales, 1, 0)
+        box.addWidget(self.scale_distance, 1, 1)
+        groupBox.setLayout(box)
+
+        return groupBox
+
     def featureCombination(self):
 
         groupBox = QtWidgets.QGroupBox("Feature Combination Method")
@@ -261,13 +342,14 @@ class WaveletController(DataController):
 
         self.sum_feats = QtWidgets.QRadioButton("sum")
         self.mul_feats = QtWidgets.QRadioButton("product")
-        self.mul_feats.setChecked(True)
+        self.mul_feats.setChecked(self._extractor._combination == "product")
+        self.sum_feats.setChecked(self._extractor._combination != "product")
 
         combination_method.addButton(self.sum_feats)
         combination_method.addButton(self.mul_feats)
 
-        # self.sum_feats.clicked.connect(self.onSignalRate)
-        # self.mul_feats.clicked.connect(self.onSignalRate)
+        self.sum_feats.clicked.connect(self.scheduleExtraction)
+        self.mul_feats.clicked.connect(self.scheduleExtraction)
 
         hbox = QtWidgets.QHBoxLayout()
         hbox.addWidget(self.sum_feats)
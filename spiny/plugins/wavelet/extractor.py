@@ -1,112 +1,373 @@
+from concurrent.futures import TimeoutError
+
 import numpy as np
 
-# Wavelet part
-# - acoustic features
-from wavelet_prosody_toolkit.prosody_tools import energy_processing
-from wavelet_prosody_toolkit.prosody_tools import f0_processing
+from spiny.core import player, check_cancelled
+from spiny.core.wav import feature_store, STFTParameters
+from spiny.dsp.process import get_process_pool, get_process_pool_size
+from spiny.core.export import define_metadata, export_array
+
+from spiny.dsp.prosody import (
+    ProsodyParameters,
+    energy_analysis,
+    smooth_energy,
+    extract_f0,
+    process_f0,
+    extract_duration,
+    combine_features,
+    extract_wavelet,
+)
 
-# from wavelet_prosody_toolkit.prosody_tools import duration_processing
 
-# - helpers
-from wavelet_prosody_toolkit.prosody_tools import misc
-from wavelet_prosody_toolkit.prosody_tools import smooth_and_interp
+###############################################################################
+# global constants
+###############################################################################
 
-# - wavelet transform
-from wavelet_prosody_toolkit.prosody_tools import cwt_utils
+# Delay (in seconds) between two checks of the cancellation while waiting for a stage run by the pool
+POLL_DELAY = 0.1
 
 
-from spiny.core import player
+###############################################################################
+# Classes
+###############################################################################
 
 
 class WaveletExtractor:
+    """Extractor of the continuous wavelet transform of the prosodic features
+
+    The pipeline is split in stages (energy, F0, duration, feature combination, CWT) and the result of each
+    stage is cached with the key of its inputs and parameters. A stage is only computed again when its
+    key changes, so changing the weights only runs the combination and the CWT.
+
+    The CWT is computed for all the scales at once in the frequency domain (see spiny.dsp.cwt.cwt_analysis),
+    so changing the number of scales or their distance stays interactive. The long signals are analysed
+    by segments, so the memory needed is the one of the result, which can be memory-mapped.
+
+    The feature stages are independent: the F0 tracking (the longest one, which holds the GIL) runs in
+    the process pool while the energy and the duration are computed, and the combination waits for all of them.
+
+    The stages themselves are the ones of spiny.dsp.prosody, which the prosody labeller runs without the player:
+    the extractor only caches them and feeds them the signal of the player. The energy is read from the feature
+    store, which shares the STFT with the other views of the signal.
+
+    Attributes
+    ----------
+    _stages : dict
+        The (key, result) of the last computation of each stage, dropped when a new signal is loaded
+    """
+
     def __init__(
         self,
     ):
+        defaults = ProsodyParameters()
         self._wavelet = np.zeros((10, 10))
-        self._frameshift = 1 / 200.0
-
-        self._num_scales = 34
-        self._scale_distance = 0.25
-
-    def extract(self):
-        self.energy = energy_processing.extract_energy(
-            player._wav[:, 0],
-            player._sampling_rate,
-            200,  # self.configuration["energy"]["band_min"],
-            5000,  # self.configuration["energy"]["band_max"],
-            "rms",  # self.configuration["energy"]["calculation_method"],
+        self._frameshift = defaults.frameshift
+
+        # Energy
+        self._energy_band = defaults.energy_band
+        self._smooth_energy = defaults.smooth_energy
+
+        # F0
+        self._min_f0 = defaults.min_f0
+        self._max_f0 = defaults.max_f0
+        self._harmonics = defaults.harmonics
+        self._voicing = defaults.voicing
+        self._pitch_tracker = defaults.pitch_tracker
+
+        # Duration (the segments of each selected tier)
+        self._duration_tiers = []
+        self._delta_duration = defaults.delta_duration
+        self._bump_duration = defaults.bump_duration
+
+        # Feature combination (F0, energy, duration)
+        self._weights = defaults.weights
+        self._combination = defaults.combination
+        self._detrend = defaults.detrend
+
+        # Wavelet (Mexican hat)
+        self._first_freq = defaults.first_freq
+        self._num_scales = defaults.num_scales
+        self._scale_distance = defaults.scale_distance
+        self._magnitude = False
+
+        self._signal = None
+        self._stages = dict()
+
+    def _checkSignal(self):
+        # NOTE: a new wav file means a new array in the player
+        if self._signal is not player._wav:
+            self._signal = player._wav
+            self._stages = dict()
+
+    def __copy__(self):
+        # NOTE: a copy is extracted in the background, it completes its own cache of the stages
+        extractor = WaveletExtractor.__new__(WaveletExtractor)
+        vars(extractor).update(vars(self))
+        extractor._stages = dict(self._stages)
+        return extractor
+
+    def getParameters(self):
+        """Get the parameters of the pipeline
+
+        Returns
+        -------
+        ProsodyParameters
+            The current parameters of all the stages
+        """
+        return ProsodyParameters(
+            frameshift=self._frameshift,
+            energy_band=tuple(self._energy_band),
+            smooth_energy=self._smooth_energy,
+            min_f0=self._min_f0,
+            max_f0=self._max_f0,
+            harmonics=self._harmonics,
+            voicing=self._voicing,
+            pitch_tracker=self._pitch_tracker,
+            delta_duration=self._delta_duration,
+            bump_duration=self._bump_duration,
+            weights=tuple(self._weights),
+            combination=self._combination,
+            detrend=self._detrend,
+            first_freq=self._first_freq,
+            num_scales=self._num_scales,
+            scale_distance=self._scale_distance,
         )
 
-        if True:  # self.configuration["energy"]["smooth_energy"]:
-            self.energy_smooth = smooth_and_interp.peak_smooth(self.energy, 30, 3)  # FIXME: 30? 3?
-        else:
-            self.energy_smooth = self.energy
-
-        min_f0 = 50.0  # float(str(self.min_f0.text()))
-        max_f0 = 400.0  # float(str(self.max_f0.text()))
-        max_f0 = np.max([max_f0, 10.0])
-        min_f0 = np.min([max_f0 - 1.0, min_f0])
-
-        raw_pitch = f0_processing.extract_f0(
-            player._wav[:, 0],
-            player._sampling_rate,
-            min_f0,
-            max_f0,
-            50.0,  # float(self.harmonics.value()),
-            80.0,  # float(self.voicing.value()),
-            "inst_freq",  # self.configuration["f0"]["pitch_tracker"],
+    def _getStage(self, name, key, compute):
+        """Get the result of a stage, computing it only if its key has changed
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage
+
+        key : tuple
+            The inputs and the parameters of the stage
+
+        compute : function
+            The function computing the stage
+
+        Returns
+        -------
+        object
+            The result of the stage
+        """
+        cached = self._stages.get(name, None)
+        if (cached is not None) and (cached[0] == key):
+            return cached[1]
+
+        result = compute()
+        self._stages[name] = (key, result)
+        return result
+
+    # NOTE: the key of a stage contains the keys of the stages it depends on
+
+    def getEnergyKey(self):
+        return ("energy", self._frameshift, tuple(self._energy_band), self._smooth_energy)
+
+    def getF0Key(self):
+        return ("f0", self._frameshift, self._min_f0, self._max_f0, self._harmonics, self._voicing, self._pitch_tracker)
+
+    def getDurationKey(self):
+        # NOTE: the segments are part of the key, so only the edition of the selected tiers invalidates the stage
+        return ("duration", self._frameshift, tuple(self._duration_tiers), self._delta_duration, self._bump_duration)
+
+    def getCombinationKey(self):
+        return (
+            "combination",
+            self.getEnergyKey(),
+            self.getF0Key(),
+            self.getDurationKey(),
+            tuple(self._weights),
+            self._combination,
+            self._detrend,
         )
 
-        # FIXME: fix errors, smooth and interpolate
-        try:
-            self.pitch = f0_processing.process(raw_pitch)
-        except Exception as ex:
-            raise ex
-            # f0_processing.process crashes if raw_pitch is all zeros, kludge
-            self.pitch = raw_pitch
-
-        nb_frames = np.min([self.pitch.shape[0], self.energy.shape[0]])
-        if False:  # self.mul_feats.isChecked():
-            duration = np.ones(nb_frames)
-
-            if float(1.0) > 0 and np.std(self.pitch) > 0:
-                pitch = misc.normalize_minmax(self.pitch[:nb_frames]) + float(1.0)
-            if float(1.0) > 0 and np.std(self.energy_smooth) > 0:
-                energy = misc.normalize_minmax(self.energy_smooth[:nb_frames]) + float(1.0)
-            # if float(self.wDuration.text()) > 0 and np.std(self.rate)>0:
-            #     duration = misc.normalize_minmax(self.rate) + float(self.wDuration.text())
-            duration *= 0
-
-            params = pitch * energy * duration
+    def getWaveletKey(self):
+        return ("wavelet", self.getCombinationKey(), self._first_freq, self._num_scales, self._scale_distance)
+
+    def extractEnergy(self):
+        """Compute the (smoothed) RMS energy of the band
+
+        Returns
+        -------
+        tuple(np.array, np.array)
+            The energy and the smoothed energy
+        """
+        # NOTE: the RMS energy of the band is cached by the feature store, it is computed once per signal
+        energy = feature_store.getBandEnergy(
+            STFTParameters(*energy_analysis(player._sampling_rate, self._frameshift)), self._energy_band
+        )
+
+        return energy, smooth_energy(energy, self._smooth_energy)
+
+    def getF0Arguments(self):
+        """Get the arguments of the F0 tracker (spiny.dsp.prosody.extract_f0)
+
+        Returns
+        -------
+        tuple
+            The signal, the sampling rate and the parameters of the pipeline
+        """
+        return (player._wav[:, 0], player._sampling_rate, self.getParameters())
+
+    def extractF0(self, raw_pitch=None, cancel_event=None):
+        """Track, clean and interpolate the F0
+
+        Parameters
+        ----------
+        raw_pitch : concurrent.futures.Future
+            The tracking already submitted to the process pool, None to track the F0 here (default: None)
+
+        cancel_event : threading.Event
+            The event interrupting the wait for the tracking, None if it can't be cancelled (default: None)
+
+        Returns
+        -------
+        np.array
+            The interpolated F0
+        """
+        if raw_pitch is None:
+            pitch = extract_f0(*self.getF0Arguments())
+        else:
+            pitch = None
+            while pitch is None:
+                try:
+                    pitch = raw_pitch.result(timeout=POLL_DELAY)
+                except TimeoutError:
+                    check_cancelled(cancel_event)
+
+        return process_f0(pitch)
+
+    def extractDuration(self):
+        """Generate the duration signal of the selected tiers
+
+        Returns
+        -------
+        np.array
+            The duration signal, None if no tier is selected
+        """
+        return extract_duration(self._duration_tiers, player._wav.shape[0], player._sampling_rate, self.getParameters())
+
+    def combineFeatures(self, features):
+        """Combine the weighted features into the signal analysed by the wavelet transform
+
+        Parameters
+        ----------
+        features : list of np.array
+            The features (in the order of the weights, the missing ones being None)
+
+        Returns
+        -------
+        np.array
+            The combined signal
+        """
+        return combine_features(features, self._weights, self._combination, self._detrend)
+
+    def extractWavelet(self, params, output_file=None, cancel_event=None):
+        """Compute the CWT of the combined signal
+
+        The CWT is computed by segments into a preallocated matrix or, if an output file is given, into a
+        memory-mapped .npy file. In the latter case, the peak memory doesn't depend on the duration of the signal.
+
+        Parameters
+        ----------
+        params : np.array
+            The combined signal
+
+        output_file : str or pathlib.Path
+            The .npy file receiving the coefficients (frames, scales), None to keep them in memory (default: None)
+
+        cancel_event : threading.Event
+            The event interrupting the CWT between two segments, None if it can't be cancelled (default: None)
+
+        Returns
+        -------
+        tuple(np.array, np.array, np.array)
+            The coefficients (scales, frames), the scales (in seconds) and their Fourier frequencies (in Hz)
+        """
+        shape = (params.shape[0], self._num_scales)
+        if output_file is None:
+            coefficients = np.empty(shape, dtype=np.float32)
         else:
+            coefficients = np.lib.format.open_memmap(output_file, mode="w+", dtype=np.float32, shape=shape)
 
-            params = misc.normalize_std(self.pitch[:nb_frames]) * float(1.0) + misc.normalize_std(
-                self.energy_smooth[:nb_frames]
-            ) * float(
-                1.0
-            )  # + \
-            # misc.normalize_std(self.rate) * float(self.wDuration.text())
-
-        # if self.configuration["feature_combination"]["detrend"]:
-        if True:
-            params = smooth_and_interp.remove_bias(params, 800)  # FIXME: 800?
-
-        params = misc.normalize_std(params)
-
-        (self.cwt, self.scales, self.freqs) = cwt_utils.cwt_analysis(
-            params,
-            mother_name="mexican_hat",  # self.configuration["wavelet"]["mother_wavelet"],
-            period=3,  # self.configuration["wavelet"]["period"],
-            first_freq=32,
-            num_scales=34,  # self.configuration["wavelet"]["num_scales"],
-            scale_distance=0.25,  # self.configuration["wavelet"]["scale_distance"],
-            apply_coi=False,
+        result = extract_wavelet(params, self.getParameters(), out=coefficients, cancel_event=cancel_event)
+
+        if output_file is not None:
+            coefficients.flush()
+
+        return result
+
+    def extract(self, output_file=None, cancel_event=None):
+        """Run the stages of the pipeline whose parameters have changed
+
+        Parameters
+        ----------
+        output_file : str or pathlib.Path
+            The .npy file receiving the CWT (frames, scales), None to keep it in memory (default: None)
+
+        cancel_event : threading.Event
+            The event interrupting the extraction, None if it can't be cancelled (default: None)
+
+        Returns
+        -------
+        np.array
+            The rendered CWT (frames, scales)
+        """
+        self._checkSignal()
+
+        # Start the F0 tracking in the process pool if it has to be done
+        f0_key = self.getF0Key()
+        raw_pitch = None
+        if (self._stages.get("f0", (None,))[0] != f0_key) and (get_process_pool_size() > 1):
+            raw_pitch = get_process_pool().submit(extract_f0, *self.getF0Arguments())
+
+        try:
+            self.energy, self.energy_smooth = self._getStage("energy", self.getEnergyKey(), self.extractEnergy)
+            check_cancelled(cancel_event)
+
+            self.duration = self._getStage("duration", self.getDurationKey(), self.extractDuration)
+            check_cancelled(cancel_event)
+
+            self.pitch = self._getStage("f0", f0_key, lambda: self.extractF0(raw_pitch, cancel_event))
+            check_cancelled(cancel_event)
+        finally:
+            # NOTE: a running job can't be stopped, its result is just dropped
+            if raw_pitch is not None:
+                raw_pitch.cancel()
+
+        params = self._getStage(
+            "combination",
+            self.getCombinationKey(),
+            lambda: self.combineFeatures([self.pitch, self.energy_smooth, self.duration]),
+        )
+        check_cancelled(cancel_event)
+
+        # NOTE: the CWT written into a file is computed again when the file changes
+        (self.cwt, self.scales, self.freqs) = self._getStage(
+            "wavelet",
+            (self.getWaveletKey(), output_file),
+            lambda: self.extractWavelet(params, output_file, cancel_event),
         )
 
-        if False:  # self.configuration["wavelet"]["magnitude"]:
-            # self.cwt = np.log(np.abs(self.cwt)+1.)
+        if self._magnitude:
             self._wavelet = np.abs(self.cwt).T
         else:
             self._wavelet = np.real(self.cwt).T
 
         return self._wavelet
+
+    def export(self, filename, cancel_event=None):
+        """Export the wavelet transform
+
+        Parameters
+        ----------
+        filename : str or pathlib.Path
+            The name of the export (see spiny.core.export)
+
+        cancel_event : threading.Event
+            The event interrupting the export between two chunks, None if it can't be cancelled (default: None)
+        """
+        metadata = define_metadata("Wavelet", self._frameshift, y_label="scale", y_values=self.scales)
+        export_array(self._wavelet, filename, metadata, cancel_event=cancel_event)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from spiny.annotations.model import Annotation
+from spiny.dsp.duration import DURATION_SILENCE_LABELS
+from spiny.dsp.prominence import PEAK_MIN_DISTANCE, pick_peaks
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def label_prominences(signal, frame_rate, units=None, min_distance=PEAK_MIN_DISTANCE):
+    """Label the prominence and the boundary strength of the units
+
+    The prominence of a unit is the height of the highest peak of the signal in the unit and its boundary
+    strength is the depth of the deepest valley around its end. Without units, the valleys of the signal
+    delimit the units.
+
+    Parameters
+    ----------
+    signal : np.array
+        The prominence signal
+
+    frame_rate : float
+        The frame rate of the signal (in Hz)
+
+    units : list of spiny.annotations.model.Annotation
+        The units (the silences are ignored), None to use the valleys of the signal (default: None)
+
+    min_distance : float
+        The minimal distance (in seconds) between two peaks or two valleys (default: PEAK_MIN_DISTANCE)
+
+    Returns
+    -------
+    tuple(list of Annotation, list of Annotation)
+        The prominence tier and the boundary tier
+    """
+    peaks, valleys = pick_peaks(signal, frame_rate, min_distance)
+
+    if units is None:
+        bounds = np.concatenate([[0], valleys, [signal.shape[0]]]) / frame_rate
+        starts, ends = bounds[:-1], bounds[1:]
+    else:
+        units = sorted(
+            [unit for unit in units if unit.label.lower() not in DURATION_SILENCE_LABELS], key=lambda u: u.start_time
+        )
+        starts = np.array([unit.start_time for unit in units])
+        ends = np.array([unit.end_time for unit in units])
+        if not units:
+            return [], []
+
+    # The highest peak of each unit
+    prominences = np.zeros(starts.shape[0])
+    peak_times = peaks / frame_rate
+    indexes = np.searchsorted(starts, peak_times, side="right") - 1
+    inside = (indexes >= 0) & (peak_times < ends[np.maximum(indexes, 0)])
+    np.maximum.at(prominences, indexes[inside], signal[peaks[inside]])
+
+    # The deepest valley around the end of each unit
+    boundaries = np.zeros(starts.shape[0])
+    valley_times = valleys / frame_rate
+    indexes = np.clip(np.searchsorted(ends, valley_times), 0, ends.shape[0] - 1)
+    previous = np.maximum(indexes - 1, 0)
+    closest = np.where(np.abs(ends[previous] - valley_times) < np.abs(ends[indexes] - valley_times), previous, indexes)
+    near = np.abs(ends[closest] - valley_times) <= min_distance / 2
+    np.maximum.at(boundaries, closest[near], -signal[valleys[near]])
+
+    return (
+        [Annotation(float(start), float(end), f"{value:.3f}") for start, end, value in zip(starts, ends, prominences)],
+        [Annotation(float(start), float(end), f"{value:.3f}") for start, end, value in zip(starts, ends, boundaries)],
+    )
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AUTHOR
+
+    Sébastien Le Maguer <lemagues@tcd.ie>
+
+DESCRIPTION
+
+    Script labelling the prosodic prominence and the boundaries of a corpus without the GUI.
+
+    Each wav file goes through the pipeline of the wavelet plugin (F0, energy and, if a label file is
+    available, duration) and the peaks of the CWT give a prominence tier and a boundary tier. The files
+    are processed by the process pool and the tiers are written (with the tiers of the label file) as a
+    TextGrid or a JSON file. An utterance whose output already exists is skipped, so an interrupted run
+    is resumed by running the same command again.
+
+    The workers run spiny.dsp.prosody.extract_prominence, which reads the wav file itself. They are
+    spawned and import this module, so it only depends on spiny.dsp at the top level: Qt and the
+    annotation modules (which depend on spiny.core and therefore on the player) are only imported by
+    the main process, in the functions loading and saving the labels.
+
+LICENSE
+    This script is in the public domain, free from copyrights or restrictions.
+"""
+
+# System/default
+import os
+import sys
+import pathlib
+import functools
+from collections import OrderedDict
+from concurrent.futures import as_completed
+
+# Arguments
+import argparse
+
+# Messaging/logging
+import logging
+
+from spiny.dsp import fft
+from spiny.dsp.process import get_process_pool, get_process_pool_size
+from spiny.dsp.prominence import PROMINENCE_BAND
+from spiny.dsp.prosody import ProsodyParameters, extract_prominence
+
+
+###############################################################################
+# global constants
+###############################################################################
+LEVEL = [logging.INFO, logging.DEBUG]
+
+# Extensions of the label files (in order of preference) and of the output files
+LABEL_EXTENSIONS = [".TextGrid", ".json", ".lab"]
+OUTPUT_EXTENSIONS = [".TextGrid", ".json"]
+
+# Names of the generated tiers
+PROMINENCE_TIER = "prominence"
+BOUNDARY_TIER = "boundary"
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def create_application():
+    """Create the (offscreen) Qt application, the modules of spiny.core create Qt widgets when they are imported
+
+    Returns
+    -------
+    QtWidgets.QApplication
+        The application
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from pyqtgraph.Qt import QtWidgets
+
+    if not QtWidgets.QApplication.instance():
+        return QtWidgets.QApplication(["SpINY"])
+
+    return QtWidgets.QApplication.instance()
+
+
+def get_serialiser(extension):
+    """Get the serialiser of an annotation format (the Qt application has to be created)
+
+    Parameters
+    ----------
+    extension : str
+        The extension of the files of the format
+
+    Returns
+    -------
+    spiny.annotations.AnnotationSerialiser
+        The serialiser
+    """
+    from spiny.annotations import HTKLabelSerialiser, TextGridSerialiser, JSONSerialiser
+
+    serialisers = {".TextGrid": TextGridSerialiser, ".json": JSONSerialiser, ".lab": HTKLabelSerialiser}
+    return serialisers[extension]()
+
+
+def find_label_file(wav_file, label_dir):
+    """Find the label file of an utterance (same name as the wav file)
+
+    Parameters
+    ----------
+    wav_file : pathlib.Path
+        The wav file
+
+    label_dir : pathlib.Path
+        The directory containing the label files, None if there is none
+
+    Returns
+    -------
+    pathlib.Path
+        The label file, None if there is none
+    """
+    if label_dir is None:
+        return None
+
+    for extension in LABEL_EXTENSIONS:
+        label_file = label_dir / (wav_file.stem + extension)
+        if label_file.exists():
+            return label_file
+
+    return None
+
+
+def prepare_utterance(wav_file, label_file, configuration):
+    """Load the labels of an utterance and define the arguments of its extraction job
+
+    Parameters
+    ----------
+    wav_file : pathlib.Path
+        The wav file
+
+    label_file : pathlib.Path
+        The label file, None if there is none
+
+    configuration : dict
+        The parameters of the pipeline (parameters, duration_tiers, unit_tier and band)
+
+    Returns
+    -------
+    tuple(spiny.annotations.model.AnnotationSet, tuple)
+        The labels and the arguments of spiny.dsp.prosody.extract_prominence
+    """
+    from spiny.annotations.model import AnnotationSet
+
+    if label_file is not None:
+        annotation_set = get_serialiser(label_file.suffix).load(label_file)
+    else:
+        annotation_set = AnnotationSet(OrderedDict(), set())
+    tiers = annotation_set.annotations
+
+    # NOTE: only plain tuples are sent to the workers
+    duration_tiers = [
+        tuple((an.start_time, an.end_time, an.label) for an in tiers[name])
+        for name in configuration["duration_tiers"]
+        if name in tiers
+    ]
+
+    return annotation_set, (wav_file, configuration["parameters"], duration_tiers, configuration["band"])
+
+
+def save_labels(signal, annotation_set, output_file, configuration):
+    """Label the prominence and the boundaries of an utterance and save them
+
+    The output is written under a temporary name and renamed once complete, so an interrupted run leaves no output.
+
+    Parameters
+    ----------
+    signal : np.array
+        The prominence signal computed by the worker
+
+    annotation_set : spiny.annotations.model.AnnotationSet
+        The labels of the utterance, which receive the generated tiers
+
+    output_file : pathlib.Path
+        The output file (its extension defines the format, see OUTPUT_EXTENSIONS)
+
+    configuration : dict
+        The parameters of the pipeline (parameters, duration_tiers, unit_tier and band)
+
+    Returns
+    -------
+    int
+        The number of labelled units
+    """
+    from spiny.plugins.wavelet.prominence import label_prominences
+
+    tiers = annotation_set.annotations
+    units = tiers.get(configuration["unit_tier"], None) if configuration["unit_tier"] else None
+    frame_rate = 1 / configuration["parameters"].frameshift
+    tiers[PROMINENCE_TIER], tiers[BOUNDARY_TIER] = label_prominences(signal, frame_rate, units)
+
+    partial_file = output_file.with_name(output_file.name + ".part")
+    get_serialiser(output_file.suffix).save(partial_file, annotation_set)
+    os.replace(partial_file, output_file)
+
+    return len(tiers[PROMINENCE_TIER])
+
+
+def define_argument_parser() -> argparse.ArgumentParser:
+    """Defines the argument parser
+
+    Returns
+    --------
+    The argument parser: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="Label the prosodic prominence and boundaries of a corpus")
+
+    # Add Logging dedicated options
+    parser.add_argument("-l", "--log_file", default=None, help="Logger file")
+    parser.add_argument(
+        "-v",
+        "--verbosity",
+        action="count",
+        default=0,
+        help="increase output verbosity",
+    )
+
+    # Add tool options
+    parser.add_argument("-L", "--label-dir", default=None, type=str, help="The directory containing the label files")
+    parser.add_argument(
+        "-t",
+        "--duration-tiers",
+        default=[],
+        nargs="+",
+        help="The tiers of the label files generating the duration signal",
+    )
+    parser.add_argument(
+        "-u",
+        "--unit-tier",
+        default=None,
+        type=str,
+        help="The tier of the label files whose units are labelled (the valleys of the CWT delimit them by default)",
+    )
+    parser.add_argument("--min-f0", default=50.0, type=float, help="The minimal F0 (in Hz)")
+    parser.add_argument("--max-f0", default=400.0, type=float, help="The maximal F0 (in Hz)")
+    parser.add_argument(
+        "--weights",
+        default=[1.0, 1.0, 0.5],
+        nargs=3,
+        type=float,
+        help="The weights of the F0, the energy and the duration",
+    )
+    parser.add_argument(
+        "--band",
+        default=list(PROMINENCE_BAND),
+        nargs=2,
+        type=float,
+        help="The frequency band (in Hz) of the scales defining the prominence",
+    )
+    parser.add_argument(
+        "-F",
+        "--format",
+        default=".TextGrid",
+        choices=OUTPUT_EXTENSIONS,
+        help="The format of the output files",
+    )
+    parser.add_argument(
+        "-j",
+        "--nb-workers",
+        default=None,
+        type=int,
+        help="The number of utterances processed in parallel (the number of cores by default)",
+    )
+    parser.add_argument("wav_dir", type=str, help="The directory containing the wav files")
+    parser.add_argument("output_dir", type=str, help="The directory receiving the labels")
+
+    # Return parser
+    return parser
+
+
+def main():
+    # Initialization
+    arg_parser = define_argument_parser()
+    args = arg_parser.parse_args()
+
+    handlers = [logging.StreamHandler()]
+    if args.log_file is not None:
+        handlers.append(logging.FileHandler(args.log_file))
+    logging.basicConfig(
+        level=LEVEL[min(args.verbosity, len(LEVEL) - 1)],
+        format="[%(asctime)s] [%(levelname)s] — [%(name)s — %(funcName)s:%(lineno)d] %(message)s",
+        datefmt="%d/%b/%Y: %H:%M:%S ",
+        handlers=handlers,
+    )
+    logger = logging.getLogger(__name__)
+
+    # NOTE: the application has to live as long as the annotation modules are used
+    app = create_application()  # noqa: F841
+
+    configuration = {
+        "parameters": ProsodyParameters(min_f0=args.min_f0, max_f0=args.max_f0, weights=tuple(args.weights)),
+        "duration_tiers": args.duration_tiers,
+        "unit_tier": args.unit_tier,
+        "band": tuple(args.band),
+    }
+
+    # List the utterances which are not labelled yet
+    wav_dir = pathlib.Path(args.wav_dir)
+    label_dir = pathlib.Path(args.label_dir) if args.label_dir is not None else None
+    output_dir = pathlib.Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    wav_files = sorted(wav_dir.glob("*.wav"))
+    jobs = [
+        (wav_file, find_label_file(wav_file, label_dir), output_dir / (wav_file.stem + args.format))
+        for wav_file in wav_files
+    ]
+    jobs = [job for job in jobs if not job[2].exists()]
+    nb_done = len(wav_files) - len(jobs)
+    if nb_done > 0:
+        logger.info(f"{nb_done} utterances are already labelled, they are skipped")
+
+    # Load the labels (the workers only get the wav file and the duration tiers)
+    nb_failures = 0
+    utterances = []
+    for job in jobs:
+        try:
+            utterances.append((job, *prepare_utterance(job[0], job[1], configuration)))
+        except Exception as ex:
+            nb_failures += 1
+            logger.error(f"{job[0].stem} can't be labelled: {ex}")
+
+    # Label the utterances
+    fft.set_nb_workers(args.nb_workers)
+    if get_process_pool_size() > 1:
+        pool = get_process_pool()
+        futures = {
+            pool.submit(extract_prominence, *arguments): (job, annotation_set)
+            for job, annotation_set, arguments in utterances
+        }
+        results = ((*futures[future], future.result) for future in as_completed(futures))
+    else:
+        results = (
+            (job, annotation_set, functools.partial(extract_prominence, *arguments))
+            for job, annotation_set, arguments in utterances
+        )
+
+    try:
+        for job, annotation_set, get_signal in results:
+            try:
+                nb_units = save_labels(get_signal(), annotation_set, job[2], configuration)
+                nb_done += 1
+                logger.info(f"[{nb_done}/{len(wav_files)}] {job[0].stem}: {nb_units} units labelled")
+            except Exception as ex:
+                nb_failures += 1
+                logger.error(f"{job[0].stem} can't be labelled: {ex}")
+    except KeyboardInterrupt:
+        logger.warning(f"Interrupted, {nb_done}/{len(wav_files)} utterances are labelled (run again to resume)")
+        if get_process_pool_size() > 1:
+            get_process_pool().shutdown(wait=False, cancel_futures=True)
+        sys.exit(-1)
+
+    if nb_failures > 0:
+        logger.error(f"{nb_failures} utterances can't be labelled")
+        sys.exit(-1)
+
+
+###############################################################################
+#  Envelopping
+###############################################################################
+if __name__ == "__main__":
+    main()
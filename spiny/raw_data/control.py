@@ -11,12 +11,8 @@ class RawDataController(DataController):
     def setWavPlot(self, wav_plot):
         self._wav_plot = wav_plot
 
-    def loadCoefficientFile(self, coefficient_file, dimension, frameshift):
+    def loadCoefficientFile(self, coefficient_file, dimension=None, frameshift=None):
         self._extractor.loadCoefficientFile(coefficient_file, dimension, frameshift)
 
-    def extract(self):
-        self._extractor.extract()
-        self.refresh()
-
     def setControlPanel(self, panel):
         panel.addWidget(QtWidgets.QWidget())
@@ -1,19 +1,279 @@
+import os
+
 import numpy as np
 
+from spiny.core import player
+from spiny.core.export import define_metadata, export_array
+
+
+###############################################################################
+# global constants
+###############################################################################
+
+# Maximal number of frames read to define the colour levels of the whole file
+RAW_DATA_LEVEL_FRAMES = 1000
+
+# Frameshift (in milliseconds) used when it is neither given nor inferable
+RAW_DATA_DEFAULT_FRAMESHIFT = 5.0
+
+# Type of the values of the headerless files (by extension, float32 by default)
+RAW_DATA_DTYPES = {".f32": np.float32, ".float": np.float32, ".f64": np.float64, ".double": np.float64}
+
+# Header of the HTK parameter files (the byte order is the one of the file, big-endian by default)
+HTK_HEADER = np.dtype([("nSamples", "i4"), ("sampPeriod", "i4"), ("sampSize", "i2"), ("parmKind", "i2")])
+HTK_BASE_KIND_MASK = 0o77
+HTK_COMPRESSED = 0o2000
+HTK_CRC = 0o10000
+
+
+###############################################################################
+# Functions
+###############################################################################
+
+
+def read_htk_header(coefficient_file):
+    """Read the header of an HTK parameter file
+
+    The header is read in big-endian (the HTK default) and in little-endian (NATURALWRITEORDER), the byte
+    order kept is the one for which the header matches the size of the file.
+
+    Parameters
+    ----------
+    coefficient_file : str or pathlib.Path
+        The coefficient file
+
+    Returns
+    -------
+    tuple(np.dtype, int, int, float)
+        The type of the values, the number of frames, the dimension and the frameshift (in milliseconds),
+        None if the file is not an HTK parameter file
+    """
+    file_size = os.path.getsize(coefficient_file)
+    if file_size < HTK_HEADER.itemsize:
+        return None
+
+    with open(coefficient_file, "rb") as f_coef:
+        raw_header = f_coef.read(HTK_HEADER.itemsize)
+
+    for byte_order in [">", "<"]:
+        header = np.frombuffer(raw_header, dtype=HTK_HEADER.newbyteorder(byte_order))[0]
+        nb_frames, period, size, kind = [int(header[name]) for name in HTK_HEADER.names]
+        data_size = file_size - HTK_HEADER.itemsize - (2 if kind & HTK_CRC else 0)
+        if (nb_frames <= 0) or (period <= 0) or (size <= 0) or (nb_frames * size != data_size):
+            continue
+
+        if (kind & HTK_COMPRESSED) or ((kind & HTK_BASE_KIND_MASK) == 0) or (size % 4 != 0):
+            raise ValueError(f"{coefficient_file} is an HTK file which is not a sequence of float vectors")
+
+        # NOTE: the sample period is in 100ns units
+        return np.dtype(f"{byte_order}f4"), nb_frames, size // 4, period * 1e-4
+
+    return None
+
+
+###############################################################################
+# Classes
+###############################################################################
+
 
 class RawDataExtractor:
+    """Extractor of the coefficients of a raw data file
+
+    The file is memory-mapped and the coefficients are a view on it, so opening a file doesn't read it:
+    only the pages of the frames which are rendered are read.
+
+    The format is defined by the file: numpy files (.npy), HTK parameter files (detected by their header)
+    or headerless dumps of float32 values (float64 for the extensions of RAW_DATA_DTYPES). The shape and
+    the frameshift are inferred when the format describes them.
+
+    Attributes
+    ----------
+    _data : np.memmap
+        The coefficients (frames, dimension), a view on the file
+    """
+
     def __init__(self):
         pass
 
-    def loadCoefficientFile(self, coefficient_file, dimension, frameshift):
+    def loadCoefficientFile(self, coefficient_file, dimension=None, frameshift=None):
+        """Define the coefficient file
+
+        Parameters
+        ----------
+        coefficient_file : str or pathlib.Path
+            The coefficient file
+
+        dimension : int
+            The dimension of the coefficients, negative for a shape (-1, d) and positive for a shape
+            (d, -1), None to infer it from the file (default: None)
+
+        frameshift : float
+            The frameshift (in milliseconds), None to infer it from the file or from the duration of the
+            wav file (default: None)
+        """
         self._coefficient_file = coefficient_file
         self._dimension = dimension
-        self._frameshift = frameshift
+        self._given_frameshift = frameshift
+        self._frameshift = frameshift if frameshift is not None else RAW_DATA_DEFAULT_FRAMESHIFT
 
-    def extract(self):
-        self._data = np.fromfile(self._coefficient_file, dtype=np.float32)
-        if self._dimension < 0:
-            self._data = self._data.reshape((-1, -self._dimension))
+    def extract(self, cancel_event=None):
+        """Map the coefficient file
+
+        A negative dimension d means the file contains the frames one after the other (shape (-1, -d)), a
+        positive one means it contains the coefficients dimension by dimension (shape (d, -1)). In the latter
+        case, the coefficients are the transposed view, no copy is done. A matrix of a numpy file is
+        transposed when the dimension is the size of its first axis only. The values of an HTK file keep the
+        byte order of the file, so they are not swapped (nor copied) when they are mapped.
+
+        Parameters
+        ----------
+        cancel_event : threading.Event
+            The event interrupting the extraction, unused as nothing is read (default: None)
+
+        Returns
+        -------
+        np.memmap
+            The coefficients (frames, dimension)
+        """
+        frameshift = None
+        extension = os.path.splitext(str(self._coefficient_file))[1].lower()
+        if extension == ".npy":
+            data = np.load(self._coefficient_file, mmap_mode="r")
+            if data.ndim == 1:
+                data = self._reshape(data)
+            elif data.ndim != 2:
+                raise ValueError(f"{self._coefficient_file} contains a {data.ndim}D array, 1D or 2D is expected")
+            elif self._dimension:
+                data = self._orient(data)
         else:
-            self._data = self._data.reshape((self._dimension, -1)).T
+            header = read_htk_header(self._coefficient_file)
+            if header is not None:
+                dtype, nb_frames, dimension, frameshift = header
+                data = np.memmap(
+                    self._coefficient_file,
+                    dtype=dtype,
+                    mode="r",
+                    offset=HTK_HEADER.itemsize,
+                    shape=(nb_frames, dimension),
+                )
+            else:
+                dtype = RAW_DATA_DTYPES.get(extension, np.float32)
+                data = self._reshape(np.memmap(self._coefficient_file, dtype=dtype, mode="r"))
+
+        # NOTE: the given frameshift prevails, then the one of the file, then the one matching the wav file
+        if self._given_frameshift is not None:
+            frameshift = self._given_frameshift
+        elif (frameshift is None) and (getattr(player, "_wav", None) is not None) and (data.shape[0] > 0):
+            frameshift = 1000 * player._wav.shape[0] / player._sampling_rate / data.shape[0]
+
+        self._frameshift = frameshift if frameshift is not None else RAW_DATA_DEFAULT_FRAMESHIFT
+        self._data = data
         return self._data
+
+    def _orient(self, data):
+        """Orient the matrix of a numpy file following the given dimension
+
+        The shape of the matrix is known, so only the size of the dimension is used: the matrix is
+        transposed when its first axis is the one of this size.
+
+        Parameters
+        ----------
+        data : np.array
+            The matrix of the file (2D)
+
+        Returns
+        -------
+        np.array
+            The coefficients (frames, dimension), a view on the matrix
+        """
+        dimension = abs(self._dimension)
+        if data.shape[1] == dimension:
+            return data
+        if data.shape[0] == dimension:
+            return data.T
+
+        raise ValueError(
+            f"The dimension {dimension} doesn't match the shape {data.shape} of the array of {self._coefficient_file}"
+        )
+
+    def _reshape(self, data):
+        """Reshape the values of a file following the given dimension
+
+        Parameters
+        ----------
+        data : np.array
+            The values of the file (1D)
+
+        Returns
+        -------
+        np.array
+            The coefficients (frames, dimension), a view on the values
+        """
+        if not self._dimension:
+            raise ValueError(f"The dimension of the coefficients of {self._coefficient_file} can't be inferred")
+
+        if data.shape[0] % abs(self._dimension) != 0:
+            raise ValueError(
+                f"The size of {self._coefficient_file} is not a multiple of the dimension {abs(self._dimension)}"
+            )
+
+        if self._dimension < 0:
+            return data.reshape((-1, -self._dimension))
+        return data.reshape((self._dimension, -1)).T
+
+    def getLevels(self):
+        """Get the colour levels of the coefficients from a subset of the frames
+
+        Returns
+        -------
+        tuple(float, float)
+            The minimal and the maximal values
+        """
+        step = max(self._data.shape[0] // RAW_DATA_LEVEL_FRAMES, 1)
+        subset = np.asarray(self._data[::step])
+        return float(np.nanmin(subset)), float(np.nanmax(subset))
+
+    def getRange(self, start_time, end_time, nb_columns):
+        """Get the frames of a time range, decimated to about nb_columns frames
+
+        Only the kept frames are read, they are converted to native float32 values.
+
+        Parameters
+        ----------
+        start_time : float
+            The start of the range (in seconds)
+
+        end_time : float
+            The end of the range (in seconds)
+
+        nb_columns : int
+            The number of frames wanted (typically the number of pixels)
+
+        Returns
+        -------
+        tuple(int, int, np.array)
+            The index of the first frame, the step between the kept frames and the frames (frames, dimension)
+        """
+        frameshift = self._frameshift * 0.001
+        nb_frames = self._data.shape[0]
+        start = int(np.clip(np.floor(start_time / frameshift), 0, nb_frames))
+        end = int(np.clip(np.ceil(end_time / frameshift), start, nb_frames))
+
+        # NOTE: the first frame is aligned on the step, so the kept frames don't change while panning
+        step = max((end - start) // max(int(nb_columns), 1), 1)
+        start = (start // step) * step
+        return start, step, np.asarray(self._data[start:end:step], dtype=np.float32)
+
+    def export(self, filename, cancel_event=None):
+        """Export the coefficients
+
+        Parameters
+        ----------
+        filename : str or pathlib.Path
+            The name of the export (see spiny.core.export)
+
+        cancel_event : threading.Event
+            The event interrupting the export between two chunks, None if it can't be cancelled (default: None)
+        """
+        metadata = define_metadata("Raw DATA", self._frameshift * 0.001, source_file=str(self._coefficient_file))
+        export_array(self._data, filename, metadata, cancel_event=cancel_event)
@@ -20,6 +20,9 @@ class RawDataPlotWidget(DataWidget):
         The histogram widget to control the image colorimetrie
     """
 
+    # Part of the visible range rendered on each side to smooth the panning
+    VIEW_MARGIN = 0.5
+
     def __init__(self, data_extractor, parent=None, **kwargs):
         """
         Parameters
@@ -46,13 +49,14 @@ class RawDataPlotWidget(DataWidget):
         # NOTE: needed to conserve the colormap
         self._ticks = None
 
-    def refresh(self):
-        tr = QtGui.QTransform()
-        tr.scale(self._data_extractor._frameshift * 0.001, 1)
+        # Only render the visible part of the coefficients (the file is memory-mapped)
+        self._is_ready = False
+        self._plotItem.getViewBox().sigXRangeChanged.connect(self.updateViewport)
+        self._plotItem.getViewBox().sigResized.connect(self.updateViewport)
 
-        # Generate image item
-        self._imageItem.setImage(self._data_extractor._data.T)
-        self._imageItem.setTransform(tr)
+    def refresh(self):
+        self._is_ready = True
+        self._histItem.setLevels(*self._data_extractor.getLevels())
 
         # Set the limits to focus the rendering
         self._plotItem.setLimits(
@@ -63,11 +67,34 @@ class RawDataPlotWidget(DataWidget):
             xMin=0,
             xMax=self._data_extractor._frameshift * 0.001 * self._data_extractor._data.shape[0],
         )
+        self.updateViewport()
 
         # Update the ticks and the histogram
         if self._ticks is not None:
             self.setTicks(self._ticks)
 
+    def updateViewport(self, *args):
+        """Render the frames covering the visible range (plus a margin), about one frame per physical pixel"""
+        if not self._is_ready:
+            return
+
+        vb = self._plotItem.getViewBox()
+        (x_min, x_max), _ = vb.viewRange()
+        margin = (x_max - x_min) * RawDataPlotWidget.VIEW_MARGIN
+        nb_columns = max(vb.width() * self.devicePixelRatioF(), 1) * (1 + 2 * RawDataPlotWidget.VIEW_MARGIN)
+        start, step, data = self._data_extractor.getRange(x_min - margin, x_max + margin, nb_columns)
+        if data.shape[0] == 0:
+            return
+
+        tr = QtGui.QTransform()
+        frameshift = self._data_extractor._frameshift * 0.001
+        tr.translate(start * frameshift, 0)
+        tr.scale(step * frameshift, 1)
+
+        # NOTE: the levels of the whole file (or the ones set by the user) are kept while panning
+        self._imageItem.setImage(data.T, levels=self._histItem.getLevels())
+        self._imageItem.setTransform(tr)
+
     def setTicks(self, ticks):
         self._ticks = ticks
         self._histItem.gradient.restoreState({"mode": "rgb", "ticks": ticks})
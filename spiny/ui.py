@@ -17,7 +17,8 @@ import pkgutil
 from .gui.theme import define_palette
 from .gui.utils import cmapToColormap
 from .gui.helpers.widgets import ExtendedComboBox
-from .core.wav.visualisation import WavDock
+from .gui.widgets import DataWidget
+from .core.wav.visualisation import WavDock, SpectralSliceDock
 from .core.wav import controller as audio_controller
 from .annotations.visualisation import AnnotationDock
 from .core import DataDock
@@ -90,6 +91,11 @@ class VisualisationArea(DockArea):
             "Annotations", (950, 20), self._dock_wav.wav_plot
         )  # Size doesn't seem to affect anything
 
+        # Generate the spectral slice part
+        self.logger.debug("Plot spectral slice part")
+        self._dock_slice = SpectralSliceDock("Spectral slice", (300, 240))
+        self._dock_slice.track(self._dock_wav.wav_plot, self._dock_wav.wav_plot.getPlotItem().getViewBox())
+
         # Define the label on wav plots
         self._dock_wav.wav_plot.setLabel("bottom", "Time", units="s")
 
@@ -98,12 +104,19 @@ class VisualisationArea(DockArea):
         self.addDock(self._dock_wav, "left")
         self.addDock(self._dock_annotation, "top", self._dock_wav)
         self.addDock(self._dock_coef, "top", self._dock_annotation)
+        self.addDock(self._dock_slice, "right")
 
     def selectPlugin(self, controller):
         controller.setWavPlot(self._dock_wav.wav_plot)
         controller.extract()
         self._dock_coef.setWidget(controller._widget, controller._name)
 
+        # The slice follows the data plot too and uses the STFT parameters of the plugin
+        if isinstance(controller._widget, DataWidget):
+            self._dock_slice.track(controller._widget, controller._widget._plotItem.getViewBox())
+        if hasattr(controller._extractor, "getSTFTParameters"):
+            self._dock_slice.setParameters(controller._extractor.getSTFTParameters())
+
 
 # Discover plugins
 def iter_namespace(ns_pkg):
@@ -136,6 +149,12 @@ class GUIVisu(QtWidgets.QMainWindow):
         self.openAction.setShortcut("Ctrl+o")
         file_menu.addAction(self.openAction)
 
+        # Add export shortcut
+        self.exportAction = QtGui.QAction("&Export data...", self)
+        self.exportAction.triggered.connect(self.exportData)
+        self.exportAction.setShortcut("Ctrl+e")
+        file_menu.addAction(self.exportAction)
+
         # Add exit shortcut!
         self.exitAction = QtGui.QAction(("E&xit"), self)
         self.exitAction.setShortcut(QtGui.QKeySequence("Ctrl+Q"))
@@ -268,6 +287,19 @@ class GUIVisu(QtWidgets.QMainWindow):
         if filename:
             self._filename_label.setText(filename)
 
+    def exportData(self):
+        if self._plugin_list.currentText() not in plugin_entry_dict:
+            return
+
+        options = QtWidgets.QFileDialog.Options()
+        options |= QtWidgets.QFileDialog.DontUseNativeDialog
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Exporting data", "", "NumPy Files (*.npy)", options=options
+        )
+        if filename:
+            # NOTE: the metadata are saved next to the matrix in a .json file
+            plugin_entry_dict[self._plugin_list.currentText()].export(filename)
+
     def selectPlugin(self, current):
         # NOTE: this is here because we lack a better way to avoid issues during completion
         if current not in plugin_entry_dict:
@@ -0,0 +1,10 @@
+import os
+
+# PyQtGraph & create application (spiny.core instantiates widgets when imported)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from pyqtgraph.Qt import QtWidgets  # noqa: E402
+
+if not QtWidgets.QApplication.instance():
+    APP = QtWidgets.QApplication(["SpINY"])
+else:
+    APP = QtWidgets.QApplication.instance()
@@ -0,0 +1,27 @@
+import numpy as np
+import scipy.signal
+
+from spiny.plugins.spectrum.cqt import ConstantQAnalysis, decimate_segment
+
+
+def get_signal(duration=3.0, sampling_rate=16000):
+    rng = np.random.default_rng(0)
+    return rng.standard_normal(int(duration * sampling_rate)).astype(np.float32)
+
+
+def test_decimated_segment_matches_the_decimated_signal():
+    signal = get_signal()
+    for factor in [2, 8, 32]:
+        expected = scipy.signal.resample_poly(signal, 1, factor)
+        for start, end in [(-50, 200), (1000, 1300), (expected.shape[0] - 100, expected.shape[0] + 40)]:
+            segment = decimate_segment(signal, factor, start, end)
+            lo, hi = max(start, 0), min(end, expected.shape[0])
+            np.testing.assert_allclose(segment[lo - start : hi - start], expected[lo:hi], atol=1e-5)
+            assert np.all(segment[: lo - start] == 0) and np.all(segment[hi - start :] == 0)
+
+
+def test_cqt_blocks_are_independent():
+    analysis = ConstantQAnalysis(get_signal(), 16000, 12, 50, 5000)
+    expected = analysis.extractFrames(0, 600, 80, block_size=600)
+    np.testing.assert_allclose(analysis.extractFrames(0, 600, 80, block_size=64), expected, atol=1e-3)
+    np.testing.assert_allclose(analysis.extractFrames(250, 400, 80), expected[250:400], atol=1e-3)
@@ -0,0 +1,93 @@
+import math
+import subprocess
+import sys
+import threading
+
+import numpy as np
+import pytest
+import scipy.fft
+
+from spiny.dsp.cwt import (
+    CWT_SEGMENT_SUPPORTS,
+    MEXICAN_HAT_C_DELTA,
+    MEXICAN_HAT_PSI0,
+    MEXICAN_HAT_SUPPORT,
+    cwt_analysis,
+    cwt_padding,
+    iter_cwt,
+    mexican_hat_bank,
+    mexican_hat_scales,
+)
+from spiny.dsp.process import ExtractionCancelled
+
+
+# Modules imported by the workers of the process pool (the prosody ones need the wavelet toolkit)
+WORKER_MODULES = ["spiny.dsp.process", "spiny.dsp.spectral", "spiny.dsp.cwt", "spiny.dsp.prominence"]
+PROSODY_MODULES = ["spiny.dsp.prosody", "spiny.prosody_labeller"]
+PRAAT_MODULES = ["spiny.dsp.praat"]
+
+
+@pytest.mark.parametrize("module", WORKER_MODULES + PROSODY_MODULES + PRAAT_MODULES)
+def test_worker_modules_do_not_import_qt_nor_the_player(module):
+    if module in PROSODY_MODULES:
+        pytest.importorskip("wavelet_prosody_toolkit")
+    if module in PRAAT_MODULES:
+        pytest.importorskip("parselmouth")
+
+    # NOTE: the workers are spawned, so the module is imported by a fresh interpreter
+    code = (
+        f"import sys, {module}; "
+        "print(sorted(name for name in ('pyqtgraph', 'sounddevice', 'spiny.core') if name in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_batched_cwt_matches_the_convolution_by_each_wavelet():
+    signal = np.random.default_rng(0).standard_normal(3000)
+    frame_rate, scale_distance = 200, 0.25
+
+    # NOTE: the first scale is large enough to sample the wavelet without aliasing
+    ((start, coefficients),) = iter_cwt(signal, frame_rate, 8, 12, scale_distance)
+    assert start == 0 and coefficients.shape == (3000, 12)
+
+    # Reference: the time domain Mexican hat of each scale (Torrence and Compo, 1998)
+    dt = 1 / frame_rate
+    scales, _ = mexican_hat_scales(frame_rate, 8, 12, scale_distance)
+    expected = np.empty_like(coefficients)
+    for index, scale in enumerate(scales):
+        half_support = math.ceil(MEXICAN_HAT_SUPPORT * scale / dt)
+        eta = np.arange(-half_support, half_support + 1) * dt / scale
+        wavelet = (1 - eta**2) * np.exp(-(eta**2) / 2) / math.sqrt(math.gamma(2.5)) * math.sqrt(dt / scale)
+        wavelet *= scale_distance * math.sqrt(dt) / (MEXICAN_HAT_C_DELTA * MEXICAN_HAT_PSI0 * math.sqrt(scale))
+        expected[:, index] = np.convolve(signal, wavelet, mode="same")
+
+    # NOTE: the wavelets are truncated at MEXICAN_HAT_SUPPORT scales in the time domain
+    np.testing.assert_allclose(coefficients, expected, atol=1e-4 * np.max(np.abs(expected)))
+
+
+def test_segmented_cwt_matches_the_transform_of_the_whole_signal():
+    padding = cwt_padding(200, 32, 34, 0.25)
+    segment_fft = scipy.fft.next_fast_len(CWT_SEGMENT_SUPPORTS * (2 * padding + 1), real=True)
+
+    # NOTE: the signal covers a few segments, the last one being incomplete
+    signal = np.random.default_rng(1).standard_normal(2 * segment_fft + 1234)
+    assert len(list(iter_cwt(signal))) > 2
+
+    out = np.zeros((signal.shape[0], 34), dtype=np.float32)
+    coefficients, scales, freqs = cwt_analysis(signal, out=out)
+    assert coefficients.shape == (34, signal.shape[0]) and scales.shape == freqs.shape == (34,)
+    assert np.shares_memory(coefficients, out)
+
+    # Reference: a single FFT of the whole signal, padded to avoid the wrap-around
+    n_fft = scipy.fft.next_fast_len(signal.shape[0] + padding, real=True)
+    bank = mexican_hat_bank(n_fft, 200, 32, 34, 0.25)
+    expected = np.fft.irfft(np.fft.rfft(signal, n=n_fft)[None, :] * bank, n=n_fft, axis=1)[:, : signal.shape[0]]
+    np.testing.assert_allclose(coefficients, expected, atol=1e-6)
+
+
+def test_cwt_analysis_is_cancelled_between_two_segments():
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(ExtractionCancelled):
+        cwt_analysis(np.zeros(100000), cancel_event=cancel_event)
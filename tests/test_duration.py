@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from spiny.dsp.duration import DURATION_SILENCE_LABELS, duration_signal, tier_duration_signal
+
+FRAME_RATE = 200
+NB_FRAMES = 400
+
+# Units with a gap, a silence, a zero-length interval, unsorted segments and a last interval past the end
+TIERS = [
+    [
+        (0.1, 0.3, "a"),
+        (0.3, 0.42, "b"),
+        (0.6, 0.6, "c"),
+        (0.5, 0.6, "sil"),
+        (0.9, 1.0, "#"),
+        (0.7, 0.9, "d"),
+        (1.0, 1.5, "E"),
+        (1.8, 2.4, "f"),
+    ],
+    [(0.0, 1.0, "word"), (1.0, 1.002, "x"), (1.2, 1.2, "y"), (1.3, 3.0, "last")],
+]
+
+
+def loop_tier_duration_signal(segments, nb_frames, frame_rate, bump=False):
+    """Reference: the duration signal generated segment by segment"""
+    signal = np.zeros(nb_frames)
+    for start_time, end_time, label in sorted(segments, key=lambda segment: segment[0]):
+        if label.lower() in DURATION_SILENCE_LABELS:
+            continue
+
+        start = min(max(round(start_time * frame_rate), 0), nb_frames)
+        end = min(max(round(end_time * frame_rate), 0), nb_frames)
+        if end <= start:
+            continue
+
+        duration = np.log(end - start + 1.0)
+        if not bump:
+            signal[start:end] = duration
+            continue
+
+        centre = (start + end) / 2
+        for frame in range(start, min(end + 1, nb_frames)):
+            signal[frame] = duration * (1 - abs(frame - centre) / (centre - start))
+
+    return signal
+
+
+@pytest.mark.parametrize("bump", [False, True])
+@pytest.mark.parametrize("segments", TIERS)
+def test_tier_duration_signal_matches_the_segment_loop(segments, bump):
+    signal = tier_duration_signal(segments, NB_FRAMES, FRAME_RATE, bump=bump)
+    expected = loop_tier_duration_signal(segments, NB_FRAMES, FRAME_RATE, bump=bump)
+    np.testing.assert_allclose(signal, expected, atol=1e-12)
+
+    # The last unit is cut at the end of the signal
+    assert signal.shape == (NB_FRAMES,) and signal[-1] > 0
+
+
+@pytest.mark.parametrize("delta", [False, True])
+@pytest.mark.parametrize("bump", [False, True])
+def test_duration_signal_sums_the_tiers(delta, bump):
+    signal = duration_signal(TIERS, NB_FRAMES, FRAME_RATE, delta=delta, bump=bump)
+
+    expected = sum(loop_tier_duration_signal(segments, NB_FRAMES, FRAME_RATE, bump=bump) for segments in TIERS)
+    if delta:
+        expected = np.diff(expected, prepend=expected[0])
+    np.testing.assert_allclose(signal, expected, atol=1e-12)
+
+
+def test_duration_signal_without_unit_is_zero():
+    assert not np.any(duration_signal([[], [(0.2, 0.5, "pau"), (0.5, 0.5, "a")]], NB_FRAMES, FRAME_RATE))
+    assert duration_signal([TIERS[0]], 0, FRAME_RATE, delta=True).shape == (0,)
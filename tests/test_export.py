@@ -0,0 +1,38 @@
+import threading
+
+import numpy as np
+import pytest
+
+from spiny.core.extraction import ExtractionCancelled
+from spiny.core.export import define_metadata, export_array, export_chunks, get_export_paths, load_export
+
+
+def test_export_round_trip(tmp_path):
+    array = np.arange(20, dtype=np.float32).reshape(10, 2)
+    export_array(array, tmp_path / "data.npy", define_metadata("Test", 0.005), chunk_size=3)
+
+    data, metadata = load_export(tmp_path / "data")
+    np.testing.assert_array_equal(data, array)
+    assert metadata["shape"] == [10, 2]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["data.json", "data.npy"]
+
+
+def test_cancelled_export_leaves_no_file(tmp_path):
+    cancel_event = threading.Event()
+
+    def chunks():
+        yield 0, np.zeros((4, 2), dtype=np.float32)
+        cancel_event.set()
+        yield 4, np.zeros((4, 2), dtype=np.float32)
+
+    with pytest.raises(ExtractionCancelled):
+        export_chunks(chunks(), (8, 2), tmp_path / "data", define_metadata("Test", 0.005), cancel_event=cancel_event)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("filename", ["spk1.utt", "spk1.utt.npy", "spk1.utt.json"])
+def test_export_paths_keep_the_dots_of_the_name(tmp_path, filename):
+    data_path, metadata_path = get_export_paths(tmp_path / filename)
+    assert (data_path.name, metadata_path.name) == ("spk1.utt.npy", "spk1.utt.json")
+    assert data_path.parent == tmp_path
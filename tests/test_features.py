@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from spiny.core.wav import player, STFTParameters
+from spiny.core.wav import features
+from spiny.core.wav.features import FeatureStore
+from spiny.dsp.process import stft
+
+PARAMETERS = STFTParameters(512, 80, 400, "hamming")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    signal = np.random.default_rng(0).normal(0, 0.1, (16000, 1)).astype(np.float32)
+    monkeypatch.setattr(player, "_wav", signal, raising=False)
+    monkeypatch.setattr(player, "_sampling_rate", 16000, raising=False)
+
+    # NOTE: small blocks, so the features are computed by several blocks
+    return FeatureStore(block_size=16)
+
+
+def get_power(parameters):
+    return np.abs(stft(player._wav[:, 0].astype(np.float64), *parameters)) ** 2
+
+
+def test_long_term_spectrum_matches_the_average_power(store):
+    power = get_power(PARAMETERS)
+
+    # NOTE: the range covers complete blocks and incomplete blocks at both ends
+    _, spectrum = store.getLongTermSpectrum(PARAMETERS, 0.1, 0.8)
+    start, end = 20, 161
+    window = np.hamming(401)[:-1]
+    expected = 10 * np.log10(np.maximum(np.mean(power[start:end], axis=0) / (0.5 * np.sum(window)) ** 2, 1e-10))
+    np.testing.assert_allclose(spectrum, expected, atol=1e-3)
+
+    # Only the prefix sums of the blocks are cached
+    assert store.getFrameFeatures(PARAMETERS).cumulated_power.shape == (-(-power.shape[0] // 16) + 1, 257)
+
+
+def test_band_energy_and_flux_match_the_power_spectrum(store):
+    power = get_power(PARAMETERS)
+    bins = (int(200 * 512 / 16000), int(5000 * 512 / 16000))
+    window = np.hamming(401)[:-1]
+    expected = np.sqrt(2 * np.sum(power[:, bins[0] : bins[1]], axis=1) / (512 * np.sum(window**2)))
+    np.testing.assert_allclose(store.getBandEnergy(PARAMETERS, (200, 5000)), expected, rtol=1e-4)
+
+    magnitude = np.sqrt(power)
+    expected = np.zeros(power.shape[0])
+    expected[1:] = np.sqrt(np.sum(np.maximum(np.diff(magnitude, axis=0), 0) ** 2, axis=1))
+    np.testing.assert_allclose(store.getSpectralFlux(PARAMETERS), expected, rtol=1e-3, atol=1e-5)
+
+
+def test_features_share_a_single_stft_pass(store, monkeypatch):
+    nb_passes = []
+    compute_frame_features = features.compute_frame_features
+
+    def _count_passes(*args, **kwargs):
+        nb_passes.append(kwargs.get("bands", ()))
+        return compute_frame_features(*args, **kwargs)
+
+    monkeypatch.setattr(features, "compute_frame_features", _count_passes)
+    monkeypatch.setattr(features, "compute_band_power", None)
+
+    store.getBandEnergy(PARAMETERS, (200, 5000))
+    store.getSpectralFlux(PARAMETERS)
+    store.getLongTermSpectrum(PARAMETERS, 0.1, 0.8)
+    assert nb_passes == [((int(200 * 512 / 16000), int(5000 * 512 / 16000)),)]
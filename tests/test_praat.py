@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+parselmouth = pytest.importorskip("parselmouth")
+
+from spiny.core.wav import player, praat  # noqa: E402
+from spiny.core.wav.praat import plan_chunk, praat_frames, praat_spectrogram  # noqa: E402
+from spiny.dsp import fft  # noqa: E402
+from spiny.plugins.spectrum_praat import extractor as praat_extractor_module  # noqa: E402
+
+
+def get_signal(duration=2.0, sampling_rate=16000):
+    rng = np.random.default_rng(0)
+    return rng.standard_normal(int(duration * sampling_rate))
+
+
+@pytest.mark.parametrize("sampling_rate", [16000, 22050])
+def test_chunks_pick_the_samples_of_the_whole_signal(sampling_rate):
+    signal = get_signal(sampling_rate=sampling_rate)
+    physical_width, time_step = 0.01, 0.002
+    _, left_samples = praat_frames(signal.shape[0], sampling_rate, physical_width, time_step)
+
+    for start, end in [(0, 200), (200, 400), (left_samples.shape[0] - 150, left_samples.shape[0])]:
+        chunks = plan_chunk(left_samples, signal.shape[0], start, end, sampling_rate, physical_width, time_step)
+        covered = np.zeros(end - start, dtype=bool)
+        for first_sample, nb_samples, frames in chunks:
+            _, chunk_left_samples = praat_frames(nb_samples, sampling_rate, physical_width, time_step)
+            kept = frames >= 0
+            assert not np.any(covered & kept)
+            np.testing.assert_array_equal(
+                chunk_left_samples[frames[kept]] + first_sample, left_samples[start:end][kept]
+            )
+            covered |= kept
+        assert np.all(covered)
+
+
+def test_chunked_spectrogram_is_the_one_of_a_single_call(monkeypatch):
+    signal = get_signal()
+
+    # Reference: a single call of Praat on the whole signal
+    spectrogram = parselmouth.Sound(signal, 16000).to_spectrogram(
+        window_length=0.005, maximum_frequency=5000, time_step=0.002, frequency_step=20
+    )
+    with np.errstate(divide="ignore"):
+        expected = 10 * np.log10(spectrogram.values.T)
+
+    # NOTE: the chunks are analysed by the process pool as soon as it has several workers
+    monkeypatch.setattr(fft, "_NB_WORKERS", 2)
+    nb_jobs = []
+    get_process_pool = praat.get_process_pool
+    monkeypatch.setattr(praat, "get_process_pool", lambda: nb_jobs.append(1) or get_process_pool())
+    values, times, frequencies, (ymin, ymax), frameshift = praat_spectrogram(signal, 16000, chunk_frames=200)
+
+    assert len(nb_jobs) >= 5
+    assert values.shape == expected.shape
+    np.testing.assert_allclose(times, spectrogram.xs())
+    np.testing.assert_allclose(frequencies, spectrogram.ys())
+    assert (ymin, ymax, frameshift) == (spectrogram.ymin, spectrogram.ymax, spectrogram.get_time_step())
+    np.testing.assert_allclose(values, expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.fixture
+def praat_extractor(monkeypatch):
+    monkeypatch.setattr(player, "_wav", get_signal()[:, None], raising=False)
+    monkeypatch.setattr(player, "_sampling_rate", 16000, raising=False)
+
+    # Count the analyses run by the extractor
+    calls = []
+    for name in ["praat_spectrogram", "praat_formants", "praat_intensity"]:
+        function = getattr(praat_extractor_module, name)
+        monkeypatch.setattr(
+            praat_extractor_module,
+            name,
+            lambda *args, function=function, name=name, **kwargs: calls.append(name) or function(*args, **kwargs),
+        )
+
+    return praat_extractor_module.SpectrumPraatExtractor(), calls
+
+
+def test_tracks_are_only_computed_when_displayed(praat_extractor):
+    extractor, calls = praat_extractor
+    assert extractor.needsExtraction()
+    extractor.extract()
+    assert calls == ["praat_spectrogram"] and not extractor.needsExtraction()
+    assert extractor.getFormants() is None and extractor.getIntensity() is None
+
+    # Showing a track only computes this track
+    extractor._show_formants = True
+    assert extractor.needsExtraction()
+    extractor.extract()
+    assert calls == ["praat_spectrogram", "praat_formants"] and not extractor.needsExtraction()
+    times, frequencies = extractor.getFormants()
+    assert frequencies.shape == (times.shape[0], 5)
+
+    # Hiding and showing it again reuses the cached track
+    extractor._show_formants = False
+    extractor._show_intensity = True
+    extractor.extract()
+    extractor._show_formants = True
+    assert not extractor.needsExtraction()
+    extractor.extract()
+    assert calls == ["praat_spectrogram", "praat_formants", "praat_intensity"]
+
+
+def test_tracks_are_cached_per_parameters_and_signal(praat_extractor, monkeypatch):
+    extractor, calls = praat_extractor
+    extractor._show_intensity = True
+    extractor.extract()
+    first_intensity = extractor.getIntensity()
+
+    # New parameters need a new track, the previous one is kept
+    extractor._intensity_parameters = (75,)
+    assert extractor.needsExtraction()
+    extractor.extract()
+    extractor._intensity_parameters = (100,)
+    assert not extractor.needsExtraction()
+    assert extractor.getIntensity() is first_intensity
+    assert calls == ["praat_spectrogram", "praat_intensity", "praat_intensity"]
+
+    # The copy extracted in the background completes its own cache
+    copy_extractor = extractor.__copy__()
+    copy_extractor._intensity_parameters = (150,)
+    copy_extractor.extract()
+    assert ("intensity", (150,)) not in extractor._tracks
+
+    # A new signal drops everything
+    monkeypatch.setattr(player, "_wav", get_signal(1.0)[:, None])
+    assert extractor.needsExtraction()
+    extractor.extract()
+    assert calls[-2:] == ["praat_spectrogram", "praat_intensity"]
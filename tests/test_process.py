@@ -0,0 +1,61 @@
+import numpy as np
+import scipy.signal
+
+from spiny.dsp.process import stft, chunked_stft, stft_db, dpss_tapers, multitaper_db
+
+
+def get_signal(duration=2.0, sampling_rate=16000):
+    rng = np.random.default_rng(0)
+    return rng.standard_normal(int(duration * sampling_rate)).astype(np.float32)
+
+
+def test_chunked_stft_is_identical_to_stft():
+    signal = get_signal()
+    expected = stft(signal, 1024, 80, 480, "hamming", 10, 1500)
+    spectrum = chunked_stft(signal, 1024, 80, 480, "hamming", 10, 1500, block_size=128)
+    np.testing.assert_array_equal(spectrum, expected)
+
+
+def test_stft_db_matches_the_magnitude_of_the_stft():
+    signal = get_signal()
+    band, ref = (20, 300), 12.0
+    expected = stft(signal, 1024, 80, 480, "hamming")[:, band[0] : band[1]]
+    expected = 20 * np.log10(np.maximum(np.abs(expected) / ref, 1e-5))
+    spectrum = stft_db(signal, 1024, 80, 480, "hamming", band=band, ref=ref, block_size=128)
+
+    assert spectrum.dtype == np.float32
+    np.testing.assert_allclose(spectrum, expected, atol=1e-3)
+
+
+def test_dpss_tapers_are_the_centred_slepian_windows():
+    tapers = dpss_tapers(480, 1024, 3.0, 5, np.float32)
+    expected = scipy.signal.windows.dpss(480, 3.0, Kmax=5, sym=False)
+
+    assert tapers.shape == (5, 1024) and tapers.dtype == np.float32 and not tapers.flags.writeable
+    np.testing.assert_allclose(tapers[:, 272:752], expected, rtol=1e-6, atol=1e-7)
+    assert not np.any(tapers[:, :272]) and not np.any(tapers[:, 752:])
+
+
+def test_multitaper_db_matches_the_average_of_each_taper():
+    signal = get_signal()
+    n_fft, hop_length, win_length, time_bandwidth, nb_tapers = 1024, 80, 480, 3.0, 5
+    start, end, band, ref = 10, 300, (20, 300), 12.0
+    spectrum = multitaper_db(
+        signal, n_fft, hop_length, win_length, time_bandwidth, nb_tapers, start, end, band, ref, block_size=64
+    )
+
+    # Reference: each frame of the centred signal tapered by each Slepian window, one after the other
+    padded = np.pad(signal.astype(np.float64), n_fft // 2)
+    tapers = scipy.signal.windows.dpss(win_length, time_bandwidth, Kmax=nb_tapers, sym=False)
+    offset = (n_fft - win_length) // 2
+    power = np.zeros((end - start, n_fft // 2 + 1))
+    for taper in tapers:
+        window = np.zeros(n_fft)
+        window[offset : offset + win_length] = taper
+        for index in range(start, end):
+            frame = padded[index * hop_length : index * hop_length + n_fft]
+            power[index - start] += np.abs(np.fft.rfft(frame * window)) ** 2 / nb_tapers
+    expected = 10 * np.log10(np.maximum(power[:, band[0] : band[1]] / ref**2, 1e-10))
+
+    assert spectrum.shape == (end - start, band[1] - band[0]) and spectrum.dtype == np.float32
+    np.testing.assert_allclose(spectrum, expected, atol=1e-3)
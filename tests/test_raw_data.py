@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from spiny.raw_data.extractor import HTK_COMPRESSED, HTK_CRC, HTK_HEADER, RawDataExtractor, read_htk_header
+from spiny.raw_data.visualisation import RawDataPlotWidget
+
+# Base kind of the MFCC
+HTK_MFCC = 6
+
+
+def write_htk(filename, data, byte_order=">", kind=HTK_MFCC, period=50000, crc=False):
+    header = np.array([(data.shape[0], period, 4 * data.shape[1], kind)], dtype=HTK_HEADER.newbyteorder(byte_order))
+    with open(filename, "wb") as f_coef:
+        f_coef.write(header.tobytes())
+        f_coef.write(data.astype(f"{byte_order}f4").tobytes())
+        if crc:
+            f_coef.write(b"\x12\x34")
+
+
+def get_coefficients(nb_frames=50, dimension=3):
+    return np.random.default_rng(0).standard_normal((nb_frames, dimension)).astype(np.float32)
+
+
+def load(filename, dimension=None):
+    extractor = RawDataExtractor()
+    extractor.loadCoefficientFile(filename, dimension)
+    return extractor, extractor.extract()
+
+
+@pytest.mark.parametrize("byte_order", [">", "<"])
+@pytest.mark.parametrize("crc", [False, True])
+def test_htk_header_gives_the_byte_order_and_the_shape(tmp_path, byte_order, crc):
+    filename = tmp_path / "coefficients.mfc"
+    coefficients = get_coefficients()
+    write_htk(filename, coefficients, byte_order, kind=HTK_MFCC | (HTK_CRC if crc else 0), crc=crc)
+
+    dtype, nb_frames, dimension, frameshift = read_htk_header(filename)
+    assert dtype == np.dtype(f"{byte_order}f4")
+    assert (nb_frames, dimension) == coefficients.shape
+    assert frameshift == pytest.approx(5.0)
+
+    # The values are mapped without swapping the bytes
+    extractor, data = load(filename)
+    assert data.dtype == dtype and extractor._frameshift == pytest.approx(5.0)
+    np.testing.assert_array_equal(data, coefficients)
+
+
+def test_compressed_htk_file_is_rejected(tmp_path):
+    # NOTE: a compressed file starts with the scale and offset vectors (4 samples of int16 values)
+    nb_frames, dimension = 50, 4
+    header = np.array([(nb_frames + 4, 50000, 2 * dimension, HTK_MFCC | HTK_COMPRESSED)], dtype=HTK_HEADER)
+    filename = tmp_path / "compressed.mfc"
+    with open(filename, "wb") as f_coef:
+        f_coef.write(header.tobytes())
+        f_coef.write(np.zeros((nb_frames + 4) * dimension, dtype=">i2").tobytes())
+
+    with pytest.raises(ValueError):
+        read_htk_header(filename)
+
+
+def test_headerless_dump_is_not_an_htk_file(tmp_path):
+    filename = tmp_path / "coefficients.f32"
+    coefficients = get_coefficients()
+    coefficients.tofile(filename)
+    assert read_htk_header(filename) is None
+
+    _, data = load(filename, dimension=-3)
+    np.testing.assert_array_equal(data, coefficients)
+
+    # A file smaller than a header
+    filename = tmp_path / "small.f32"
+    coefficients[0, :2].tofile(filename)
+    assert read_htk_header(filename) is None
+
+
+@pytest.mark.parametrize("dimension", [None, 3, -3])
+def test_npy_matrix_is_oriented_by_the_dimension(tmp_path, dimension):
+    coefficients = get_coefficients()
+    np.save(tmp_path / "frames.npy", coefficients)
+    np.save(tmp_path / "dimensions.npy", coefficients.T)
+
+    _, data = load(tmp_path / "frames.npy", dimension)
+    np.testing.assert_array_equal(data, coefficients)
+
+    if dimension is not None:
+        _, data = load(tmp_path / "dimensions.npy", dimension)
+        np.testing.assert_array_equal(data, coefficients)
+
+    with pytest.raises(ValueError):
+        load(tmp_path / "frames.npy", 4 if dimension is None else 4 * dimension)
+
+
+@pytest.mark.parametrize("dimension", [-3, 3])
+def test_memory_map_matches_the_file_read(tmp_path, dimension):
+    filename = tmp_path / "coefficients.f32"
+    get_coefficients().tofile(filename)
+
+    # Reference: the file read at once, as before the mapping
+    expected = np.fromfile(filename, dtype=np.float32)
+    if dimension < 0:
+        expected = expected.reshape((-1, -dimension))
+    else:
+        expected = expected.reshape((dimension, -1)).T
+
+    _, data = load(filename, dimension)
+    assert isinstance(data, np.memmap)
+    np.testing.assert_array_equal(data, expected)
+
+
+@pytest.mark.parametrize(
+    "start_time, end_time, expected_start, expected_end",
+    [(-1.0, 0.05, 0, 10), (0.0, 0.25, 0, 50), (0.2, 10.0, 40, 50), (0.3, 0.4, 50, 50), (-2.0, -1.0, 0, 0)],
+)
+def test_range_is_clipped_at_the_file_boundaries(tmp_path, start_time, end_time, expected_start, expected_end):
+    filename = tmp_path / "coefficients.f32"
+    coefficients = get_coefficients()
+    coefficients.tofile(filename)
+
+    extractor = RawDataExtractor()
+    extractor.loadCoefficientFile(filename, -3, frameshift=5.0)
+    extractor.extract()
+
+    # One frame per column
+    start, step, frames = extractor.getRange(start_time, end_time, 1000)
+    assert (start, step) == (expected_start, 1)
+    np.testing.assert_array_equal(frames, coefficients[expected_start:expected_end])
+
+    # Decimated frames, the first one being aligned on the step
+    start, step, frames = extractor.getRange(start_time, end_time, 3)
+    assert start % step == 0 and start <= expected_start
+    np.testing.assert_array_equal(frames, coefficients[start:expected_end:step])
+
+
+@pytest.mark.parametrize("view", [(0.0, 0.05), (0.2, 0.3)])
+def test_viewport_renders_the_frames_at_the_file_boundaries(tmp_path, view):
+    filename = tmp_path / "coefficients.f32"
+    coefficients = get_coefficients()
+    coefficients.tofile(filename)
+
+    extractor = RawDataExtractor()
+    extractor.loadCoefficientFile(filename, -3, frameshift=5.0)
+    extractor.extract()
+
+    widget = RawDataPlotWidget(extractor)
+    widget.resize(400, 300)
+    widget.refresh()
+
+    # NOTE: the view is limited to the file (0.25 s) and the margin goes past its boundaries
+    widget._plotItem.getViewBox().setXRange(*view, padding=0)
+    widget.updateViewport()
+    image = widget._imageItem.image
+    start = round(widget._imageItem.transform().dx() / 0.005)
+    np.testing.assert_array_equal(image, coefficients[start : start + image.shape[1]].T)
+    if view[0] == 0:
+        assert start == 0
+    else:
+        assert start + image.shape[1] == coefficients.shape[0]
@@ -0,0 +1,35 @@
+import numpy as np
+
+from spiny.core import player
+from spiny.plugins.spectrum.analysis import SpectrumParameters
+from spiny.plugins.spectrum.extractor import SpectrumExtractor
+
+
+def test_new_parameters_leave_the_previous_analysis_untouched(monkeypatch):
+    signal = np.random.default_rng(0).normal(0, 0.1, (16000, 1)).astype(np.float32)
+    monkeypatch.setattr(player, "_wav", signal, raising=False)
+    monkeypatch.setattr(player, "_sampling_rate", 16000, raising=False)
+
+    extractor = SpectrumExtractor()
+    previous = extractor.setParameters(SpectrumParameters(fft_length=1024, framelength=30, cutoff=(0, 4000)))
+    expected = previous.extractFrames(0, 10)
+
+    # NOTE: a job still computing the previous analysis is not affected by the new parameters
+    extractor.setParameters(SpectrumParameters(fft_length=512, framelength=20, transform="CQT", cutoff=(0, 8000)))
+    assert previous._parameters.cutoff == (0, 4000)
+    np.testing.assert_array_equal(previous.extractFrames(0, 10), expected)
+
+
+def test_wider_band_replaces_the_analysis(monkeypatch):
+    monkeypatch.setattr(player, "_wav", np.zeros((16000, 1), dtype=np.float32), raising=False)
+    monkeypatch.setattr(player, "_sampling_rate", 16000, raising=False)
+
+    extractor = SpectrumExtractor(framelength=30, cutoff=(400, 5000))
+    analysis = extractor.setParameters(extractor._parameters)
+
+    extractor.setCutoff((1000, 4000))
+    assert extractor._analysis is analysis
+
+    extractor.setCutoff((0, 6000))
+    assert extractor._analysis is not analysis
+    assert extractor._analysis._parameters.cutoff == (0, 6000)
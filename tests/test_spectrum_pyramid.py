@@ -0,0 +1,111 @@
+import threading
+
+import numpy as np
+
+from spiny.dsp.process import frame_count
+from spiny.plugins.spectrum.pyramid import SpectrogramPyramid
+from spiny.plugins.spectrum.tiles import TILE_EXECUTOR, pool_frames
+
+SILENCE = -100.0
+
+
+class TransientExtractor:
+    """Extractor of a silent spectrum containing a single loud frame at the frameshift"""
+
+    def __init__(self, transient_frame, nb_samples=16000 * 600, frameshift=80):
+        self._transient_sample = transient_frame * frameshift
+        self._nb_samples = nb_samples
+        self._frameshift = frameshift
+        self._threads = set()
+
+    def getAnalysisParameters(self):
+        return 1024, self._frameshift, 480
+
+    def getNbFrames(self, hop_length):
+        return frame_count(self._nb_samples, 1024, hop_length)
+
+    def getShape(self):
+        return self.getNbFrames(self._frameshift), 4
+
+    def extractFrames(self, start, end, hop_length):
+        self._threads.add(threading.get_ident())
+        frames = np.full((end - start, 4), SILENCE, dtype=np.float32)
+        frames[np.arange(start, end) * hop_length == self._transient_sample] = 0.0
+        return frames
+
+
+def get_level(pyramid, hop_length):
+    return pyramid._tiles.getFrames(hop_length, 0, pyramid._tiles.getNbFrames(hop_length))
+
+
+def test_pool_frames():
+    frames = np.arange(10, dtype=np.float32).reshape(5, 2)
+    np.testing.assert_array_equal(pool_frames(frames, 2), [[2, 3], [6, 7], [8, 9]])
+
+
+def test_transient_survives_at_the_coarsest_level():
+    # NOTE: an odd frame is never sampled by a coarser hop
+    pyramid = SpectrogramPyramid(TransientExtractor(transient_frame=12345))
+    coarsest = pyramid.getLevels()[-1]
+    assert coarsest > 80
+
+    overview = get_level(pyramid, coarsest)
+    assert overview.shape[0] <= pyramid._tiles._tile_size
+    assert np.flatnonzero(overview[:, 0] > SILENCE).tolist() == [12345 * 80 // coarsest]
+
+
+def test_pooling_the_finer_level_matches_the_frameshift_level():
+    pyramid = SpectrogramPyramid(TransientExtractor(transient_frame=12345))
+    coarsest = pyramid.getLevels()[-1]
+    expected = get_level(pyramid, coarsest)
+
+    # The coarsest level is now pooled from the cached level below it
+    pyramid.clear()
+    get_level(pyramid, coarsest // 2)
+    np.testing.assert_array_equal(get_level(pyramid, coarsest), expected)
+
+
+def test_rendering_only_takes_the_available_tiles():
+    extractor = TransientExtractor(transient_frame=12345)
+    pyramid = SpectrogramPyramid(extractor)
+    nb_ready = []
+    pyramid.setReadyCallback(lambda: nb_ready.append(1))
+
+    # The overview is scheduled, never computed by the rendering thread
+    coarsest = pyramid.getLevels()[-1]
+    nb_frames = pyramid._tiles.getNbFrames(coarsest)
+    frames, complete = pyramid._tiles.getAvailableFrames(coarsest, 0, nb_frames)
+    assert not complete
+    assert np.all(np.isnan(frames)) and frames.shape == (nb_frames, 4)
+
+    # Once the worker is done, the frames are available and the rendering has been notified
+    TILE_EXECUTOR.submit(lambda: None).result()
+    frames, complete = pyramid._tiles.getAvailableFrames(coarsest, 0, nb_frames)
+    assert complete and nb_ready
+    np.testing.assert_array_equal(frames, get_level(pyramid, coarsest))
+    assert threading.get_ident() not in extractor._threads
+
+
+def test_cache_discards_the_hidden_levels_first():
+    # NOTE: a tile of the transient extractor takes 256 * 4 * 4 bytes, the cache keeps three of them
+    pyramid = SpectrogramPyramid(TransientExtractor(transient_frame=12345))
+    tiles = pyramid._tiles
+    tiles._max_bytes = 3 * 256 * 4 * 4
+
+    # The level rendered last is the one kept
+    tiles.getAvailableFrames(80, 0, 2 * 256)
+    TILE_EXECUTOR.submit(lambda: None).result()
+    tiles.getTile(40, 0)
+    tiles.getTile(40, 1)
+    assert list(tiles._tiles) == [(80, 0), (80, 1), (40, 1)]
+    assert tiles._nb_bytes == 3 * 256 * 4 * 4
+
+    # The hidden level goes first, then the least recently used tiles of the rendered level
+    tiles.getAvailableFrames(80, 0, 256)
+    tiles.getTile(80, 2)
+    assert list(tiles._tiles) == [(80, 1), (80, 0), (80, 2)]
+    tiles.getTile(80, 3)
+    assert list(tiles._tiles) == [(80, 0), (80, 2), (80, 3)]
+
+    # A discarded tile is computed again when needed
+    np.testing.assert_array_equal(tiles.getFrames(80, 256, 2 * 256), np.full((256, 4), SILENCE))
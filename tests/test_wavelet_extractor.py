@@ -0,0 +1,88 @@
+import copy
+
+import numpy as np
+import pytest
+
+pytest.importorskip("wavelet_prosody_toolkit")
+
+from spiny.core.wav import player  # noqa: E402
+from spiny.dsp import fft  # noqa: E402
+from spiny.plugins.wavelet.extractor import WaveletExtractor  # noqa: E402
+
+STAGES = ["energy", "duration", "f0", "combination", "wavelet"]
+
+
+@pytest.fixture
+def extractor(monkeypatch):
+    rng = np.random.default_rng(0)
+    time = np.arange(32000) / 16000
+    signal = np.sin(2 * np.pi * 150 * time) * (1 + np.sin(2 * np.pi * 3 * time)) + 0.01 * rng.standard_normal(32000)
+    monkeypatch.setattr(player, "_wav", signal[:, None].astype(np.float32), raising=False)
+    monkeypatch.setattr(player, "_sampling_rate", 16000, raising=False)
+
+    # NOTE: the F0 is tracked in the current process
+    monkeypatch.setattr(fft, "_NB_WORKERS", 1)
+
+    extractor = WaveletExtractor()
+    extractor._duration_tiers = [(0.0, 0.5, "a"), (0.5, 1.2, "b"), (1.2, 2.0, "c")]
+    extractor.extract()
+    return extractor
+
+
+def get_results(extractor):
+    return {name: extractor._stages[name][1] for name in STAGES}
+
+
+def test_late_parameters_reuse_the_earlier_stages(extractor):
+    results = get_results(extractor)
+
+    # The weights only change the combination and the CWT
+    extractor._weights = (1.0, 0.5, 0.5)
+    extractor.extract()
+    new_results = get_results(extractor)
+    assert all(new_results[name] is results[name] for name in ["energy", "duration", "f0"])
+    assert all(new_results[name] is not results[name] for name in ["combination", "wavelet"])
+
+    # The scales only change the CWT
+    results = new_results
+    extractor._num_scales = 20
+    wavelet = extractor.extract()
+    new_results = get_results(extractor)
+    assert all(new_results[name] is results[name] for name in STAGES[:-1])
+    assert new_results["wavelet"] is not results["wavelet"] and wavelet.shape[1] == 20
+
+
+def test_upstream_parameters_invalidate_the_following_stages(extractor, monkeypatch):
+    results = get_results(extractor)
+
+    # The energy band changes the energy and everything depending on it, not the other features
+    extractor._energy_band = (300, 4000)
+    extractor.extract()
+    new_results = get_results(extractor)
+    assert all(new_results[name] is results[name] for name in ["duration", "f0"])
+    assert all(new_results[name] is not results[name] for name in ["energy", "combination", "wavelet"])
+    assert not np.array_equal(new_results["energy"][0], results["energy"][0])
+
+    # A new signal drops all the stages
+    results = new_results
+    monkeypatch.setattr(player, "_wav", player._wav.copy())
+    extractor.extract()
+    new_results = get_results(extractor)
+    assert all(new_results[name] is not results[name] for name in STAGES if results[name] is not None)
+
+
+def test_copy_does_not_share_the_stages(extractor):
+    results = get_results(extractor)
+    wavelet_key = extractor._stages["wavelet"][0]
+
+    # The copy extracted in the background completes its own cache
+    background = copy.copy(extractor)
+    assert background._stages is not extractor._stages
+    background._weights = (0.0, 1.0, 1.0)
+    background.extract()
+    assert all(get_results(extractor)[name] is results[name] for name in STAGES)
+    assert extractor._stages["wavelet"][0] == wavelet_key
+    assert background._stages["wavelet"][0] != wavelet_key
+
+    # The stages computed before the copy are shared, not recomputed
+    assert background._stages["f0"][1] is results["f0"]